@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from core import database  # noqa: F401
+
+        from . import signals  # noqa: F401
@@ -0,0 +1,161 @@
+"""
+Proposed actor assignments for pending parties.
+
+``load_problem`` reads everything the solver needs in three queries: the
+pending parties of a date range with their current actors, every actor's
+role, and the bookings of the whole window as an ``ActorSchedule``.
+``solve`` then works in memory:
+
+1. Greedy: parties are taken in start order and each open slot goes to the
+   least loaded free actor with the required role (load = bookings in the
+   date range, including the ones proposed so far), lowest id on ties.
+2. Repair: a slot nobody could take is retried by moving a blocking actor
+   off another proposed slot, provided someone else can take that slot
+   (a one-step augmenting path, as in bipartite matching).
+
+Nothing is written: the proposals are applied through the batch endpoint.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Prefetch
+
+from .availability import ActorSchedule, party_interval
+from .models import Actor, Party
+
+
+class Problem:
+    def __init__(self, parties, intervals, members, roles, schedule):
+        self.parties = parties  # ordered by start
+        self.intervals = intervals  # {party_id: busy interval}
+        self.members = members  # {party_id: set of actor ids already booked}
+        self.roles = roles  # {actor_id: role}
+        self.schedule = schedule
+
+
+def load_problem(date_from, date_to):
+    """The pending parties of ``[date_from, date_to]``; load counts the bookings of the same range."""
+    parties = list(
+        Party.objects.filter(status='pending', date__gte=date_from, date__lte=date_to)
+        .only('id', 'date', 'time', 'duration', 'meeting_date', 'meeting_time', 'number_of_actors')
+        .prefetch_related(Prefetch('actors', queryset=Actor.objects.only('id')))
+    )
+    intervals = {party.pk: party_interval(party) for party in parties}
+    parties.sort(key=lambda party: intervals[party.pk])
+    members = {party.pk: {actor.pk for actor in party.actors.all()} for party in parties}
+    roles = dict(Actor.objects.values_list('id', 'role'))
+    start = datetime.combine(date_from, time.min)
+    end = datetime.combine(date_to + timedelta(days=1), time.min)
+    # Meetings and late parties can reach past the range
+    start = min([start] + [interval.start for interval in intervals.values()])
+    end = max([end] + [interval.end for interval in intervals.values()])
+    schedule = ActorSchedule.load(start, end)
+    return Problem(parties, intervals, members, roles, schedule)
+
+
+def open_slots(party, members, roles, composition):
+    """The roles still to fill (``None`` for any role), role requirements first."""
+    open_count = max(party.number_of_actors - len(members), 0)
+    booked = Counter(roles.get(actor_id) for actor_id in members)
+    slots = []
+    for role in sorted(composition):
+        slots += [role] * max(composition[role] - booked[role], 0)
+    slots = slots[:open_count]
+    return slots + [None] * (open_count - len(slots))
+
+
+class Solver:
+    def __init__(self, problem, composition=None):
+        self.problem = problem
+        self.schedule = problem.schedule
+        self.composition = composition or {}
+        self.by_role = defaultdict(list)
+        for actor_id, role in sorted(problem.roles.items()):
+            self.by_role[role].append(actor_id)
+        self.everyone = sorted(problem.roles)
+        self.load = Counter({actor_id: len(intervals) for actor_id, intervals in self.schedule.intervals.items()})
+        # {party_id: {actor_id: slot role}} for the proposals
+        self.proposed = defaultdict(dict)
+
+    def candidates(self, role):
+        return self.by_role.get(role, []) if role is not None else self.everyone
+
+    def taken(self, party_id):
+        return self.problem.members[party_id] | self.proposed[party_id].keys()
+
+    def pick(self, party_id, role, exclude=()):
+        interval = self.problem.intervals[party_id]
+        taken = self.taken(party_id)
+        best = None
+        for actor_id in self.candidates(role):
+            if actor_id in taken or actor_id in exclude:
+                continue
+            key = (self.load[actor_id], actor_id)
+            if (best is None or key < best) and self.schedule.is_free(actor_id, interval.start, interval.end):
+                best = key
+        return best[1] if best else None
+
+    def book(self, party_id, actor_id, role):
+        self.proposed[party_id][actor_id] = role
+        self.schedule.add(actor_id, self.problem.intervals[party_id])
+        self.load[actor_id] += 1
+
+    def unbook(self, party_id, actor_id):
+        del self.proposed[party_id][actor_id]
+        self.schedule.remove(actor_id, self.problem.intervals[party_id])
+        self.load[actor_id] -= 1
+
+    def repair(self, party_id, role):
+        """Free an actor for ``party_id`` by handing one of their proposed slots to someone else."""
+        interval = self.problem.intervals[party_id]
+        taken = self.taken(party_id)
+        for actor_id in sorted(self.candidates(role), key=lambda actor_id: (self.load[actor_id], actor_id)):
+            if actor_id in taken:
+                continue
+            blocking = self.schedule.overlapping(actor_id, interval.start, interval.end)
+            if len(blocking) != 1 or actor_id not in self.proposed.get(blocking[0].party_id, {}):
+                continue
+            other = blocking[0].party_id
+            replacement = self.pick(other, self.proposed[other][actor_id], exclude=(actor_id,))
+            if replacement is None:
+                continue
+            other_role = self.proposed[other][actor_id]
+            self.unbook(other, actor_id)
+            self.book(other, replacement, other_role)
+            self.book(party_id, actor_id, role)
+            return True
+        return False
+
+    def solve(self):
+        unfilled = []
+        for party in self.problem.parties:
+            members = self.problem.members[party.pk]
+            for role in open_slots(party, members, self.problem.roles, self.composition):
+                actor_id = self.pick(party.pk, role)
+                if actor_id is None:
+                    unfilled.append((party.pk, role))
+                else:
+                    self.book(party.pk, actor_id, role)
+
+        missing = Counter()
+        for party_id, role in unfilled:
+            if not self.repair(party_id, role):
+                missing[party_id] += 1
+
+        return [
+            {
+                'party_id': party.pk,
+                'needed': party.number_of_actors,
+                'assigned': sorted(self.problem.members[party.pk]),
+                'proposed': sorted(self.proposed[party.pk]),
+                'missing': missing[party.pk],
+            }
+            for party in self.problem.parties
+        ]
+
+
+def solve(problem, composition=None):
+    """Return ``(proposals, load)``: per-party proposals and each actor's resulting load."""
+    solver = Solver(problem, composition)
+    proposals = solver.solve()
+    return proposals, {actor_id: solver.load[actor_id] for actor_id in solver.everyone}
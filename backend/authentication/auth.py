@@ -0,0 +1,202 @@
+"""
+JWT authentication for the API.
+
+``CachedJWTAuthentication`` resolves the user and their actor permissions in
+a single query, optionally served from a short-lived per-process cache.
+
+``StatelessJWTAuthentication`` (opt-in with ``JWT_STATELESS_AUTH``) trusts
+the actor id and permission flags embedded as claims at login and answers
+safe requests without touching the ``User`` table at all. The claims are
+checked against ``Actor.token_version``, which the default (per-process)
+cache only holds for ``JWT_TOKEN_VERSION_TTL`` seconds, so a permission
+change reaches every worker within that time. Refreshing checks the version
+in the database, so outdated claims are never copied into a new token.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core import routing
+
+from .models import Actor
+
+
+class UserCache:
+    """
+    Tiny thread-safe TTL cache of ``User`` rows (with ``actor_profile``
+    attached). Entries are evicted by signals whenever a User or Actor is
+    written, and the TTL bounds staleness across processes.
+    """
+    max_entries = 1000
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AUTH_USER_CACHE_TTL', 0)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        # Hand out copies so per-request mutations never leak between requests
+        return copy.deepcopy(entry[1])
+
+    def set(self, user_id, user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user_id] = (time.monotonic() + self.ttl, copy.deepcopy(user))
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                # select_related also caches a missing profile, so later
+                # hasattr(user, 'actor_profile') checks cost nothing
+                user = User.objects.select_related('actor_profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user_id, user)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+def _token_version_key(actor_id):
+    return f'actor:token-version:{actor_id}'
+
+
+def _token_version_ttl():
+    return getattr(settings, 'JWT_TOKEN_VERSION_TTL', 30)
+
+
+def load_token_version(actor_id):
+    # From the primary: a replica may lag behind a revocation
+    with routing.primary_reads():
+        return Actor.objects.filter(pk=actor_id).values_list('token_version', flat=True).first()
+
+
+def get_token_version(actor_id):
+    """Current ``Actor.token_version``, cached for ``JWT_TOKEN_VERSION_TTL`` seconds."""
+    version = cache.get(_token_version_key(actor_id))
+    if version is None:
+        version = load_token_version(actor_id)
+        if version is not None:
+            cache.set(_token_version_key(actor_id), version, timeout=_token_version_ttl())
+    return version
+
+
+def set_token_version(actor_id, version):
+    cache.set(_token_version_key(actor_id), version, timeout=_token_version_ttl())
+
+
+class ActorTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Embeds the actor id, permission flags and token version as claims."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.get_username()
+        token['is_staff'] = user.is_staff
+        actor = getattr(user, 'actor_profile', None)
+        token['actor_id'] = actor.pk if actor else None
+        token['perms'] = {field: getattr(actor, field) for field in Actor.PERMISSION_FIELDS} if actor else {}
+        token['tv'] = actor.token_version if actor else 0
+        return token
+
+
+class ActorTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuses refresh tokens whose permission claims are outdated."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        actor_id = refresh.get('actor_id')
+        if 'perms' in refresh and actor_id is not None and load_token_version(actor_id) != refresh.get('tv'):
+            raise AuthenticationFailed(
+                _("Permissions have changed, please sign in again."), code="token_outdated"
+            )
+        return super().validate(attrs)
+
+
+class ClaimsUser(TokenUser):
+    """A ``User`` stand-in built from token claims; see ``ActorTokenObtainPairSerializer``."""
+
+    @cached_property
+    def actor_profile(self):
+        if self.token.get('actor_id') is None:
+            raise User.actor_profile.RelatedObjectDoesNotExist('User has no actor_profile.')
+        # Unsaved stand-in: enough for permission checks and pk lookups
+        return Actor(pk=self.token['actor_id'], user_id=self.id, **self.token['perms'])
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    """
+    Authorizes safe (read) requests from claims only. Writes still load the
+    real ``User`` because they record it (e.g. ``Party.created_by``).
+    """
+
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if 'perms' not in validated_token:
+            # Issued before claims were embedded: fall back to the database
+            return self.get_user(validated_token), validated_token
+
+        actor_id = validated_token.get('actor_id')
+        if actor_id is not None and get_token_version(actor_id) != validated_token.get('tv'):
+            raise AuthenticationFailed(
+                _("Permissions have changed, please sign in again."), code="token_outdated"
+            )
+        return ClaimsUser(validated_token), validated_token
@@ -0,0 +1,142 @@
+"""
+Actor availability and booking conflicts.
+
+An actor is busy for a party from the earlier of its meeting and its start
+until the party ends; cancelled parties do not count. ``ActorSchedule``
+keeps each actor's busy intervals sorted by start, so "what overlaps
+[start, end)" is a bisect plus a short walk back, never a scan of the
+actor's history. Schedules are loaded for a time window with one query over
+the party/actor membership table, reaching back by the longest party
+duration on record.
+
+Party dates and times are local wall-clock values, so intervals are naive
+datetimes.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from django.db.models import Max, Q
+
+from .models import Party
+
+
+class Interval(NamedTuple):
+    start: datetime
+    end: datetime
+    party_id: int = 0  # 0 for a party that is not saved yet
+
+
+def busy_interval(date, time, duration, meeting_date, meeting_time, party_id=0):
+    start = datetime.combine(date, time)
+    meeting = datetime.combine(meeting_date, meeting_time)
+    return Interval(min(start, meeting), start + duration, party_id)
+
+
+def party_interval(party):
+    return busy_interval(party.date, party.time, party.duration, party.meeting_date, party.meeting_time, party.pk)
+
+
+class ActorSchedule:
+    """Busy intervals per actor, each list sorted by start."""
+
+    def __init__(self):
+        self.intervals = defaultdict(list)
+        # The longest interval bounds how far back an overlap can start
+        self.longest = timedelta(0)
+
+    @classmethod
+    def load(cls, start, end, actor_ids=None, exclude=()):
+        """
+        The bookings of ``actor_ids`` (every actor if ``None``) that may
+        overlap ``[start, end)``, leaving out the parties in ``exclude``.
+        """
+        schedule = cls()
+        # A party running into the window started at most the longest
+        # duration (plus its start time of day) before it
+        longest = Party.objects.exclude(status='cancelled').aggregate(longest=Max('duration'))['longest']
+        earliest = (start - (longest or timedelta(0)) - timedelta(days=1)).date()
+        memberships = Party.actors.through.objects.filter(
+            Q(party__date__lte=end.date()) | Q(party__meeting_date__lte=end.date()),
+            party__date__gte=earliest,
+        ).exclude(party__status='cancelled')
+        if actor_ids is not None:
+            memberships = memberships.filter(actor_id__in=list(actor_ids))
+        if exclude:
+            memberships = memberships.exclude(party_id__in=list(exclude))
+
+        rows = memberships.values_list(
+            'actor_id', 'party_id', 'party__date', 'party__time', 'party__duration',
+            'party__meeting_date', 'party__meeting_time',
+        )
+        for actor_id, party_id, *timing in rows.iterator(chunk_size=2000):
+            interval = busy_interval(*timing, party_id)
+            schedule.intervals[actor_id].append(interval)
+            schedule.longest = max(schedule.longest, interval.end - interval.start)
+        for intervals in schedule.intervals.values():
+            intervals.sort()
+        return schedule
+
+    def add(self, actor_id, interval):
+        insort(self.intervals[actor_id], interval)
+        self.longest = max(self.longest, interval.end - interval.start)
+
+    def remove(self, actor_id, interval):
+        intervals = self.intervals[actor_id]
+        intervals.pop(bisect_left(intervals, interval))
+
+    def overlapping(self, actor_id, start, end):
+        """The actor's intervals overlapping ``[start, end)``, in start order."""
+        intervals = self.intervals.get(actor_id, ())
+        # Everything from ``index`` on starts at or after ``end``
+        index = bisect_left(intervals, (end,))
+        found = []
+        earliest = start - self.longest
+        while index > 0 and intervals[index - 1].start >= earliest:
+            index -= 1
+            if intervals[index].end > start:
+                found.append(intervals[index])
+        found.reverse()
+        return found
+
+    def is_free(self, actor_id, start, end):
+        return not self.overlapping(actor_id, start, end)
+
+    def busy(self, actor_ids, start, end):
+        """The merged busy time of ``actor_ids`` within ``[start, end)``."""
+        intervals = sorted(
+            interval for actor_id in actor_ids for interval in self.overlapping(actor_id, start, end)
+        )
+        merged = []
+        for interval in intervals:
+            interval_start, interval_end = max(interval.start, start), min(interval.end, end)
+            if merged and interval_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], interval_end)
+            else:
+                merged.append([interval_start, interval_end])
+        return [Interval(interval_start, interval_end) for interval_start, interval_end in merged]
+
+    def free_slots(self, actor_ids, start, end, min_length=timedelta(0)):
+        """The gaps of ``[start, end)`` in which all ``actor_ids`` are free."""
+        slots, cursor = [], start
+        for interval in self.busy(actor_ids, start, end) + [Interval(end, end)]:
+            if interval.start - cursor >= max(min_length, timedelta.resolution):
+                slots.append(Interval(cursor, interval.start))
+            cursor = max(cursor, interval.end)
+        return slots
+
+
+def conflict_errors(schedule, actors, interval):
+    """Messages for the ``actors`` that ``schedule`` shows as busy during ``interval``."""
+    errors = []
+    for actor in actors:
+        overlapping = schedule.overlapping(actor.pk, interval.start, interval.end)
+        if overlapping:
+            booked = overlapping[0]
+            party = f'party #{booked.party_id}' if booked.party_id else 'another party of this request'
+            errors.append(
+                f'{actor} is already booked on {party} '
+                f'({booked.start:%Y-%m-%d %H:%M} - {booked.end:%Y-%m-%d %H:%M}).'
+            )
+    return errors
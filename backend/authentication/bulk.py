@@ -0,0 +1,207 @@
+"""
+Batch create / update / status-change of parties.
+
+Every operation is validated with ``PartySerializer`` first; only if all of
+them are valid are they written, together, in one transaction using bulk
+SQL. Because bulk writes bypass model signals, the search index, rollups,
+cache versions and live events are maintained here explicitly.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import availability, cache, events, rollups, search
+from .models import Actor, Party, Song
+from .serializers import PartySerializer, write_playlists
+
+ACTIONS = ('create', 'update', 'status')
+
+
+class PartyBatch:
+    max_operations = 500
+
+    def __init__(self, operations, queryset, context):
+        self.operations = operations
+        self.queryset = queryset
+        self.context = context
+        self.validated = []
+
+    def is_valid(self):
+        if not isinstance(self.operations, list) or not self.operations:
+            self.errors = {'operations': ['Expected a non-empty list of operations.']}
+            return False
+        if len(self.operations) > self.max_operations:
+            self.errors = {'operations': [f'At most {self.max_operations} operations per request.']}
+            return False
+
+        # Load every referenced party and actor up front: two queries in
+        # total instead of several per operation
+        ids = [
+            operation.get('id') for operation in self.operations
+            if isinstance(operation, dict) and operation.get('action') in ('update', 'status')
+        ]
+        instances = self.queryset.prefetch_related('actors').in_bulk([pk for pk in ids if isinstance(pk, int)])
+        actor_ids = {
+            actor_id
+            for operation in self.operations if isinstance(operation, dict)
+            and isinstance(operation.get('data'), dict) and isinstance(operation['data'].get('actor_ids'), list)
+            for actor_id in operation['data']['actor_ids'] if isinstance(actor_id, int)
+        }
+        self.context = dict(self.context, actors_by_id=Actor.objects.in_bulk(actor_ids), defer_bookings=True)
+
+        errors = []
+        seen = set()
+        for operation in self.operations:
+            error, validated = self.validate_operation(operation, instances, seen)
+            errors.append(error)
+            self.validated.append(validated)
+        self.validate_bookings(errors)
+
+        self.errors = {'errors': errors}
+        return not any(errors)
+
+    def validate_operation(self, operation, instances, seen):
+        if not isinstance(operation, dict) or operation.get('action') not in ACTIONS:
+            return {'action': [f"Expected one of: {', '.join(ACTIONS)}."]}, None
+
+        action = operation['action']
+        if action == 'create':
+            serializer = PartySerializer(data=operation.get('data', {}), context=self.context)
+        else:
+            instance = instances.get(operation.get('id'))
+            if instance is None:
+                return {'id': ['Party not found.']}, None
+            if instance.pk in seen:
+                return {'id': ['Party appears in more than one operation.']}, None
+            seen.add(instance.pk)
+            data = {'status': operation.get('status')} if action == 'status' else operation.get('data', {})
+            serializer = PartySerializer(instance, data=data, partial=True, context=self.context)
+
+        if not serializer.is_valid():
+            return serializer.errors, None
+        return {}, (action, serializer)
+
+    def validate_bookings(self, errors):
+        """
+        Check the actor bookings of every valid operation against the stored
+        ones and against each other, with one query for the whole batch.
+        """
+        bookings = []
+        for index, validated in enumerate(self.validated):
+            if validated is not None:
+                serializer = validated[1]
+                booking = serializer.get_booking(serializer.validated_data)
+                if booking is not None:
+                    bookings.append((index, *booking))
+        if not bookings:
+            return
+
+        schedule = availability.ActorSchedule.load(
+            min(interval.start for _, _, interval in bookings),
+            max(interval.end for _, _, interval in bookings),
+            {actor.pk for _, actors, _ in bookings for actor in actors},
+            # Their stored bookings are replaced by the new ones
+            exclude=[interval.party_id for _, _, interval in bookings if interval.party_id],
+        )
+        for index, actors, interval in bookings:
+            messages = availability.conflict_errors(schedule, actors, interval)
+            if messages:
+                errors[index] = {'actor_ids': messages}
+                self.validated[index] = None
+                continue
+            for actor in actors:
+                schedule.add(actor.pk, interval)
+
+    @transaction.atomic
+    def save(self, user):
+        now = timezone.now()
+        creates = [serializer for action, serializer in self.validated if action == 'create']
+        updates = [serializer for action, serializer in self.validated if action == 'update']
+        statuses = [serializer for action, serializer in self.validated if action == 'status']
+
+        touched = [serializer.instance.pk for serializer in updates + statuses]
+        with rollups.track(touched) as tracked:
+            created = self.create_parties(creates, user)
+            self.update_parties(updates, now)
+            self.change_statuses(statuses, now)
+            tracked.update(party.pk for party in created)
+
+        search.index_parties(tracked)
+        cache.bump_version(cache.PARTIES, cache.ACTORS)
+        events.party_changed([party.pk for party in created], events.CREATED)
+        events.party_changed([serializer.instance.pk for serializer in updates])
+        events.party_changed([serializer.instance.pk for serializer in statuses], events.STATUS)
+
+        created = iter(created)
+        results = []
+        for action, serializer in self.validated:
+            party = next(created) if action == 'create' else serializer.instance
+            results.append({'action': action, 'id': party.pk})
+        return results
+
+    def create_parties(self, serializers, user):
+        if not serializers:
+            return []
+        parties = []
+        for serializer in serializers:
+            data = dict(serializer.validated_data)
+            data.pop('actors', None)
+            data.pop('songs', None)
+            data.setdefault('status', 'pending')
+            parties.append(Party(created_by=user, **data))
+        parties = Party.objects.bulk_create(parties)
+
+        self.write_relations([
+            (party, serializer.validated_data.get('actors', []), serializer.validated_data.get('songs', []))
+            for party, serializer in zip(parties, serializers)
+        ])
+        return parties
+
+    def update_parties(self, serializers, now):
+        if not serializers:
+            return
+        fields = {'updated_at'}
+        relations = []
+        for serializer in serializers:
+            data = dict(serializer.validated_data)
+            actors = data.pop('actors', None)
+            songs = data.pop('songs', None)
+            for attr, value in data.items():
+                setattr(serializer.instance, attr, value)
+                fields.add(attr)
+            serializer.instance.updated_at = now
+            if actors is not None or songs is not None:
+                relations.append((serializer.instance, actors, songs))
+        Party.objects.bulk_update([serializer.instance for serializer in serializers], sorted(fields))
+
+        # Actors that were sent replace the stored ones wholesale; playlists
+        # are diffed as in a single update, so unchanged songs keep their ids
+        replace_actors = [party.pk for party, actors, _ in relations if actors is not None]
+        if replace_actors:
+            Party.actors.through.objects.filter(party_id__in=replace_actors).delete()
+        self.write_relations([(party, actors, None) for party, actors, _ in relations])
+        write_playlists([(party, songs) for party, _, songs in relations if songs is not None])
+
+    def change_statuses(self, serializers, now):
+        by_status = defaultdict(list)
+        for serializer in serializers:
+            serializer.instance.status = serializer.validated_data['status']
+            serializer.instance.updated_at = now
+            by_status[serializer.instance.status].append(serializer.instance.pk)
+        for status, ids in by_status.items():
+            Party.objects.filter(pk__in=ids).update(status=status, updated_at=now)
+
+    def write_relations(self, relations):
+        through = Party.actors.through
+        # An id sent twice is one membership, as with ``party.actors.set()``
+        through.objects.bulk_create([
+            through(party_id=party.pk, actor_id=actor_id)
+            for party, actors, _ in relations
+            for actor_id in dict.fromkeys(actor.pk for actor in actors or [])
+        ])
+        Song.objects.bulk_create([
+            Song(party_id=party.pk, title=song['title'], order=index)
+            for party, _, songs in relations
+            for index, song in enumerate(songs or [])
+        ])
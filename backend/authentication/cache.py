@@ -0,0 +1,46 @@
+"""
+Versioned cache namespaces.
+
+Cached values are stored under keys that embed the current version of the
+collections they depend on. A write bumps the version (see ``signals``), so
+stale entries are simply never read again and expire on their own.
+
+The versions live in the ``CACHE_VERSIONS_ALIAS`` cache, which must be
+shared by every process that shares any of the versioned entries.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+PARTIES = 'parties'
+ACTORS = 'actors'
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def _store():
+    return caches[getattr(settings, 'CACHE_VERSIONS_ALIAS', 'default')]
+
+
+def get_version(namespace):
+    cache = _store()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        cache.add(_version_key(namespace), 1, timeout=None)
+        version = cache.get(_version_key(namespace), 1)
+    return version
+
+
+def get_versions(*namespaces):
+    return '.'.join(str(get_version(namespace)) for namespace in namespaces)
+
+
+def bump_version(*namespaces):
+    cache = _store()
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            # Never read (or evicted): start over at a value nobody has seen
+            cache.add(_version_key(namespace), 2, timeout=None)
@@ -0,0 +1,131 @@
+"""
+Conditional GET (ETag / Last-Modified) for the read endpoints.
+
+Every response the API serves is derived from the party and actor tables, so
+one query reading ``MAX(updated_at)`` and ``COUNT(*)`` of both is enough to
+tell whether anything changed: writes touch ``updated_at`` (bulk writes set it
+explicitly) and deletions change the count. A few writes show in the
+payloads without touching either table (a renamed user, a song saved on its
+own); they bump the ``cache`` versions, which go into the ETag as well.
+Unchanged requests are answered with ``304 Not Modified`` before any
+queryset or serializer runs.
+"""
+import hashlib
+from contextlib import contextmanager
+from datetime import timezone as dt_timezone
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+from core import routing
+
+from . import cache
+from .models import Actor, Party
+from .permissions import get_actor
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def collection_state(alias=None):
+    """
+    Return ``(last_modified, fingerprint)`` for parties and actors in one
+    query, on the database the request reads from unless ``alias`` is given.
+    """
+    connection = connections[alias or routing.read_alias()]
+    selects = []
+    for model in (Party, Actor):
+        table = connection.ops.quote_name(model._meta.db_table)
+        selects += [f'(SELECT MAX(updated_at) FROM {table})', f'(SELECT COUNT(*) FROM {table})']
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(selects)}")
+        row = cursor.fetchone()
+
+    stamps = [_as_datetime(value) for value in row[0::2] if value is not None]
+    return max(stamps, default=None), ':'.join(str(value) for value in row)
+
+
+def request_state(request):
+    """``collection_state()`` for ``request``, queried once per read alias."""
+    alias = routing.read_alias()
+    states = request.__dict__.setdefault('_collection_states', {})
+    if alias not in states:
+        states[alias] = collection_state(alias)
+    return states[alias]
+
+
+@contextmanager
+def current_reads():
+    """
+    Reads for filling a cache entry. A replica that has not caught up with
+    the primary would fill it with old data, so the block then reads from
+    the primary.
+    """
+    alias = routing.read_alias()
+    if alias == DEFAULT_DB_ALIAS or collection_state(alias) == collection_state(DEFAULT_DB_ALIAS):
+        yield
+    else:
+        with routing.primary_reads():
+            yield
+
+
+def _as_datetime(value):
+    # SQLite hands back the stored text, other backends a datetime
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value
+
+
+def requester_scope(request):
+    """What, besides the data, changes the response: who asks and with which flags."""
+    actor = get_actor(request)
+    if actor is None:
+        return f'user:{request.user.pk}:{request.user.is_staff}'
+    flags = ''.join('1' if getattr(actor, field) else '0' for field in Actor.PERMISSION_FIELDS)
+    return f'actor:{actor.pk}:{flags}'
+
+
+def serve(request, render, *scope):
+    """
+    Answer ``request`` with ``render()`` unless the client's copy is current.
+
+    ``scope`` lists extra values the response depends on (e.g. today's date
+    for the dashboard).
+    """
+    if request.method not in SAFE_METHODS:
+        return render()
+
+    last_modified, fingerprint = request_state(request)
+    versions = cache.get_versions(cache.PARTIES, cache.ACTORS)
+    parts = [fingerprint, versions, requester_scope(request), request.get_full_path(), *map(str, scope)]
+    etag = '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(timestamp)
+    else:
+        response['ETag'] = etag
+
+    # Responses are per user: browsers may keep them but must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalGetMixin:
+    """Adds conditional GET to the ``list`` and ``retrieve`` actions of a viewset."""
+
+    def list(self, request, *args, **kwargs):
+        return serve(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return serve(request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
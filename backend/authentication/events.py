@@ -0,0 +1,260 @@
+"""
+Real-time party events, pushed to clients as server-sent events.
+
+Model signals (and ``PartyBatch``) call ``party_changed`` / ``party_deleted``;
+the changes of one transaction are coalesced per party and published once it
+commits, so a rolled-back write never produces an event. Events go through a
+broker chosen by ``PARTY_EVENTS_BROKER``. The default ``InMemoryBroker``
+fans out to the streams of the current process, which is enough for a single
+ASGI worker; a multi-process deployment plugs in a broker backed by a shared
+channel (e.g. Redis pub/sub) with the same two methods.
+
+Each event carries the party's status and actor ids, so every stream can
+apply ``Party.visible_with`` for its own actor without a query.
+"""
+import asyncio
+import json
+import threading
+import weakref
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+
+from .models import Actor, Party
+from .serializers import PartyCalendarSerializer
+
+CREATED = 'party.created'
+UPDATED = 'party.updated'
+STATUS = 'party.status'
+DELETED = 'party.deleted'
+
+# When several writes hit a party in one transaction, the strongest wins
+_PRECEDENCE = {UPDATED: 0, STATUS: 1, CREATED: 2, DELETED: 3}
+
+
+class Subscription:
+    """One stream's queue; ``get`` returns ``None`` once the stream fell behind."""
+
+    def __init__(self, broker, maxsize):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client is too slow: stop feeding it and ask it to reload
+            self.overflowed = True
+            self.broker.unsubscribe(self)
+
+    async def get(self, timeout):
+        if self.overflowed and self.queue.empty():
+            return None
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def publish(self, events):
+        raise NotImplementedError
+
+    def subscribe(self):
+        """Return a ``Subscription``; must be called from the stream's event loop."""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        pass
+
+    def has_subscribers(self):
+        """Lets publishers skip building events nobody will receive."""
+        return True
+
+
+class InMemoryBroker(Broker):
+    queue_size = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def publish(self, events):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            for event in events:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+    def subscribe(self):
+        subscription = Subscription(self, self.queue_size)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        with self.lock:
+            return bool(self.subscriptions)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(
+                getattr(settings, 'PARTY_EVENTS_BROKER', 'authentication.events.InMemoryBroker')
+            )()
+        return _broker
+
+
+def is_visible(event, actor, is_staff=False):
+    """Apply the ``Party.is_visible_to_actor`` rules to an event."""
+    if actor is None:
+        return is_staff
+    return Party.visible_with(actor, event['status'], actor.pk in event['actor_ids'])
+
+
+class _PendingEvents:
+    def __init__(self):
+        self.kinds = {}
+        self.deleted = {}
+
+    def add(self, party_id, kind):
+        current = self.kinds.get(party_id)
+        if current is None or _PRECEDENCE[kind] > _PRECEDENCE[current]:
+            self.kinds[party_id] = kind
+
+    def flush(self):
+        reference = getattr(_local, 'pending', None)
+        if reference is not None and reference() is self:
+            _local.pending = None
+        broker = get_broker()
+        deleted = [
+            dict(self.deleted[party_id], type=DELETED, id=party_id, party=None)
+            for party_id, kind in self.kinds.items() if kind == DELETED
+        ]
+        live = {party_id: kind for party_id, kind in self.kinds.items() if kind != DELETED}
+        broker.publish(build_events(live) + deleted)
+
+
+_local = threading.local()
+
+
+def _pending():
+    """
+    The events of the current transaction. The on-commit callback holds the
+    only strong reference to them, so when a rollback discards the callback
+    they go too, and the next transaction starts a fresh set.
+    """
+    reference = getattr(_local, 'pending', None)
+    pending = reference() if reference is not None else None
+    if pending is None:
+        pending = _PendingEvents()
+        _local.pending = weakref.ref(pending)
+        # A failing publish must not fail the write that already committed
+        transaction.on_commit(pending.flush, robust=True)
+    return pending
+
+
+def party_changed(party_ids, kind=UPDATED):
+    if not get_broker().has_subscribers():
+        return
+    if not connection.in_atomic_block:
+        get_broker().publish(build_events({party_id: kind for party_id in party_ids}))
+        return
+    pending = _pending()
+    for party_id in party_ids:
+        pending.add(party_id, kind)
+
+
+def party_deleted(party, actor_ids):
+    """Call before the delete: the party's status and actors are needed for visibility."""
+    if not get_broker().has_subscribers():
+        return
+    snapshot = {'status': party.status, 'actor_ids': list(actor_ids)}
+    if not connection.in_atomic_block:
+        get_broker().publish([dict(snapshot, type=DELETED, id=party.pk, party=None)])
+        return
+    pending = _pending()
+    pending.deleted[party.pk] = snapshot
+    pending.add(party.pk, DELETED)
+
+
+def build_events(kinds):
+    """Build events for ``{party_id: kind}`` from the committed rows (two queries)."""
+    if not kinds:
+        return []
+    fields = [field for field in PartyCalendarSerializer.Meta.fields if field != 'actors']
+    parties = Party.objects.filter(pk__in=list(kinds)).only(*fields).prefetch_related(
+        Prefetch('actors', queryset=Actor.objects.only('id', 'name', 'family')),
+    ).order_by('pk')
+    return [
+        {
+            'type': kinds[party.pk],
+            'id': party.pk,
+            'status': party.status,
+            'actor_ids': [actor.pk for actor in party.actors.all()],
+            'party': PartyCalendarSerializer(party).data,
+        }
+        for party in parties
+    ]
+
+
+def format_event(event):
+    data = json.dumps({'id': event['id'], 'party': event['party']}, cls=DjangoJSONEncoder)
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+class EventStream:
+    """
+    The body of one SSE response: visible events plus keep-alive comments.
+    Django calls ``close`` when the response ends, including when the client
+    went away, which drops the subscription.
+    """
+
+    def __init__(self, actor, is_staff):
+        self.actor = actor
+        self.is_staff = is_staff
+        self.subscription = None
+
+    def __aiter__(self):
+        return self.events()
+
+    async def events(self):
+        heartbeat = getattr(settings, 'PARTY_EVENTS_HEARTBEAT', 15)
+        self.subscription = get_broker().subscribe()
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await self.subscription.get(heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event is None:
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                if is_visible(event, self.actor, self.is_staff):
+                    yield format_event(event)
+        finally:
+            self.close()
+
+    def close(self):
+        if self.subscription is not None:
+            self.subscription.close()
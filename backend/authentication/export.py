@@ -0,0 +1,180 @@
+"""
+Streaming CSV / XLSX export of parties.
+
+Rows are produced from ``QuerySet.iterator(chunk_size=...)`` (actors and
+songs are prefetched per chunk) and written out as they come, so memory
+stays bounded by one chunk however many parties are exported. The XLSX
+workbook is assembled as a zip stream: a single worksheet with inline
+strings, which needs no spreadsheet library.
+"""
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+COLUMNS = (
+    ('date', 'Date'),
+    ('day', 'Day'),
+    ('time', 'Time'),
+    ('duration', 'Duration'),
+    ('place', 'Place'),
+    ('event', 'Event'),
+    ('status', 'Status'),
+    ('actors', 'Actors'),
+    ('songs', 'Songs'),
+    ('meeting_date', 'Meeting date'),
+    ('meeting_time', 'Meeting time'),
+    ('meeting_place', 'Meeting place'),
+    ('transport_vehicle', 'Transport'),
+    ('camera_man', 'Camera man'),
+    ('dress_details', 'Dress details'),
+    ('notes', 'Notes'),
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def format_duration(value):
+    minutes = int(value.total_seconds() // 60)
+    return f'{minutes // 60}:{minutes % 60:02d}'
+
+
+def party_row(party):
+    values = {
+        'date': party.date.isoformat(),
+        'day': party.day,
+        'time': party.time.strftime('%H:%M'),
+        'duration': format_duration(party.duration),
+        'place': party.place,
+        'event': party.event,
+        'status': party.get_status_display(),
+        'actors': '; '.join(str(actor) for actor in party.actors.all()),
+        'songs': '; '.join(song.title for song in party.songs.all()),
+        'meeting_date': party.meeting_date.isoformat(),
+        'meeting_time': party.meeting_time.strftime('%H:%M'),
+        'meeting_place': party.meeting_place,
+        'transport_vehicle': party.transport_vehicle,
+        'camera_man': party.camera_man,
+        'dress_details': party.dress_details,
+        'notes': party.notes,
+    }
+    return [values[key] for key, _ in COLUMNS]
+
+
+def rows(parties):
+    yield [title for _, title in COLUMNS]
+    for party in parties:
+        yield party_row(party)
+
+
+class _Buffer:
+    """Collects what a writer writes so the generator can hand it on."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8') for chunk in self.chunks)
+        self.chunks = []
+        return data
+
+
+# Spreadsheets run CSV cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """A leading quote keeps text from being read as a formula."""
+    return f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+
+
+def stream_csv(rows, batch=100):
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    # The BOM makes Excel read the file (Arabic names included) as UTF-8
+    buffer.write('﻿')
+    for count, row in enumerate(rows, 1):
+        writer.writerow([csv_cell(value) for value in row])
+        if count % batch == 0:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Parties" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _cell(value):
+    text = _INVALID_XML.sub('', str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def stream_xlsx(rows, batch=100):
+    buffer = _Buffer()
+    # zipfile writes to unseekable streams using data descriptors
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for count, row in enumerate(rows, 1):
+                sheet.write(f"<row>{''.join(_cell(value) for value in row)}</row>".encode('utf-8'))
+                if count % batch == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+STREAMERS = {'csv': stream_csv, 'xlsx': stream_xlsx}
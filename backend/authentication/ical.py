@@ -0,0 +1,188 @@
+"""
+iCalendar (``.ics``) feeds of parties and their meetings.
+
+Calendar apps cannot log in, so a feed URL carries a signed token naming
+the user (``feed_token``); it stops working when the user's password
+changes. An actor's feed holds the parties visible to them
+(``PartyQuerySet.visible_to``), a staff user without an actor gets every
+party.
+
+Apps poll feeds every few minutes, so a request costs one query for the
+``(id, updated_at)`` pairs of the feed when nothing changed (answered with
+``304`` through the ETag) and only re-renders the parties whose
+``updated_at`` moved: each party's VEVENTs are cached under a key holding
+that timestamp.
+
+Party dates and times are local wall-clock values, so events use floating
+times (no ``Z``, no ``TZID``): calendar apps show them at the hour they were
+entered. ``DTSTAMP`` is a real instant and stays in UTC.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import caches
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import Actor, Party
+
+SALT = 'authentication.ical'
+PRODID = '-//Ayat//Event Management//EN'
+UID_DOMAIN = 'ayat-event-management'
+MEETING_DURATION = timedelta(minutes=30)
+EVENT_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _password_key(user):
+    return salted_hmac(SALT, user.password).hexdigest()[:16]
+
+
+def feed_token(user):
+    return signing.dumps({'u': user.pk, 'k': _password_key(user)}, salt=SALT)
+
+
+def feed_user(token):
+    """The active user a token was issued to, or ``None``."""
+    try:
+        payload = signing.loads(token, salt=SALT)
+        user = User.objects.select_related('actor_profile').get(pk=payload['u'], is_active=True)
+    except (signing.BadSignature, User.DoesNotExist, KeyError, TypeError):
+        return None
+    if not constant_time_compare(payload.get('k', ''), _password_key(user)):
+        return None
+    return user
+
+
+def feed_parties(actor):
+    """The feed's parties: from ``CALENDAR_FEED_PAST_DAYS`` ago onwards."""
+    past_days = getattr(settings, 'CALENDAR_FEED_PAST_DAYS', 90)
+    queryset = Party.objects.filter(date__gte=timezone.localdate() - timedelta(days=past_days))
+    if actor is not None:
+        queryset = queryset.visible_to(actor)
+    return queryset.order_by('date', 'time', 'pk')
+
+
+def escape_text(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Split a content line into 75-octet pieces without breaking a character."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    pieces, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Step back off UTF-8 continuation bytes
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        pieces.append(encoded[start:end].decode('utf-8'))
+        start, limit = end, 74  # continuation lines start with a space
+    return '\r\n '.join(pieces)
+
+
+def utc_stamp(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def floating_stamp(moment):
+    return moment.strftime('%Y%m%dT%H%M%S')
+
+
+def vevent(uid, stamp, start, end, summary, location, description='', cancelled=False):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{UID_DOMAIN}',
+        f'DTSTAMP:{utc_stamp(stamp)}',
+        # Lets calendar apps tell a newer copy from an older one
+        f'SEQUENCE:{int(stamp.timestamp())}',
+        f'DTSTART:{floating_stamp(start)}',
+        f'DTEND:{floating_stamp(end)}',
+        f'SUMMARY:{escape_text(summary)}',
+        f'LOCATION:{escape_text(location)}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{escape_text(description)}')
+    lines += [f"STATUS:{'CANCELLED' if cancelled else 'CONFIRMED'}", 'END:VEVENT']
+    return ''.join(fold(line) + '\r\n' for line in lines)
+
+
+def render_party(party):
+    """The party's VEVENT followed by its meeting's."""
+    start = datetime.combine(party.date, party.time)
+    cancelled = party.status == 'cancelled'
+    details = [
+        ('Actors', ', '.join(str(actor) for actor in party.actors.all())),
+        ('Dress', party.dress_details),
+        ('Transport', party.transport_vehicle),
+        ('Camera', party.camera_man),
+        ('Notes', party.notes),
+    ]
+    description = '\n'.join(f'{label}: {value}' for label, value in details if value)
+    summary = f'{party.event} at {party.place}'
+
+    meeting = datetime.combine(party.meeting_date, party.meeting_time)
+    return vevent(
+        f'party-{party.pk}', party.updated_at, start, start + party.duration,
+        summary, party.place, description, cancelled,
+    ) + vevent(
+        f'party-{party.pk}-meeting', party.updated_at, meeting, meeting + MEETING_DURATION,
+        f'Meeting: {summary}', party.meeting_place, cancelled=cancelled,
+    )
+
+
+# Bumped whenever the VEVENT output changes, so old renderings are not served
+EVENT_FORMAT = 2
+
+
+def event_key(pk, updated_at):
+    return f'ical:party:{EVENT_FORMAT}:{pk}:{updated_at.timestamp()}'
+
+
+def render_events(rows):
+    """
+    VEVENTs for ``[(pk, updated_at), ...]``, in order, reading only the
+    parties that changed since they were cached.
+    """
+    store = caches['default']
+    keys = [event_key(pk, updated_at) for pk, updated_at in rows]
+    cached = store.get_many(keys)
+
+    missing = [pk for (pk, _), key in zip(rows, keys) if key not in cached]
+    if missing:
+        parties = Party.objects.filter(pk__in=missing).prefetch_related(
+            Prefetch('actors', queryset=Actor.objects.only('id', 'name', 'family')),
+        )
+        rendered = {event_key(party.pk, party.updated_at): render_party(party) for party in parties}
+        store.set_many(rendered, timeout=EVENT_TIMEOUT)
+        cached.update(rendered)
+
+    # A party saved between the two queries is picked up on the next poll
+    return [cached[key] for key in keys if key in cached]
+
+
+def fingerprint(rows, *scope):
+    parts = [*map(str, scope)] + [f'{pk}:{updated_at.timestamp()}' for pk, updated_at in rows]
+    return '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def calendar(name, events):
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+        'X-PUBLISHED-TTL:PT15M',
+    ]
+    return ''.join(fold(line) + '\r\n' for line in header) + ''.join(events) + 'END:VCALENDAR\r\n'
@@ -0,0 +1,71 @@
+import gzip
+
+from core.middleware import BROTLI_QUALITY, brotli
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from ...models import Actor, Party
+from ...renderers import FastJSONRenderer, orjson
+from ...serializers import PartyListSerializer, PartySerializer
+from ..seed import best_of, seed_actors, seed_parties
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed parties inside a rolled-back transaction and compare render time and payload '
+        'size of party list pages across serializers, JSON renderers and encodings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parties', type=int, default=500, help='Parties per page.')
+        parser.add_argument('--actors', type=int, default=50)
+        parser.add_argument('--songs', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            admin = User.objects.create(username='bench_admin')
+            seed_parties(options['parties'], seed_actors(options['actors']), admin, songs=options['songs'])
+            self.report(options['repeat'])
+            transaction.set_rollback(True)
+
+    def payloads(self):
+        base = Party.objects.select_related('created_by').prefetch_related('songs')
+        full = base.prefetch_related(
+            Prefetch('actors', queryset=Actor.objects.select_related('user').with_party_counts())
+        )
+        compact = base.prefetch_related(Prefetch('actors', queryset=Actor.objects.only('id', 'name', 'family')))
+        return {
+            'full (PartySerializer)': PartySerializer(full, many=True).data,
+            'compact (PartyListSerializer)': PartyListSerializer(compact, many=True).data,
+        }
+
+    def report(self, repeat):
+        renderers = {'json': JSONRenderer()}
+        if orjson is not None:
+            renderers['orjson'] = FastJSONRenderer()
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed; only the stdlib renderer is measured.'))
+
+        for name, data in self.payloads().items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            for renderer_name, renderer in renderers.items():
+                ms = best_of(lambda: renderer.render(data), repeat)
+                self.stdout.write(f'  render with {renderer_name:<6} {ms:8.2f} ms')
+
+            body = renderers['json'].render(data)
+            self.stdout.write(f'  identity {len(body):>10} bytes')
+            gzipped = gzip.compress(body, compresslevel=6)
+            self.stdout.write(
+                f'  gzip     {len(gzipped):>10} bytes ({len(gzipped) / len(body):.0%}), '
+                f'{best_of(lambda: gzip.compress(body, compresslevel=6), repeat):.2f} ms'
+            )
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+                self.stdout.write(
+                    f'  brotli   {len(compressed):>10} bytes ({len(compressed) / len(body):.0%}), '
+                    f'{best_of(lambda: brotli.compress(body, quality=BROTLI_QUALITY), repeat):.2f} ms'
+                )
@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+from statistics import mean, pstdev
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ... import assignment
+from ..seed import best_of, seed_actors, seed_parties
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a season of pending parties and existing bookings inside a rolled-back transaction, '
+        'then time loading and solving the actor assignment problem.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parties', type=int, default=400, help='Pending parties to staff.')
+        parser.add_argument('--booked', type=int, default=200, help='Parties already staffed in the season.')
+        parser.add_argument('--actors', type=int, default=100)
+        parser.add_argument('--actors-per-party', type=int, default=3)
+        parser.add_argument('--days', type=int, default=120, help='Length of the season.')
+        parser.add_argument('--roles', default='Singer:1', help='Composition per party, e.g. Singer:1,Drummer:1.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        start = date(2030, 6, 1)
+        end = start + timedelta(days=options['days'] - 1)
+        composition = {
+            role: int(count)
+            for role, _, count in (item.rpartition(':') for item in options['roles'].split(',') if item)
+        }
+        with transaction.atomic():
+            admin = User.objects.create(username='bench_admin')
+            actors = seed_actors(options['actors'])
+            seed_parties(options['booked'], actors, admin, start=start, days=options['days'],
+                         actors_per_party=options['actors_per_party'], statuses=['in_progress'], seed=1)
+            seed_parties(options['parties'], [], admin, start=start, days=options['days'],
+                         actors_per_party=options['actors_per_party'], statuses=['pending'], seed=2)
+            self.report(start, end, composition, options['repeat'])
+            transaction.set_rollback(True)
+
+    def report(self, start, end, composition, repeat):
+        problem = assignment.load_problem(start, end)
+        self.stdout.write(
+            f'{len(problem.parties)} pending parties, {len(problem.roles)} actors, '
+            f'{sum(len(intervals) for intervals in problem.schedule.intervals.values())} bookings in the window'
+        )
+        self.stdout.write(f'  load problem  {best_of(lambda: assignment.load_problem(start, end), repeat):8.2f} ms')
+        # Solving books proposals into the schedule, so each run gets a fresh copy
+        solve = lambda: assignment.solve(assignment.load_problem(start, end), composition)
+        self.stdout.write(f'  load + solve  {best_of(solve, repeat):8.2f} ms')
+
+        proposals, load = assignment.solve(problem, composition)
+        slots = sum(proposal['needed'] - len(proposal['assigned']) for proposal in proposals)
+        unfilled = sum(proposal['missing'] for proposal in proposals)
+        values = list(load.values())
+        self.stdout.write(f'  filled        {slots - unfilled} / {slots} slots')
+        self.stdout.write(
+            f'  load          min {min(values)}, max {max(values)}, mean {mean(values):.1f}, '
+            f'stdev {pstdev(values):.2f}'
+        )
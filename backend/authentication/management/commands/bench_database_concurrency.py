@@ -0,0 +1,164 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time as timer
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.database import pragma_statements
+
+SCHEMA = '''
+CREATE TABLE party (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    place TEXT NOT NULL,
+    status TEXT NOT NULL,
+    notes TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX party_date ON party (date);
+CREATE TABLE party_log (id INTEGER PRIMARY KEY, party_id INTEGER NOT NULL, changed_at REAL NOT NULL);
+'''
+
+STATUSES = ('pending', 'in_progress', 'done', 'cancelled')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Worker(threading.Thread):
+    """Runs ``step`` on its own connection until the deadline, timing each call."""
+
+    def __init__(self, path, pragmas, step, deadline, seed):
+        super().__init__(daemon=True)
+        self.path, self.pragmas, self.step, self.deadline = path, pragmas, step, deadline
+        self.random = random.Random(seed)
+        self.timings, self.errors = [], 0
+
+    def run(self):
+        # The same connection settings as Django's sqlite3 backend
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        for statement in pragma_statements(self.pragmas):
+            connection.execute(statement)
+        while timer.perf_counter() < self.deadline:
+            started = timer.perf_counter()
+            try:
+                self.step(connection, self.random)
+            except sqlite3.OperationalError:  # "database is locked"
+                self.errors += 1
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                continue
+            self.timings.append((timer.perf_counter() - started) * 1000)
+        connection.close()
+
+
+def read(connection, rng):
+    """A schedule page: the count and the first page of a month window."""
+    start = (date(2030, 1, 1) + timedelta(days=rng.randrange(330))).isoformat()
+    end = (date.fromisoformat(start) + timedelta(days=30)).isoformat()
+    connection.execute('SELECT COUNT(*) FROM party WHERE date BETWEEN ? AND ?', (start, end)).fetchone()
+    connection.execute(
+        'SELECT * FROM party WHERE date BETWEEN ? AND ? ORDER BY date, id LIMIT 50', (start, end)
+    ).fetchall()
+
+
+def make_write(rows):
+    def write(connection, rng):
+        """A party save: the row and its change log entry in one transaction."""
+        party_id = rng.randrange(1, rows + 1)
+        connection.execute('BEGIN')
+        connection.execute(
+            'UPDATE party SET status = ?, updated_at = ? WHERE id = ?',
+            (rng.choice(STATUSES), timer.time(), party_id),
+        )
+        connection.execute('INSERT INTO party_log (party_id, changed_at) VALUES (?, ?)', (party_id, timer.time()))
+        connection.execute('COMMIT')
+    return write
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent readers and writers against a scratch SQLite file, once with '
+        "SQLite's defaults (rollback journal, synchronous=FULL) and once with SQLITE_PRAGMAS, "
+        'and compare throughput, latency and "database is locked" errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument('--rows', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': {},
+            'tuned': getattr(settings, 'SQLITE_PRAGMAS', {}),
+        }
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, {options['seconds']:g}s per profile, "
+            f"{options['rows']} parties"
+        )
+        self.stdout.write(
+            f"{'profile':<10}{'reads/s':>10}{'writes/s':>10}{'read p50':>10}{'read p95':>10}"
+            f"{'write p95':>11}{'locked':>8}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas in profiles.items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self.seed(path, pragmas, options['rows'])
+                self.report(name, self.run(path, pragmas, options))
+
+    def seed(self, path, pragmas, rows):
+        connection = sqlite3.connect(path, isolation_level=None)
+        for statement in pragma_statements(pragmas):
+            connection.execute(statement)
+        connection.executescript(SCHEMA)
+        rng = random.Random(0)
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO party (date, place, status, notes, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (
+                (
+                    (date(2030, 1, 1) + timedelta(days=rng.randrange(365))).isoformat(),
+                    f'Hall {rng.randrange(40)}', rng.choice(STATUSES), 'x' * rng.randrange(200), 0.0,
+                )
+                for _ in range(rows)
+            ),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, pragmas, options):
+        deadline = timer.perf_counter() + options['seconds']
+        write = make_write(options['rows'])
+        readers = [Worker(path, pragmas, read, deadline, seed) for seed in range(options['readers'])]
+        writers = [Worker(path, pragmas, write, deadline, 1000 + seed) for seed in range(options['writers'])]
+        started = timer.perf_counter()
+        for worker in readers + writers:
+            worker.start()
+        for worker in readers + writers:
+            worker.join()
+        elapsed = timer.perf_counter() - started
+        return {
+            'elapsed': elapsed,
+            'reads': [timing for worker in readers for timing in worker.timings],
+            'writes': [timing for worker in writers for timing in worker.timings],
+            'errors': sum(worker.errors for worker in readers + writers),
+        }
+
+    def report(self, name, result):
+        reads, writes, elapsed = result['reads'], result['writes'], result['elapsed']
+        self.stdout.write(
+            f"{name:<10}{len(reads) / elapsed:>10.0f}{len(writes) / elapsed:>10.0f}"
+            f"{percentile(reads, 0.5):>8.2f}ms{percentile(reads, 0.95):>8.2f}ms"
+            f"{percentile(writes, 0.95):>9.2f}ms{result['errors']:>8}"
+        )
@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from ...models import Actor, Party
+from ..seed import best_of, seed_actors, seed_parties
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed parties inside a rolled-back transaction and compare query plans and '
+        'timings of the hot Party/Actor queries without and with the model indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parties', type=int, default=100000)
+        parser.add_argument('--actors', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['parties'], options['actors'])
+            indexes = [(model, index) for model in (Party, Actor) for index in model._meta.indexes]
+
+            self.toggle_indexes(indexes, create=False)
+            before = self.measure(options['repeat'])
+            self.toggle_indexes(indexes, create=True)
+            after = self.measure(options['repeat'])
+
+            self.report(before, after)
+            transaction.set_rollback(True)
+
+    def seed(self, parties, actors):
+        self.stdout.write(f'Seeding {parties} parties and {actors} actors...')
+        admin = User.objects.create(username='bench_admin')
+        # Nine years of history and one year of upcoming bookings
+        start = date.today() - timedelta(days=9 * 365)
+        seed_parties(parties, seed_actors(actors), admin, start=start, days=10 * 365)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def queries(self):
+        today = date.today()
+        month_start = today.replace(day=1)
+        return {
+            'dashboard upcoming count': lambda: Party.objects.filter(
+                date__gte=today, status__in=['pending', 'in_progress']
+            ).order_by(),
+            'status filter, first page': lambda: Party.objects.filter(
+                status='pending'
+            ).order_by('-date', '-time', '-id')[:100],
+            'calendar month window': lambda: Party.objects.filter(
+                date__gte=month_start, date__lte=month_start + timedelta(days=30)
+            ).order_by('date', 'time'),
+            'actor list, first page': lambda: Actor.objects.order_by('name', 'id')[:100],
+        }
+
+    def measure(self, repeat):
+        results = {}
+        for name, build in self.queries().items():
+            if name == 'dashboard upcoming count':
+                run = lambda build=build: build().count()
+            else:
+                run = lambda build=build: list(build())
+            results[name] = {
+                'plan': build().explain(),
+                'ms': best_of(run, repeat),
+            }
+        return results
+
+    def toggle_indexes(self, indexes, create):
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                if create:
+                    cursor.execute(str(index.create_sql(model, schema_editor)))
+                else:
+                    cursor.execute(str(index.remove_sql(model, schema_editor)))
+            cursor.execute('ANALYZE')
+
+    def report(self, before, after):
+        for name in before:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(f"  without indexes: {before[name]['ms']:.2f} ms")
+            for line in before[name]['plan'].splitlines():
+                self.stdout.write(f'    {line}')
+            self.stdout.write(f"  with indexes:    {after[name]['ms']:.2f} ms")
+            for line in after[name]['plan'].splitlines():
+                self.stdout.write(f'    {line}')
+            speedup = before[name]['ms'] / after[name]['ms'] if after[name]['ms'] else float('inf')
+            self.stdout.write(self.style.SUCCESS(f'  speedup: {speedup:.1f}x'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...models import PartyTombstone
+from ... import sync
+
+
+class Command(BaseCommand):
+    help = 'Delete party tombstones older than PARTY_TOMBSTONE_RETENTION_DAYS.'
+
+    def handle(self, *args, **options):
+        # Cursors from before the cutoff are refused with 410, so nothing
+        # that is still readable loses its deletions
+        deleted, _ = PartyTombstone.objects.filter(deleted_at__lt=timezone.now() - sync.retention()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-month and per-actor party statistics, or check them with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the stored rollups with the source tables and exit non-zero on drift.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = rollups.check()
+            for (actor_id, month, status), (stored, expected) in sorted(drift.items(), key=str):
+                scope = 'all actors' if actor_id is None else f'actor {actor_id}'
+                self.stdout.write(f'{scope} {month:%Y-%m} {status}: stored {stored}, expected {expected}')
+            if drift:
+                raise CommandError(f'{len(drift)} rollup bucket(s) out of date; run rebuild_party_stats.')
+            self.stdout.write(self.style.SUCCESS('Party statistics are consistent.'))
+            return
+
+        buckets = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} party statistics buckets.'))
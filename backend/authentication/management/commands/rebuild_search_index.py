@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import SearchDocument
+from ... import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the party/actor full-text search documents from scratch.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {SearchDocument.objects.count()} documents with {type(search.get_backend()).__name__}.'
+        ))
@@ -0,0 +1,87 @@
+"""
+Helpers shared by the benchmark management commands.
+
+The seeders write with ``bulk_create`` so 100k parties take seconds, and the
+commands run them inside a transaction that is rolled back afterwards.
+"""
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+from django.contrib.auth.models import User
+
+from ..models import Actor, Party, Song
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PLACES = ['Grand Hall', 'Rose Garden', 'قاعة الأفراح', 'Beach Club', 'فندق النخيل', 'Palace']
+ROLES = ['Singer', 'Drummer', 'Dancer', 'Host']
+STATUSES = [status for status, _ in Party.PARTY_STATUS]
+
+
+def seed_actors(count, prefix='bench'):
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}_actor_{index}', first_name=f'Actor{index}', last_name='Bench')
+        for index in range(count)
+    ])
+    if users and users[0].pk is None:
+        users = list(User.objects.filter(username__startswith=f'{prefix}_actor_').order_by('id'))
+    return Actor.objects.bulk_create([
+        Actor(user=user, name=f'Actor{index}', family='Bench', age=25, role=ROLES[index % len(ROLES)])
+        for index, user in enumerate(users)
+    ])
+
+
+def seed_parties(count, actors, created_by, start=date(2015, 1, 1), days=3650, songs=0,
+                 actors_per_party=3, batch_size=5000, seed=0, statuses=STATUSES):
+    """Bulk insert ``count`` parties spread over ``days`` days from ``start``."""
+    rng = random.Random(seed)
+    through = Party.actors.through
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        parties = []
+        for _ in range(size):
+            party_date = start + timedelta(days=rng.randrange(days))
+            party_time = time(rng.randrange(10, 23), rng.choice((0, 30)))
+            parties.append(Party(
+                day=DAYS[party_date.weekday()],
+                date=party_date,
+                time=party_time,
+                duration=timedelta(hours=rng.randrange(1, 5)),
+                place=rng.choice(PLACES),
+                event='Wedding',
+                number_of_actors=actors_per_party,
+                meeting_time=time(max(party_time.hour - 2, 0), 0),
+                meeting_date=party_date,
+                meeting_place='Office',
+                transport_vehicle='Van',
+                camera_man='Sami',
+                dress_details='White',
+                status=rng.choice(statuses),
+                created_by=created_by,
+            ))
+        parties = Party.objects.bulk_create(parties)
+        if actors:
+            through.objects.bulk_create([
+                through(party_id=party.pk, actor_id=actor.pk)
+                for party in parties
+                for actor in rng.sample(actors, min(actors_per_party, len(actors)))
+            ])
+        if songs:
+            Song.objects.bulk_create([
+                Song(party_id=party.pk, title=f'Song {order}', order=order)
+                for party in parties
+                for order in range(songs)
+            ])
+        created += size
+    return created
+
+
+def best_of(func, repeat=5):
+    """Return the fastest of ``repeat`` runs of ``func`` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = timer.perf_counter()
+        func()
+        timings.append((timer.perf_counter() - started) * 1000)
+    return min(timings)
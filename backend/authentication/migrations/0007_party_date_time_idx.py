@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_party_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='party',
+            index=models.Index(fields=['date', 'time'], name='party_date_time_idx'),
+        ),
+    ]
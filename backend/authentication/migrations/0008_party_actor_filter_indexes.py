@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_party_date_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actor',
+            index=models.Index(fields=['name', 'id'], name='actor_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='party',
+            index=models.Index(fields=['status', 'date', 'time'], name='party_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:11
+
+from django.db import DatabaseError, migrations, models, transaction
+
+
+def install_search_index(apps, schema_editor):
+    from authentication.search import get_backend
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            get_backend(schema_editor.connection.vendor).install(schema_editor)
+    except DatabaseError:
+        # e.g. SQLite built without FTS5; searches fall back to LIKE
+        pass
+
+
+def uninstall_search_index(apps, schema_editor):
+    from authentication.search import get_backend
+    get_backend(schema_editor.connection.vendor).uninstall(schema_editor)
+
+
+def populate_search_documents(apps, schema_editor):
+    from authentication.search import tokenize
+    Actor = apps.get_model('authentication', 'Actor')
+    Party = apps.get_model('authentication', 'Party')
+    SearchDocument = apps.get_model('authentication', 'SearchDocument')
+    documents = []
+    for actor in Actor.objects.all():
+        body = ' '.join(tokenize(' '.join([actor.name, actor.family, actor.role])))
+        documents.append(SearchDocument(kind='actor', object_id=actor.pk, body=body))
+    for party in Party.objects.prefetch_related('actors'):
+        parts = [party.place, party.camera_man, party.day, party.event]
+        for actor in party.actors.all():
+            parts.extend([actor.name, actor.family])
+        documents.append(SearchDocument(kind='party', object_id=party.pk, body=' '.join(tokenize(' '.join(parts)))))
+    SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0008_party_actor_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('party', 'Party'), ('actor', 'Actor')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('body', models.TextField()),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:13
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    Party = apps.get_model('authentication', 'Party')
+    MonthlyPartyStat = apps.get_model('authentication', 'MonthlyPartyStat')
+    ActorPartyStat = apps.get_model('authentication', 'ActorPartyStat')
+    MonthlyPartyStat.objects.bulk_create([
+        MonthlyPartyStat(month=row['month'], status=row['status'], count=row['total'])
+        for row in Party.objects.annotate(month=TruncMonth('date')).values('month', 'status').annotate(
+            total=Count('id')
+        ).order_by()
+    ], batch_size=1000)
+    ActorPartyStat.objects.bulk_create([
+        ActorPartyStat(actor_id=row['actor_id'], month=row['month'], status=row['party__status'], count=row['total'])
+        for row in Party.actors.through.objects.annotate(month=TruncMonth('party__date')).values(
+            'actor_id', 'month', 'party__status'
+        ).annotate(total=Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0009_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPartyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('done', 'Done'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month', 'status'],
+                'unique_together': {('month', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ActorPartyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('done', 'Done'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='party_stats', to='authentication.actor')),
+            ],
+            options={
+                'ordering': ['actor', 'month', 'status'],
+                'unique_together': {('actor', 'month', 'status')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
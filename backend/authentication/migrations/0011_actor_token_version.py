@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0010_party_stat_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
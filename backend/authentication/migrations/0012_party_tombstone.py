@@ -0,0 +1,30 @@
+# Generated by Django 4.2.24 on 2026-10-17 02:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0011_actor_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartyTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='party',
+            index=models.Index(fields=['updated_at', 'id'], name='party_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partytombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_at_idx'),
+        ),
+    ]
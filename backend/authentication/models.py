@@ -1,6 +1,30 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+class ActorQuerySet(models.QuerySet):
+    def with_party_counts(self):
+        """Annotate ``parties_count`` and its ``upcoming_parties_count`` /
+        ``completed_parties_count`` parts from the ``ActorPartyStat`` rollup.
+
+        Subqueries are used instead of a join so the annotations stay correct
+        when the queryset is later filtered through ``parties`` (e.g. when
+        used as a ``Prefetch`` for ``Party.actors``).
+        """
+        def total(**filters):
+            counts = ActorPartyStat.objects.filter(actor_id=OuterRef('pk'), **filters).order_by().values(
+                'actor_id'
+            ).annotate(total=Sum('count')).values('total')
+            return Coalesce(Subquery(counts), Value(0))
+
+        return self.annotate(
+            parties_count=total(),
+            upcoming_parties_count=total(status__in=Party.UPCOMING_STATUSES),
+            completed_parties_count=total(status__in=Party.COMPLETED_STATUSES),
+        )
+
 class Actor(models.Model):
     user = models.OneToOneField(
         User, 
@@ -27,14 +51,30 @@ class Actor(models.Model):
     can_access_parties = models.BooleanField(default=False)
     can_access_schedule = models.BooleanField(default=False)
     
+    # Bumped whenever a permission flag changes so tokens carrying the old
+    # flags as claims stop being accepted
+    token_version = models.PositiveIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    PERMISSION_FIELDS = (
+        'can_view_upcoming_parties', 'can_view_completed_parties', 'can_view_all_actors',
+        'can_manage_parties', 'can_manage_actors', 'can_access_dashboard', 'can_access_actors',
+        'can_access_parties', 'can_access_schedule',
+    )
+
+    objects = ActorQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} {self.family}"
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Default ordering plus the pagination tiebreaker
+            models.Index(fields=['name', 'id'], name='actor_name_id_idx'),
+        ]
 
 class Song(models.Model):
     title = models.CharField(max_length=200)
@@ -47,6 +87,18 @@ class Song(models.Model):
     def __str__(self):
         return self.title
 
+class PartyQuerySet(models.QuerySet):
+    def visible_to(self, actor):
+        """The parties ``Party.is_visible_to_actor`` lets ``actor`` see, as a filter."""
+        if actor.can_manage_parties:
+            return self
+        statuses = []
+        if actor.can_view_upcoming_parties:
+            statuses += Party.UPCOMING_STATUSES
+        if actor.can_view_completed_parties:
+            statuses += Party.COMPLETED_STATUSES
+        return self.filter(actors=actor, status__in=statuses)
+
 class Party(models.Model):
     PARTY_STATUS = (
         ('pending', 'Pending'),
@@ -54,6 +106,8 @@ class Party(models.Model):
         ('done', 'Done'),
         ('cancelled', 'Cancelled'),
     )
+    UPCOMING_STATUSES = ('pending', 'in_progress')
+    COMPLETED_STATUSES = ('done',)
 
     # Basic party information
     day = models.CharField(max_length=20)
@@ -84,20 +138,34 @@ class Party(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='parties_created')
 
+    objects = PartyQuerySet.as_manager()
+
     def is_visible_to_actor(self, actor):
         """Check if the party is visible to a specific actor"""
         # Admin can see all parties
         if actor.can_manage_parties:
             return True
         
-        # Actor must be part of the party
-        if not actor in self.actors.all():
+        # Actor must be part of the party. Use the prefetched actors when
+        # available so list serialization does not query once per row.
+        if 'actors' in getattr(self, '_prefetched_objects_cache', {}):
+            is_member = any(member.pk == actor.pk for member in self.actors.all())
+        else:
+            is_member = self.actors.filter(pk=actor.pk).exists()
+        return Party.visible_with(actor, self.status, is_member)
+
+    @staticmethod
+    def visible_with(actor, status, is_member):
+        """The visibility rules, for callers that already know status and membership."""
+        if actor.can_manage_parties:
+            return True
+        if not is_member:
             return False
             
         # Check status-based permissions
-        if self.status in ['pending', 'in_progress']:
+        if status in ['pending', 'in_progress']:
             return actor.can_view_upcoming_parties
-        elif self.status == 'done':
+        elif status == 'done':
             return actor.can_view_completed_parties
             
         return False
@@ -107,4 +175,63 @@ class Party(models.Model):
 
     class Meta:
         ordering = ['-date', '-time']
-        verbose_name_plural = 'Parties'
\ No newline at end of file
+        verbose_name_plural = 'Parties'
+        indexes = [
+            # Calendar windows and the default list ordering
+            models.Index(fields=['date', 'time'], name='party_date_time_idx'),
+            # Status filter on the list (ordered by date/time) and the
+            # dashboard's upcoming count (status IN (...) AND date >= today)
+            models.Index(fields=['status', 'date', 'time'], name='party_status_date_idx'),
+            # The changes feed seeks on (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='party_updated_at_idx'),
+        ]
+
+class PartyTombstone(models.Model):
+    """A deleted party, kept for the changes feed (see ``authentication.sync``)."""
+    party_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_at_idx'),
+        ]
+
+class SearchDocument(models.Model):
+    """
+    Normalized search text for a party or actor, kept in sync by signals.
+
+    The database-specific full-text index (SQLite FTS5 or a PostgreSQL GIN
+    index) is built over ``body``; see ``authentication.search``.
+    """
+    KINDS = (
+        ('party', 'Party'),
+        ('actor', 'Actor'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    body = models.TextField()
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+class MonthlyPartyStat(models.Model):
+    """Number of parties per month and status, maintained by ``rollups``."""
+    month = models.DateField()
+    status = models.CharField(max_length=20, choices=Party.PARTY_STATUS)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['month', 'status']
+        unique_together = ('month', 'status')
+
+class ActorPartyStat(models.Model):
+    """Number of parties per actor, month and status, maintained by ``rollups``."""
+    actor = models.ForeignKey(Actor, on_delete=models.CASCADE, related_name='party_stats')
+    month = models.DateField()
+    status = models.CharField(max_length=20, choices=Party.PARTY_STATUS)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['actor', 'month', 'status']
+        unique_together = ('actor', 'month', 'status')
@@ -0,0 +1,172 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the full ordering key.
+
+    DRF's ``CursorPagination`` only keys on the first ordering field and falls
+    back to an offset for ties, so pages full of parties on the same date get
+    slower the deeper you go. Here the cursor stores every ordering value plus
+    the primary key, and the next page is fetched with a lexicographic
+    ``WHERE (a, b, id) < (...)`` filter that can use an index on the ordering.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.queryset = queryset
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+        ordering = [(field, not descending) for field, descending in self.ordering] if reverse else self.ordering
+
+        queryset = queryset.order_by(*[('-' if descending else '') + field for field, descending in ordering])
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, cursor['p']))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Return the ordering as ``[(field, descending), ...]`` with the primary
+        key appended as a tiebreaker so every position is unique.
+        """
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        fields = [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+        if not any(field in ('pk', 'id') for field, _ in fields):
+            fields.append(('id', fields[-1][1] if fields else False))
+        return fields
+
+    def get_field(self, name):
+        """The model field (or annotation) an ordering name refers to."""
+        query = self.queryset.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        model, field = query.model, None
+        for part in name.split('__'):
+            field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+            model = field.related_model or model
+        return field
+
+    def seek_filter(self, ordering, position):
+        """
+        Build ``(a, b, c) > (x, y, z)`` (respecting per-field direction) as
+        ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)``.
+        """
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(ordering, position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def get_position(self, instance):
+        position = []
+        for field, _ in self.ordering:
+            value = getattr(instance, field)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position, reverse = cursor['p'], cursor.get('r', 0)
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            # Values go into the seek filter, so they must be what the fields hold
+            position = [
+                None if value is None else self.get_field(field).to_python(value)
+                for (field, _), value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {'p': position, 'r': reverse}
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        encoded = b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+
+class PartyPagination(KeysetPagination):
+    page_size = 100
+    max_page_size = 500
+
+
+class ActorPagination(KeysetPagination):
+    page_size = 100
+    max_page_size = 500
@@ -0,0 +1,54 @@
+from rest_framework import permissions
+
+_MISSING = object()
+
+
+def get_actor(request):
+    """
+    Return the Actor profile of the requesting user, or ``None`` for the
+    initial superadmin (a user without ``actor_profile``).
+
+    The result is memoized on the underlying ``HttpRequest`` so permission
+    classes, querysets, serializers and views share a single lookup.
+    """
+    http_request = getattr(request, '_request', request)
+    actor = getattr(http_request, '_actor_profile', _MISSING)
+    if actor is _MISSING:
+        actor = getattr(request.user, 'actor_profile', None)
+        http_request._actor_profile = actor
+    return actor
+
+
+class ActorPagePermission(permissions.BasePermission):
+    """
+    The initial superadmin can do everything; actors need the page flag(s)
+    checked by ``allows``. Access to a page grants everything on that page.
+    """
+
+    def allows(self, actor):
+        raise NotImplementedError
+
+    def has_permission(self, request, view):
+        actor = get_actor(request)
+        return actor is None or self.allows(actor)
+
+    def has_object_permission(self, request, view, obj):
+        return self.has_permission(request, view)
+
+
+class IsAdminOrActorWithPermission(ActorPagePermission):
+    def allows(self, actor):
+        # Check if actor has access to the actors page
+        return actor.can_access_actors
+
+
+class IsAdminOrActorWithPartyPermission(ActorPagePermission):
+    def allows(self, actor):
+        # Check if actor has access to the parties page
+        return actor.can_access_parties
+
+
+class IsAdminOrActorWithSchedulePermission(ActorPagePermission):
+    def allows(self, actor):
+        # Check if actor has access to either parties or schedule page
+        return actor.can_access_parties or actor.can_access_schedule
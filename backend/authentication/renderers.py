@@ -0,0 +1,36 @@
+"""
+JSON rendering through orjson when it is installed.
+
+orjson serializes the dicts and lists our serializers produce several times
+faster than ``json.dumps``. Values it should not format itself (datetimes,
+durations, decimals, lazy translations) are passed to DRF's encoder, so the
+output is byte-for-byte what ``JSONRenderer`` would send. Without orjson,
+or when indentation is requested, this is plain ``JSONRenderer``.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = self.encoder_class()
+        rendered = orjson.dumps(
+            data,
+            default=encoder.default,
+            # DRF formats datetimes differently from orjson (e.g. "Z" and
+            # millisecond precision); keep its format
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Same as JSONRenderer: stay a strict JavaScript subset
+        return rendered.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,111 @@
+"""
+Cache of serialized ``list`` responses for the party and actor viewsets.
+
+Entries live in the ``responses`` cache (``RESPONSE_CACHE`` in settings:
+local memory with LRU eviction, or files shared by every worker) under keys
+made of:
+
+* the requester's permission scope (``conditional.requester_scope``),
+* the fingerprint of the party and actor tables
+  (``conditional.collection_state``, the one the ETag is made of), which
+  every worker reads from the database, so a write in one process is seen
+  by all the others,
+* the versions of the party and actor namespaces (``cache``), which also
+  move on writes the fingerprint cannot see (a song saved on its own, a
+  renamed user),
+* the normalized query string and host (pagination links are absolute).
+
+Misses are rendered through ``conditional.current_reads`` so that a lagging
+read replica does not fill the cache with old data.
+
+Hits and misses are counted in the same cache; ``X-Cache`` on each response
+and ``GET /api/auth/cache/stats/`` show them.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import InvalidCacheBackendError, caches
+from rest_framework.response import Response
+
+from . import cache
+from .conditional import current_reads, request_state, requester_scope
+
+ALIAS = 'responses'
+HITS = 'response-cache:hits'
+MISSES = 'response-cache:misses'
+
+# Values that mean the same as leaving the parameter out
+DEFAULTS = {'status': 'all'}
+
+
+def get_store():
+    try:
+        return caches[ALIAS]
+    except InvalidCacheBackendError:
+        return None  # RESPONSE_CACHE=off
+
+
+def normalize_params(query_params):
+    """Sorted, de-duplicated, whitespace-trimmed parameters without no-op values."""
+    params = []
+    for name in sorted(query_params):
+        values = sorted({value.strip() for value in query_params.getlist(name)} - {''})
+        params.extend((name, value) for value in values if DEFAULTS.get(name) != value)
+    return urlencode(params)
+
+
+def cache_key(view, request):
+    query = hashlib.sha1(f'{request.get_host()}?{normalize_params(request.query_params)}'.encode()).hexdigest()
+    fingerprint = hashlib.sha1(request_state(request)[1].encode()).hexdigest()
+    versions = cache.get_versions(cache.PARTIES, cache.ACTORS)
+    return f'response:{view.basename}:{requester_scope(request)}:{fingerprint}:{versions}:{query}'
+
+
+def count(store, key):
+    try:
+        store.incr(key)
+    except ValueError:
+        if not store.add(key, 1, timeout=None):
+            store.incr(key)
+
+
+def cached_response(view, request, render):
+    store = get_store()
+    if store is None:
+        return render()
+
+    key = cache_key(view, request)
+    data = store.get(key)
+    if data is not None:
+        count(store, HITS)
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    count(store, MISSES)
+    with current_reads():
+        response = render()
+    if response.status_code == 200:
+        store.set(key, response.data)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def statistics():
+    store = get_store()
+    if store is None:
+        return {'backend': None, 'hits': 0, 'misses': 0, 'hit_rate': None}
+    hits, misses = store.get(HITS, 0), store.get(MISSES, 0)
+    return {
+        'backend': type(store).__name__,
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+
+
+class CachedListMixin:
+    """Serves ``list`` from the response cache."""
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(self, request, lambda: super(CachedListMixin, self).list(request, *args, **kwargs))
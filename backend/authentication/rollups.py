@@ -0,0 +1,129 @@
+"""
+Incrementally maintained party statistics.
+
+``MonthlyPartyStat`` holds party counts per (month, status) and
+``ActorPartyStat`` per (actor, month, status). Every party contributes one
+unit to its global bucket and one to the bucket of each of its actors, so a
+change is applied as "remove the old contribution, add the new one". The
+signal handlers in ``signals`` do that for single-row writes; bulk writes
+wrap themselves in ``track()``.
+"""
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+
+from .models import ActorPartyStat, MonthlyPartyStat, Party
+
+
+def month_of(value):
+    return value.replace(day=1)
+
+
+def contributions(party_ids):
+    """
+    Return a Counter of ``(actor_id, month, status) -> parties`` for the
+    given parties, with ``actor_id=None`` for the global buckets.
+    """
+    party_ids = list(party_ids)
+    result = Counter()
+    if not party_ids:
+        return result
+    buckets = {
+        row['id']: (month_of(row['date']), row['status'])
+        for row in Party.objects.filter(pk__in=party_ids).values('id', 'date', 'status')
+    }
+    for month, status in buckets.values():
+        result[(None, month, status)] += 1
+    memberships = Party.actors.through.objects.filter(party_id__in=list(buckets)).values_list('party_id', 'actor_id')
+    for party_id, actor_id in memberships:
+        month, status = buckets[party_id]
+        result[(actor_id, month, status)] += 1
+    return result
+
+
+def apply(delta):
+    """Add ``delta`` (a Counter that may hold negative values) to the rollups."""
+    for (actor_id, month, status), change in delta.items():
+        if not change:
+            continue
+        if actor_id is None:
+            rows = MonthlyPartyStat.objects.filter(month=month, status=status)
+            create = lambda: MonthlyPartyStat.objects.create(month=month, status=status, count=change)
+        else:
+            rows = ActorPartyStat.objects.filter(actor_id=actor_id, month=month, status=status)
+            create = lambda: ActorPartyStat.objects.create(actor_id=actor_id, month=month, status=status, count=change)
+        if not rows.update(count=F('count') + change):
+            create()
+
+
+def apply_difference(before, after):
+    delta = Counter(after)
+    delta.subtract(before)
+    apply(delta)
+
+
+@contextmanager
+def track(party_ids=()):
+    """
+    Keep the rollups in step with writes that bypass model signals::
+
+        with rollups.track(ids) as tracked:
+            Party.objects.filter(pk__in=ids).update(status='done')
+            tracked.update(new_party_ids)
+    """
+    tracked = set(party_ids)
+    before = contributions(tracked)
+    yield tracked
+    apply_difference(before, contributions(tracked))
+
+
+def compute():
+    """Recompute every rollup row from the source tables."""
+    expected = Counter()
+    for row in Party.objects.annotate(month=TruncMonth('date')).values('month', 'status').annotate(
+        total=Count('id')
+    ).order_by():
+        expected[(None, row['month'], row['status'])] = row['total']
+    for row in Party.actors.through.objects.annotate(month=TruncMonth('party__date')).values(
+        'actor_id', 'month', 'party__status'
+    ).annotate(total=Count('id')).order_by():
+        expected[(row['actor_id'], row['month'], row['party__status'])] = row['total']
+    return expected
+
+
+def stored():
+    current = Counter()
+    for month, status, count in MonthlyPartyStat.objects.values_list('month', 'status', 'count'):
+        current[(None, month, status)] = count
+    for actor_id, month, status, count in ActorPartyStat.objects.values_list('actor_id', 'month', 'status', 'count'):
+        current[(actor_id, month, status)] = count
+    return current
+
+
+def check():
+    """Return ``{bucket: (stored, expected)}`` for every bucket that differs."""
+    expected, current = compute(), stored()
+    return {
+        key: (current.get(key, 0), expected.get(key, 0))
+        for key in set(expected) | set(current)
+        if current.get(key, 0) != expected.get(key, 0)
+    }
+
+
+@transaction.atomic
+def rebuild():
+    MonthlyPartyStat.objects.all().delete()
+    ActorPartyStat.objects.all().delete()
+    rows = compute()
+    MonthlyPartyStat.objects.bulk_create([
+        MonthlyPartyStat(month=month, status=status, count=count)
+        for (actor_id, month, status), count in rows.items() if actor_id is None
+    ], batch_size=1000)
+    ActorPartyStat.objects.bulk_create([
+        ActorPartyStat(actor_id=actor_id, month=month, status=status, count=count)
+        for (actor_id, month, status), count in rows.items() if actor_id is not None
+    ], batch_size=1000)
+    return len(rows)
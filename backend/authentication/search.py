@@ -0,0 +1,239 @@
+"""
+Full-text search over parties and actors.
+
+Searchable text is normalized (case folding plus Arabic orthographic
+normalization) and stored in ``SearchDocument`` rows. Each database gets its
+own index over those rows:
+
+* SQLite: an external-content FTS5 table kept in sync by triggers.
+* PostgreSQL: a GIN index on ``to_tsvector('simple', body)``.
+* Anything else: a ``LIKE`` scan over the single documents table.
+
+Queries are tokenized the same way and every token is matched as a prefix,
+so ``"اح"`` finds ``"أحمد"`` and ``"gard"`` finds ``"Rose Garden"``.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import F, FloatField, Func, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Actor, Party, SearchDocument
+
+FTS_TABLE = 'authentication_searchdocument_fts'
+
+# Harakat, Quranic annotation marks and tatweel carry no meaning for search
+# but split or break tokens, so they are dropped entirely.
+ARABIC_STRIP = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+ARABIC_FOLD = str.maketrans({
+    '\u0622': '\u0627',  # alef with madda -> alef
+    '\u0623': '\u0627',  # alef with hamza above -> alef
+    '\u0625': '\u0627',  # alef with hamza below -> alef
+    '\u0671': '\u0627',  # alef wasla -> alef
+    '\u0649': '\u064a',  # alef maqsura -> yeh
+    '\u0629': '\u0647',  # teh marbuta -> heh
+    '\u0624': '\u0648',  # waw with hamza -> waw
+    '\u0626': '\u064a',  # yeh with hamza -> yeh
+})
+TOKEN = re.compile(r'\w+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return ARABIC_STRIP.sub('', text).translate(ARABIC_FOLD)
+
+
+def tokenize(text):
+    return TOKEN.findall(normalize(text))
+
+
+def party_document(party):
+    parts = [party.place, party.camera_man, party.day, party.event]
+    for actor in party.actors.all():
+        parts.extend([actor.name, actor.family])
+    return ' '.join(tokenize(' '.join(parts)))
+
+
+def actor_document(actor):
+    return ' '.join(tokenize(' '.join([actor.name, actor.family, actor.role])))
+
+
+def index_parties(party_ids):
+    party_ids = list(party_ids)
+    if not party_ids:
+        return
+    parties = Party.objects.filter(pk__in=party_ids).only(
+        'id', 'place', 'camera_man', 'day', 'event'
+    ).prefetch_related('actors')
+    _replace('party', party_ids, {party.pk: party_document(party) for party in parties})
+
+
+def index_actors(actor_ids):
+    actor_ids = list(actor_ids)
+    if not actor_ids:
+        return
+    actors = Actor.objects.filter(pk__in=actor_ids).only('id', 'name', 'family', 'role')
+    _replace('actor', actor_ids, {actor.pk: actor_document(actor) for actor in actors})
+
+
+def remove_documents(kind, object_ids):
+    SearchDocument.objects.filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+
+def rebuild_index():
+    SearchDocument.objects.all().delete()
+    index_parties(Party.objects.values_list('pk', flat=True))
+    index_actors(Actor.objects.values_list('pk', flat=True))
+
+
+def _replace(kind, object_ids, documents):
+    # Delete + insert (rather than update) keeps the FTS triggers simple
+    remove_documents(kind, object_ids)
+    SearchDocument.objects.bulk_create([
+        SearchDocument(kind=kind, object_id=object_id, body=body)
+        for object_id, body in documents.items()
+    ])
+
+
+class SearchBackend:
+    """
+    Matches and ranks documents inside the caller's query, so its filters,
+    ordering and pagination apply to every match.
+    """
+
+    def filter(self, queryset, kind, tokens):
+        """Restrict ``queryset`` to matches and annotate ``search_rank`` (lower is better)."""
+        raise NotImplementedError
+
+    def install(self, schema_editor):
+        """Create the database-specific index (called from migrations)."""
+
+    def uninstall(self, schema_editor):
+        pass
+
+
+def _document_id(kind):
+    return Subquery(SearchDocument.objects.filter(kind=kind, object_id=OuterRef('pk')).values('id')[:1])
+
+
+class LikeSearchBackend(SearchBackend):
+    def filter(self, queryset, kind, tokens):
+        documents = SearchDocument.objects.filter(kind=kind)
+        for token in tokens:
+            documents = documents.filter(body__contains=token)
+        # No relevance score: newest first
+        return queryset.filter(pk__in=documents.values('object_id')).annotate(search_rank=-F('pk'))
+
+
+class FTSRank(Func):
+    """``bm25`` of FTS row ``rowid`` for a match expression: ``FTSRank(Value(match), rowid)``."""
+    template = f'(SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %(expressions)s)'
+    arg_joiner = ' AND rowid = '
+    output_field = FloatField()
+
+
+# Whether each database has the FTS5 table (SQLite may be built without it)
+_fts_tables = {}
+
+
+def fts_available(alias):
+    if alias not in _fts_tables:
+        with connections[alias].cursor() as cursor:
+            _fts_tables[alias] = FTS_TABLE in connections[alias].introspection.table_names(cursor)
+    return _fts_tables[alias]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    def filter(self, queryset, kind, tokens):
+        if not fts_available(queryset.db):
+            return LikeSearchBackend().filter(queryset, kind, tokens)
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        matches = RawSQL(
+            f'SELECT d.object_id FROM {FTS_TABLE} f '
+            f'JOIN {SearchDocument._meta.db_table} d ON d.id = f.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.kind = %s',
+            [match, kind],
+        )
+        # bm25 is lower for better matches; the rowid makes it one seek per row
+        rank = FTSRank(Value(match), _document_id(kind))
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+    def install(self, schema_editor):
+        table = SearchDocument._meta.db_table
+        statements = [
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"body, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END",
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); END",
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.id, old.body); "
+            f"INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body); END",
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+        ]
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    def uninstall(self, schema_editor):
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class PostgresSearchBackend(SearchBackend):
+    index_name = 'searchdocument_body_tsv_idx'
+
+    def filter(self, queryset, kind, tokens):
+        # Tokens only contain word characters, so quoting them is enough
+        tsquery = ' & '.join(f"'{token}':*" for token in tokens)
+        matches = RawSQL(
+            f"SELECT object_id FROM {SearchDocument._meta.db_table} "
+            f"WHERE kind = %s AND to_tsvector('simple', body) @@ to_tsquery('simple', %s)",
+            [kind, tsquery],
+        )
+        rank = Subquery(
+            SearchDocument.objects.filter(kind=kind, object_id=OuterRef('pk')).annotate(
+                rank=RawSQL("-ts_rank(to_tsvector('simple', body), to_tsquery('simple', %s))", [tsquery]),
+            ).values('rank')[:1],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE INDEX {self.index_name} ON {SearchDocument._meta.db_table} "
+            f"USING GIN (to_tsvector('simple', body))"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {self.index_name}')
+
+
+BACKENDS = {
+    'sqlite': 'authentication.search.SQLiteSearchBackend',
+    'postgresql': 'authentication.search.PostgresSearchBackend',
+}
+
+
+def get_backend(vendor=None):
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path is None:
+        path = BACKENDS.get(vendor or connection.vendor, 'authentication.search.LikeSearchBackend')
+    return import_string(path)()
+
+
+def filter_ranked(queryset, kind, query):
+    """
+    Restrict ``queryset`` to matches and annotate ``search_rank`` (lower is
+    better) so callers can ``order_by('search_rank')``. Matching runs in the
+    same query as the caller's filters, so every match can be reached.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+    return get_backend().filter(queryset, kind, tokens)
+
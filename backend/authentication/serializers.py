@@ -1,8 +1,13 @@
 import logging
+from collections import defaultdict
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import Q, Sum
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from .models import Actor, Party, Song
+from . import availability
+from .permissions import get_actor
 
 class ActorCreateSerializer(serializers.ModelSerializer):
     username = serializers.CharField(write_only=True)
@@ -58,6 +63,8 @@ class ActorCreateSerializer(serializers.ModelSerializer):
 
 class ActorSerializer(serializers.ModelSerializer):
     parties_count = serializers.SerializerMethodField()
+    upcoming_parties_count = serializers.SerializerMethodField()
+    completed_parties_count = serializers.SerializerMethodField()
     username = serializers.CharField(source='user.username', read_only=True)
 
     class Meta:
@@ -67,11 +74,33 @@ class ActorSerializer(serializers.ModelSerializer):
             'can_view_upcoming_parties', 'can_view_completed_parties',
             'can_view_all_actors', 'can_manage_parties', 'can_manage_actors',
             'can_access_dashboard', 'can_access_actors', 'can_access_parties', 'can_access_schedule',
-            'parties_count'
+            'parties_count', 'upcoming_parties_count', 'completed_parties_count'
         )
 
+    def party_counts(self, obj):
+        """
+        The counts annotated by ``Actor.objects.with_party_counts()``, or one
+        aggregate over the rollup for an actor loaded without them.
+        """
+        if not hasattr(obj, 'parties_count'):
+            counts = obj.party_stats.aggregate(
+                total=Sum('count'),
+                upcoming=Sum('count', filter=Q(status__in=Party.UPCOMING_STATUSES)),
+                completed=Sum('count', filter=Q(status__in=Party.COMPLETED_STATUSES)),
+            )
+            obj.parties_count = counts['total'] or 0
+            obj.upcoming_parties_count = counts['upcoming'] or 0
+            obj.completed_parties_count = counts['completed'] or 0
+        return obj
+
     def get_parties_count(self, obj):
-        return obj.parties.count()
+        return self.party_counts(obj).parties_count
+
+    def get_upcoming_parties_count(self, obj):
+        return self.party_counts(obj).upcoming_parties_count
+
+    def get_completed_parties_count(self, obj):
+        return self.party_counts(obj).completed_parties_count
 
 class UserSerializer(serializers.ModelSerializer):
     actor_profile = ActorSerializer(read_only=True)
@@ -81,16 +110,93 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'actor_profile')
 
 class SongSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)  # Lets updates keep existing songs
     order = serializers.IntegerField(required=False)  # Make order optional
     
     class Meta:
         model = Song
         fields = ('id', 'title', 'order')
 
-class PartySerializer(serializers.ModelSerializer):
+class ActorIdsField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves ids from ``context['actors_by_id']`` when the caller preloaded
+    them (batch writes), instead of one query per id.
+    """
+
+    def to_internal_value(self, data):
+        actors = self.context.get('actors_by_id')
+        if actors is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return actors[int(data)]
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+def write_playlists(playlists):
+    """
+    Diff each submitted playlist in ``playlists`` (``(party, songs_data)``
+    pairs) against the stored one: songs are matched by id (or, for entries
+    without one, by title), changed ones are bulk-updated, new ones
+    bulk-created and the rest bulk-deleted, so an edit costs at most four
+    queries however many parties and songs it covers.
+    """
+    stored = defaultdict(dict)
+    for song in Song.objects.filter(party_id__in=[party.pk for party, _ in playlists]):
+        stored[song.party_id][song.pk] = song
+
+    to_create, to_update, to_delete = [], [], []
+    for party, songs_data in playlists:
+        existing = stored[party.pk]
+        by_title = {}
+        for song in existing.values():
+            by_title.setdefault(song.title, []).append(song)
+
+        for index, song_data in enumerate(item for item in songs_data if isinstance(item, dict)):
+            title = song_data['title']
+            song = existing.get(song_data.get('id'))
+            if song is None and song_data.get('id') is None and by_title.get(title):
+                song = next((candidate for candidate in by_title[title] if candidate.pk in existing), None)
+            if song is None:
+                to_create.append(Song(party=party, title=title, order=index))
+                continue
+            del existing[song.pk]
+            if song.title != title or song.order != index:
+                song.title, song.order = title, index
+                to_update.append(song)
+        to_delete.extend(existing)
+
+    if to_delete:
+        Song.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        Song.objects.bulk_update(to_update, ['title', 'order'])
+    if to_create:
+        Song.objects.bulk_create(to_create)
+
+class SelectableFieldsMixin:
+    """
+    Keeps only the fields named in ``context['fields']`` (the ``?fields=``
+    parameter, see ``PartyViewSet``); unknown names are a validation error.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        if not selected:
+            return
+        unknown = [name for name in selected if name not in self.fields]
+        if unknown:
+            raise serializers.ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}."]})
+        for name in set(self.fields) - set(selected):
+            self.fields.pop(name)
+
+class PartySerializer(SelectableFieldsMixin, serializers.ModelSerializer):
     songs = SongSerializer(many=True, required=False)
     actors = ActorSerializer(many=True, read_only=True)
-    actor_ids = serializers.PrimaryKeyRelatedField(
+    actor_ids = ActorIdsField(
         queryset=Actor.objects.all(),
         many=True,
         write_only=True,
@@ -109,11 +215,10 @@ class PartySerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        try:
-            actor = request.user.actor_profile
-            return obj.is_visible_to_actor(actor)
-        except Actor.DoesNotExist:
+        actor = get_actor(request)
+        if actor is None:
             return request.user.is_staff
+        return obj.is_visible_to_actor(actor)
 
     def validate(self, data):
         logger = logging.getLogger(__name__)
@@ -124,6 +229,14 @@ class PartySerializer(serializers.ModelSerializer):
                          'meeting_time', 'meeting_date', 'meeting_place', 'transport_vehicle',
                          'camera_man', 'dress_details']
         
+        # ``PartyBatch`` checks the bookings of a whole batch at once
+        if not self.context.get('defer_bookings'):
+            self.validate_bookings(data)
+
+        # Partial updates (PATCH, batch status changes) only send what changes
+        if self.partial:
+            return data
+        
         missing_fields = [field for field in required_fields if field not in data]
         if missing_fields:
             logger.error(f"Missing required fields: {missing_fields}")
@@ -137,6 +250,45 @@ class PartySerializer(serializers.ModelSerializer):
         
         return data
 
+    def get_booking(self, data):
+        """
+        ``(actors, interval)`` to check once ``data`` is saved, or ``None``.
+
+        An update is only checked for what it changes: every actor when the
+        party moves or leaves ``cancelled``, otherwise just the actors it
+        gains. Overlaps that predate the update never block it (e.g. closing
+        the party with a status change).
+        """
+        timing = ('date', 'time', 'duration', 'meeting_date', 'meeting_time')
+        value = lambda name: data[name] if name in data else getattr(self.instance, name, None)
+        if value('status') == 'cancelled' or any(value(name) is None for name in timing):
+            return None
+        if self.instance is None:
+            actors = data.get('actors', [])
+        elif self.instance.status == 'cancelled' or any(value(name) != getattr(self.instance, name) for name in timing):
+            actors = data['actors'] if 'actors' in data else list(self.instance.actors.all())
+        elif 'actors' in data:
+            current = {actor.pk for actor in self.instance.actors.all()}
+            actors = [actor for actor in data['actors'] if actor.pk not in current]
+        else:
+            return None
+        if not actors:
+            return None
+        return actors, availability.busy_interval(*map(value, timing), getattr(self.instance, 'pk', 0))
+
+    def validate_bookings(self, data):
+        """Reject actors who are already booked on an overlapping party."""
+        booking = self.get_booking(data)
+        if booking is None:
+            return
+        actors, interval = booking
+        schedule = availability.ActorSchedule.load(
+            interval.start, interval.end, [actor.pk for actor in actors], exclude=[interval.party_id]
+        )
+        errors = availability.conflict_errors(schedule, actors, interval)
+        if errors:
+            raise serializers.ValidationError({'actor_ids': errors})
+
     def create(self, validated_data):
         actor_ids = validated_data.pop('actors', [])
         songs_data = validated_data.pop('songs', [])
@@ -145,17 +297,19 @@ class PartySerializer(serializers.ModelSerializer):
         if 'status' not in validated_data:
             validated_data['status'] = 'pending'
         
-        # Create party
-        party = Party.objects.create(**validated_data)
-        
-        # Add actors
-        party.actors.set(actor_ids)
-        
-        # Add songs with automatic order
-        for index, song_data in enumerate(songs_data):
-            if isinstance(song_data, dict):
-                song_data['order'] = index
-                Song.objects.create(party=party, **song_data)
+        with transaction.atomic():
+            # Create party
+            party = Party.objects.create(**validated_data)
+            
+            # Add actors
+            party.actors.set(actor_ids)
+            
+            # Add songs with automatic order
+            Song.objects.bulk_create([
+                Song(party=party, title=song_data['title'], order=index)
+                for index, song_data in enumerate(songs_data)
+                if isinstance(song_data, dict)
+            ])
         
         return party
 
@@ -163,21 +317,46 @@ class PartySerializer(serializers.ModelSerializer):
         actor_ids = validated_data.pop('actors', None)
         songs_data = validated_data.pop('songs', None)
         
-        # Update party fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Update actors if provided
-        if actor_ids is not None:
-            instance.actors.set(actor_ids)
+        with transaction.atomic():
+            # Update party fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            
+            # Update actors if provided
+            if actor_ids is not None:
+                instance.actors.set(actor_ids)
+            
+            # Update songs if provided
+            if songs_data is not None:
+                write_playlists([(instance, songs_data)])
         
-        # Update songs if provided
-        if songs_data is not None:
-            instance.songs.all().delete()
-            for index, song_data in enumerate(songs_data):
-                if isinstance(song_data, dict):
-                    song_data['order'] = index
-                    Song.objects.create(party=instance, **song_data)
-        
-        return instance
\ No newline at end of file
+        return instance
+
+class PartyActorSummarySerializer(serializers.ModelSerializer):
+    display_name = serializers.CharField(source='__str__', read_only=True)
+
+    class Meta:
+        model = Actor
+        fields = ('id', 'display_name')
+
+class PartyListSerializer(PartySerializer):
+    """List rows: actors are reduced to id and display name (``?expand=actors`` for the full objects)."""
+    actors = PartyActorSummarySerializer(many=True, read_only=True)
+
+class PartyActorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Actor
+        fields = ('id', 'name', 'family')
+
+class PartyCalendarSerializer(serializers.ModelSerializer):
+    """Only the columns the schedule grid renders."""
+    actors = PartyActorSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Party
+        fields = (
+            'id', 'day', 'date', 'time', 'duration', 'place', 'event', 'status',
+            'meeting_date', 'meeting_time', 'actors'
+        )
+        read_only_fields = fields
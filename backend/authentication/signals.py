@@ -0,0 +1,180 @@
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache, events, rollups, search
+from .auth import set_token_version, user_cache
+from .models import Actor, Party, PartyTombstone, Song
+
+
+@receiver(pre_save, sender=Party)
+def party_saving(sender, instance, raw=False, **kwargs):
+    instance._rollup_bucket = None
+    if instance.pk is not None and not raw:
+        previous = Party.objects.filter(pk=instance.pk).values('date', 'status').first()
+        if previous is not None:
+            instance._rollup_bucket = (rollups.month_of(previous['date']), previous['status'])
+
+
+@receiver(post_save, sender=Party)
+def party_saved(sender, instance, created, raw=False, **kwargs):
+    cache.bump_version(cache.PARTIES)
+    if raw:
+        return
+    search.index_parties([instance.pk])
+
+    # Move the party's contribution if its month or status changed
+    old = getattr(instance, '_rollup_bucket', None)
+    new = (rollups.month_of(instance.date), instance.status)
+    if created:
+        events.party_changed([instance.pk], events.CREATED)
+    else:
+        events.party_changed([instance.pk], events.STATUS if old and old[1] != new[1] else events.UPDATED)
+    if old == new:
+        return
+    actor_ids = [] if created else list(instance.actors.values_list('pk', flat=True))
+    delta = Counter()
+    for actor_id in [None] + actor_ids:
+        if old is not None:
+            delta[(actor_id, *old)] -= 1
+        delta[(actor_id, *new)] += 1
+    rollups.apply(delta)
+
+
+@receiver(pre_delete, sender=Party)
+def party_deleting(sender, instance, **kwargs):
+    instance._rollup_contribution = rollups.contributions([instance.pk])
+    events.party_deleted(instance, {key[0] for key in instance._rollup_contribution if key[0] is not None})
+
+
+@receiver(post_delete, sender=Party)
+def party_deleted(sender, instance, **kwargs):
+    cache.bump_version(cache.PARTIES)
+    search.remove_documents('party', [instance.pk])
+    rollups.apply_difference(getattr(instance, '_rollup_contribution', Counter()), Counter())
+    PartyTombstone.objects.create(party_id=instance.pk)
+
+
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Song)
+def song_changed(sender, instance, **kwargs):
+    cache.bump_version(cache.PARTIES)
+
+
+@receiver(m2m_changed, sender=Party.actors.through)
+def party_actors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('post_'):
+        cache.bump_version(cache.PARTIES, cache.ACTORS)
+    update_actor_rollups(instance, action, reverse, pk_set)
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.index_parties([instance.pk])
+            # Membership is written after the party's own save
+            touch_parties([instance.pk])
+        return
+
+    # actor.parties.add(...) / remove(...) / clear()
+    if action == 'pre_clear':
+        instance._cleared_party_ids = list(instance.parties.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        search.index_parties(pk_set)
+        touch_parties(pk_set)
+    elif action == 'post_clear':
+        search.index_parties(getattr(instance, '_cleared_party_ids', []))
+        touch_parties(getattr(instance, '_cleared_party_ids', []))
+
+
+def touch_parties(party_ids):
+    """
+    Move ``updated_at`` of parties whose serialized form changed without a
+    save of their own (their actors did), so the changes feed and the
+    calendar feeds pick them up.
+    """
+    party_ids = list(party_ids)
+    Party.objects.filter(pk__in=party_ids).update(updated_at=timezone.now())
+    events.party_changed(party_ids)
+
+
+def update_actor_rollups(instance, action, reverse, pk_set):
+    """
+    Count memberships as they are added and before they are removed; the
+    M2M methods run inside a transaction, so a failed write rolls back both.
+    """
+    through = Party.actors.through
+    if action == 'post_add':
+        pairs = [(instance.pk, pk) for pk in pk_set] if not reverse else [(pk, instance.pk) for pk in pk_set]
+        change = 1
+    elif action in ('pre_remove', 'pre_clear'):
+        memberships = through.objects.filter(**{'actor_id' if reverse else 'party_id': instance.pk})
+        if action == 'pre_remove':
+            memberships = memberships.filter(**{'party_id__in' if reverse else 'actor_id__in': pk_set})
+        pairs = list(memberships.values_list('party_id', 'actor_id'))
+        change = -1
+    else:
+        return
+
+    buckets = {
+        row['id']: (rollups.month_of(row['date']), row['status'])
+        for row in Party.objects.filter(pk__in={party_id for party_id, _ in pairs}).values('id', 'date', 'status')
+    }
+    delta = Counter()
+    for party_id, actor_id in pairs:
+        delta[(actor_id, *buckets[party_id])] += change
+    rollups.apply(delta)
+
+
+@receiver(pre_save, sender=Actor)
+def actor_saving(sender, instance, raw=False, **kwargs):
+    instance._renamed = False
+    if instance.pk is None or raw:
+        return
+    previous = Actor.objects.filter(pk=instance.pk).values(
+        *Actor.PERMISSION_FIELDS, 'token_version', 'name', 'family',
+    ).first()
+    if previous is None:
+        return
+    instance._renamed = (previous['name'], previous['family']) != (instance.name, instance.family)
+    if any(previous[field] != getattr(instance, field) for field in Actor.PERMISSION_FIELDS):
+        # Invalidate tokens that carry the old flags as claims
+        instance.token_version = previous['token_version'] + 1
+
+
+@receiver(post_save, sender=Actor)
+def actor_saved(sender, instance, created, raw=False, **kwargs):
+    cache.bump_version(cache.ACTORS)
+    user_cache.evict(instance.user_id)
+    set_token_version(instance.pk, instance.token_version)
+    if raw:
+        return
+    search.index_actors([instance.pk])
+    if getattr(instance, '_renamed', False):
+        # Party documents and payloads include their actors' names
+        party_ids = list(instance.parties.values_list('pk', flat=True))
+        search.index_parties(party_ids)
+        touch_parties(party_ids)
+
+
+@receiver(pre_delete, sender=Actor)
+def actor_deleting(sender, instance, **kwargs):
+    instance._deleted_party_ids = list(instance.parties.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Actor)
+def actor_deleted(sender, instance, **kwargs):
+    cache.bump_version(cache.ACTORS, cache.PARTIES)
+    user_cache.evict(instance.user_id)
+    search.remove_documents('actor', [instance.pk])
+    search.index_parties(getattr(instance, '_deleted_party_ids', []))
+    touch_parties(getattr(instance, '_deleted_party_ids', []))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    user_cache.evict(instance.pk)
+    # Usernames and creator names appear in actor and party payloads
+    cache.bump_version(cache.ACTORS, cache.PARTIES)
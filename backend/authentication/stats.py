@@ -0,0 +1,98 @@
+"""Dashboard statistics, read from the ``rollups`` tables."""
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from . import cache as versioned
+from .conditional import current_reads
+from .models import Actor, ActorPartyStat, MonthlyPartyStat, Party
+
+UPCOMING_STATUSES = Party.UPCOMING_STATUSES
+
+
+def summarize(rows, upcoming):
+    """
+    Build totals, monthly activity and status distribution from rollup rows
+    (``month``, ``status``, ``count``).
+    """
+    monthly = defaultdict(int)
+    statuses = defaultdict(int)
+    summary = {'total': 0, 'upcoming': upcoming, 'completed': 0}
+    for month, status, count in rows:
+        monthly[month] += count
+        statuses[status] += count
+        summary['total'] += count
+        if status == 'done':
+            summary['completed'] += count
+
+    summary['monthly_activity'] = [{'month': month, 'parties': count} for month, count in sorted(monthly.items())]
+    summary['status_distribution'] = [
+        {'status': status, 'count': count} for status, count in sorted(statuses.items())
+    ]
+    return summary
+
+
+def upcoming_count(parties, today):
+    # Depends on today's date, so it is not rolled up; served by
+    # the (status, date) index instead
+    return parties.filter(date__gte=today, status__in=UPCOMING_STATUSES).order_by().count()
+
+
+def admin_dashboard(today):
+    summary = summarize(
+        MonthlyPartyStat.objects.filter(count__gt=0).values_list('month', 'status', 'count'),
+        upcoming_count(Party.objects.all(), today),
+    )
+    top_actors = Actor.objects.annotate(
+        party_count=Coalesce(Sum('party_stats__count'), 0)
+    ).values('name', 'family', 'party_count').order_by('-party_count')[:5]
+    return {
+        'total_actors': Actor.objects.count(),
+        'total_parties': summary['total'],
+        'upcoming_parties': summary['upcoming'],
+        'completed_parties': summary['completed'],
+        'top_actors': list(top_actors),
+        'monthly_activity': summary['monthly_activity'],
+        'status_distribution': summary['status_distribution'],
+    }
+
+
+def actor_dashboard(actor, today):
+    # Actors without access to the parties page only see empty stats
+    if actor.can_access_parties:
+        summary = summarize(
+            ActorPartyStat.objects.filter(actor=actor, count__gt=0).values_list('month', 'status', 'count'),
+            upcoming_count(Party.objects.filter(actors=actor), today),
+        )
+    else:
+        summary = {'total': 0, 'upcoming': 0, 'completed': 0, 'monthly_activity': [], 'status_distribution': []}
+    return {
+        'my_total_parties': summary['total'],
+        'my_upcoming_parties': summary['upcoming'],
+        'my_completed_parties': summary['completed'],
+        'monthly_activity': summary['monthly_activity'],
+        'status_distribution': summary['status_distribution'],
+    }
+
+
+def dashboard(actor, today, fingerprint):
+    """
+    Return (possibly cached) dashboard stats for ``actor`` (``None`` for the
+    initial superadmin). Entries are keyed by scope, day and the
+    ``fingerprint`` of the party and actor tables the ETag is made of (plus
+    this process's versions), so no worker reuses them after a write.
+    """
+    scope = 'admin' if actor is None else f'actor:{actor.pk}:{int(actor.can_access_parties)}'
+    fingerprint = hashlib.sha1(fingerprint.encode()).hexdigest()
+    versions = versioned.get_versions(versioned.PARTIES, versioned.ACTORS)
+    key = f'dashboard:{scope}:{today.isoformat()}:{fingerprint}:{versions}'
+    stats = cache.get(key)
+    if stats is None:
+        with current_reads():
+            stats = admin_dashboard(today) if actor is None else actor_dashboard(actor, today)
+        cache.set(key, stats, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return stats
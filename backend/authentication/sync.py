@@ -0,0 +1,125 @@
+"""
+The party changes feed (``GET /parties/changes/?since=<cursor>``).
+
+Upserts are the parties whose ``updated_at`` moved past the cursor, read
+with a keyset on ``(updated_at, id)``; deletions come from
+``PartyTombstone`` with a keyset on ``(deleted_at, id)``. The cursor is an
+opaque token holding the last position of both streams.
+
+Two details keep a client that follows the cursor exact:
+
+* ``updated_at`` is taken before the writing transaction commits, so rows
+  younger than ``PARTY_CHANGES_SETTLE_SECONDS`` are left for the next call
+  instead of being skipped once the cursor has moved past them.
+* Tombstones are pruned after ``PARTY_TOMBSTONE_RETENTION_DAYS``; a cursor
+  older than that could miss deletions and is refused with ``410 Gone``.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import PartyTombstone
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'The cursor is older than the change history; reload the full list.'
+    default_code = 'cursor_expired'
+
+
+def settle_seconds():
+    return getattr(settings, 'PARTY_CHANGES_SETTLE_SECONDS', 2)
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'PARTY_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def encode_cursor(upserts, deletions):
+    payload = {'u': upserts, 'd': deletions}
+    return urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token):
+    """
+    Return ``(upserts, deletions)`` positions, each ``[iso timestamp, id]``
+    or ``None``, but not both ``None``.
+    """
+    try:
+        payload = json.loads(urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        positions = [payload['u'], payload['d']]
+        if positions == [None, None]:
+            raise ValueError
+        for position in positions:
+            if position is not None:
+                moment, pk = position
+                moment = parse_datetime(moment)
+                # Issued cursors hold aware times; naive ones cannot be compared
+                if moment is None or timezone.is_naive(moment) or not isinstance(pk, int):
+                    raise ValueError
+    except (TypeError, ValueError, KeyError):
+        raise ValidationError({'since': ['Invalid cursor.']})
+    return positions
+
+
+def after(position, time_field):
+    """Rows strictly after ``position`` in ``(time_field, id)`` order."""
+    if position is None:
+        return Q()
+    moment, pk = parse_datetime(position[0]), position[1]
+    return Q(**{f'{time_field}__gt': moment}) | Q(**{time_field: moment, 'id__gt': pk})
+
+
+def position_of(moment, pk):
+    return [moment.isoformat(), pk]
+
+
+def resume_position(rows, limit, time_field, until):
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return position_of(getattr(last, time_field), last.pk)
+    return position_of(until, 0)
+
+
+def changes(queryset, since, limit):
+    """
+    Return ``(parties, deleted, cursor, has_more)`` for the changes after the
+    ``since`` cursor (``None`` for a first, full sync).
+    """
+    now = timezone.now()
+    until = now - timedelta(seconds=settle_seconds())
+
+    if since is None:
+        # A first sync reads every party; earlier deletions are irrelevant
+        upserts_from, deletions_from = None, position_of(until, 0)
+    else:
+        upserts_from, deletions_from = decode_cursor(since)
+        oldest = min(parse_datetime(position[0]) for position in (upserts_from, deletions_from) if position)
+        if oldest < now - retention():
+            raise CursorExpired()
+
+    parties = list(
+        queryset.filter(after(upserts_from, 'updated_at'), updated_at__lt=until)
+        .order_by('updated_at', 'id')[:limit + 1]
+    )
+    deleted = list(
+        PartyTombstone.objects.filter(after(deletions_from, 'deleted_at'), deleted_at__lt=until)
+        .order_by('deleted_at', 'id')[:limit + 1]
+    )
+    has_more = len(parties) > limit or len(deleted) > limit
+
+    # A stream that was read to the end has delivered everything before
+    # ``until``, so its position moves there (which also keeps the cursor
+    # of a quiet feed from ageing into expiry)
+    cursor = encode_cursor(
+        resume_position(parties, limit, 'updated_at', until),
+        resume_position(deleted, limit, 'deleted_at', until),
+    )
+    return parties[:limit], deleted[:limit], cursor, has_more
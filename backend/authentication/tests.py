@@ -1,3 +1,1461 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time as time_module
+import zipfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from xml.sax.saxutils import escape as xml_escape
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection, connections, router, transaction
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import database
+from core.routing import STICKY_COOKIE, STICKY_HEADER, ReplicaMiddleware
+
+from . import auth, availability, conditional, events, ical, rollups, search, sync
+from .auth import StatelessJWTAuthentication, user_cache
+from .models import Actor, ActorPartyStat, MonthlyPartyStat, Party, SearchDocument, Song
+from .pagination import PartyPagination
+from .renderers import FastJSONRenderer
+from .serializers import ActorSerializer, PartySerializer
+from .views import PartyViewSet, UserDetailView
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class APITestCase(TestCase):
+    def setUp(self):
+        for alias in caches:
+            caches[alias].clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create_actor(self, name='Actor', **kwargs):
+        user = User.objects.create_user(username=f'{name.lower()}{Actor.objects.count()}', password='pass')
+        defaults = {'family': 'Family', 'age': 30, 'role': 'Singer'}
+        defaults.update(kwargs)
+        return Actor.objects.create(user=user, name=name, **defaults)
+
+    def create_party(self, actors=(), songs=0, **kwargs):
+        defaults = {
+            'day': 'Friday',
+            'date': date(2025, 1, 1),
+            'time': time(18, 0),
+            'duration': timedelta(hours=3),
+            'place': 'Hall',
+            'number_of_actors': len(actors),
+            'meeting_time': time(16, 0),
+            'meeting_date': date(2025, 1, 1),
+            'meeting_place': 'Office',
+            'transport_vehicle': 'Van',
+            'camera_man': 'Sami',
+            'dress_details': 'White',
+            'created_by': self.admin,
+        }
+        defaults.update(kwargs)
+        party = Party.objects.create(**defaults)
+        party.actors.set(actors)
+        for index in range(songs):
+            Song.objects.create(party=party, title=f'Song {index}', order=index)
+        return party
+
+    def party_data(self, **overrides):
+        data = {
+            'day': 'Friday', 'date': '2025-05-02', 'time': '18:00', 'duration': '03:00:00',
+            'place': 'Palm Hall', 'number_of_actors': 1, 'meeting_time': '16:00',
+            'meeting_date': '2025-05-02', 'meeting_place': 'Office', 'transport_vehicle': 'Van',
+            'camera_man': 'Sami', 'dress_details': 'White', 'actor_ids': [],
+        }
+        data.update(overrides)
+        return data
+
+    def party_payload(self, party, **overrides):
+        payload = {
+            field: getattr(party, field)
+            for field in (
+                'day', 'date', 'time', 'duration', 'place', 'event', 'number_of_actors', 'meeting_time',
+                'meeting_date', 'meeting_place', 'transport_vehicle', 'camera_man', 'dress_details', 'status',
+            )
+        }
+        payload['actor_ids'] = [actor.pk for actor in party.actors.all()]
+        payload.update(overrides)
+        return payload
+
+    def search_parties(self, query):
+        ranked = search.filter_ranked(Party.objects.all(), 'party', query).order_by('search_rank', '-pk')
+        return list(ranked.values_list('pk', flat=True))
+
+
+class PartyListQueryCountTests(APITestCase):
+    def seed(self, count):
+        actors = [self.create_actor(f'Actor{index}') for index in range(3)]
+        for index in range(count):
+            self.create_party(actors=actors, songs=2, date=date(2025, 1, 1) + timedelta(days=index))
+
+    def count_list_queries(self, user, **params):
+        # Authenticate with a fresh instance so cached relations do not leak
+        # between measurements, just like separate HTTP requests.
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/auth/parties/', params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_admin_list_query_count_is_constant(self):
+        self.seed(2)
+        small = self.count_list_queries(self.admin)
+        self.seed(10)
+        self.assertEqual(self.count_list_queries(self.admin), small)
+
+    def test_actor_list_query_count_is_constant(self):
+        actor = self.create_actor('Viewer', can_access_parties=True)
+        self.seed(2)
+        small = self.count_list_queries(actor.user)
+        self.seed(10)
+        self.assertEqual(self.count_list_queries(actor.user), small)
+
+    def test_list_payload_uses_prefetched_data(self):
+        actor = self.create_actor('Viewer', can_access_parties=True)
+        self.create_party(actors=[actor], songs=2)
+        client = APIClient()
+        client.force_authenticate(actor.user)
+        party = client.get('/api/auth/parties/', {'expand': 'actors'}).json()['results'][0]
+        self.assertTrue(party['is_visible'])
+        self.assertEqual(party['actors'][0]['parties_count'], 1)
+        self.assertEqual([song['order'] for song in party['songs']], [0, 1])
+
+    def test_expanded_list_query_count_is_constant(self):
+        self.seed(2)
+        small = self.count_list_queries(self.admin, expand='actors')
+        self.seed(10)
+        self.assertEqual(self.count_list_queries(self.admin, expand='actors'), small)
+
+
+class ActorListQueryCountTests(APITestCase):
+    def seed(self, count):
+        for index in range(count):
+            actor = self.create_actor(f'Actor{index}')
+            self.create_party(actors=[actor], status='pending')
+            self.create_party(actors=[actor], status='done')
+
+    def count_list_queries(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.admin.pk))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/auth/actors/')
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()['results']
+
+    def test_query_count_is_constant(self):
+        self.seed(2)
+        small, _ = self.count_list_queries()
+        self.seed(10)
+        count, results = self.count_list_queries()
+        self.assertEqual(count, small)
+        self.assertEqual(len(results), 12)
+
+    def test_counts_are_split_by_status(self):
+        actor = self.create_actor('Huda', can_access_actors=True)
+        self.create_party(actors=[actor], status='in_progress')
+        self.create_party(actors=[actor], status='done')
+        self.create_party(actors=[actor], status='cancelled')
+        listed = self.client.get('/api/auth/actors/').json()['results'][0]
+        counts = {key: listed[key] for key in ('parties_count', 'upcoming_parties_count', 'completed_parties_count')}
+        self.assertEqual(counts, {'parties_count': 3, 'upcoming_parties_count': 1, 'completed_parties_count': 1})
+
+        # Without the annotation the serializer falls back to the rollup
+        client = APIClient()
+        client.force_authenticate(actor.user)
+        profile = client.get('/api/auth/me/').json()['actor_profile']
+        self.assertEqual({key: profile[key] for key in counts}, counts)
+
+
+class KeysetPaginationTests(APITestCase):
+    def test_party_pages_follow_ordering_with_id_tiebreaker(self):
+        # Several parties share date and time so only the id breaks ties
+        for index in range(7):
+            self.create_party(date=date(2025, 1, 1 + index % 2))
+        expected = list(Party.objects.order_by('-date', '-time', '-id').values_list('id', flat=True))
+
+        seen = []
+        url = '/api/auth/parties/?page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            seen.extend(party['id'] for party in page['results'])
+            url = page['next']
+        self.assertEqual(seen, expected)
+
+        last_page = self.client.get('/api/auth/parties/?page_size=3').json()
+        last_page = self.client.get(last_page['next']).json()
+        previous = self.client.get(last_page['previous']).json()
+        self.assertEqual([party['id'] for party in previous['results']], expected[:3])
+        self.assertIsNone(previous['previous'])
+
+    def test_page_size_is_capped(self):
+        paginator = PartyPagination()
+        request = Request(APIRequestFactory().get('/', {'page_size': 100000}))
+        self.assertEqual(paginator.get_page_size(request), paginator.max_page_size)
+
+    def test_actor_pages_ordered_by_name(self):
+        for name in ['Mona', 'Ali', 'Zaid', 'Ali', 'Huda']:
+            self.create_actor(name)
+        first = self.client.get('/api/auth/actors/?page_size=2').json()
+        second = self.client.get(first['next']).json()
+        names = [actor['name'] for actor in first['results'] + second['results']]
+        self.assertEqual(names, ['Ali', 'Ali', 'Huda', 'Mona'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/auth/parties/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+        for position in ([[1], 'x', 1], ['notadate', 'x', 1], ['2025-01-01', '18:00', 'one'], [1, 2]):
+            cursor = base64.b64encode(json.dumps({'p': position}).encode()).decode()
+            response = self.client.get('/api/auth/parties/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+
+class PartyScheduleQueryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda')
+        for day in (1, 15, 28):
+            self.create_party(actors=[self.actor], date=date(2025, 2, day), place=f'Hall {day}')
+        self.create_party(date=date(2025, 3, 1), place='Garden')
+
+    def test_date_range_and_ordering(self):
+        response = self.client.get('/api/auth/parties/?date_from=2025-02-10&date_to=2025-03-31&ordering=place')
+        self.assertEqual([party['place'] for party in response.json()['results']], ['Garden', 'Hall 15', 'Hall 28'])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get('/api/auth/parties/?ordering=notes').status_code, 400)
+        self.assertEqual(self.client.get('/api/auth/parties/?date_from=02/10/2025').status_code, 400)
+        self.assertEqual(self.client.get('/api/auth/parties/?date_from=2025-03-01&date_to=2025-02-01').status_code, 400)
+
+    def test_calendar_window(self):
+        response = self.client.get('/api/auth/parties/calendar/?date_from=2025-02-01')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['date_to'], '2025-02-28')
+        self.assertEqual([party['date'] for party in data['results']], ['2025-02-01', '2025-02-15', '2025-02-28'])
+        self.assertNotIn('dress_details', data['results'][0])
+        self.assertEqual(data['results'][0]['actors'], [{'id': self.actor.id, 'name': 'Huda', 'family': 'Family'}])
+
+    def test_calendar_window_is_bounded(self):
+        response = self.client.get('/api/auth/parties/calendar/?date_from=2024-01-01&date_to=2025-12-31')
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchTests(APITestCase):
+    def test_party_search_prefix_and_actor_names(self):
+        actor = self.create_actor('Mohammed', family='Saleh')
+        garden = self.create_party(place='Rose Garden')
+        hall = self.create_party(actors=[actor], place='Grand Hall')
+
+        results = self.client.get('/api/auth/parties/?search=gard').json()['results']
+        self.assertEqual([party['id'] for party in results], [garden.id])
+        results = self.client.get('/api/auth/parties/?search=moham sal').json()['results']
+        self.assertEqual([party['id'] for party in results], [hall.id])
+
+    def test_index_follows_actor_changes(self):
+        actor = self.create_actor('Ali')
+        party = self.create_party(actors=[actor])
+        actor.name = 'Omar'
+        actor.save()
+        self.assertEqual(self.search_parties('omar'), [party.id])
+        self.assertEqual(self.search_parties('ali'), [])
+
+        actor.parties.remove(party)
+        self.assertEqual(self.search_parties('omar'), [])
+        party.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='party').exists())
+
+    def test_arabic_normalization(self):
+        # Diacritics, tatweel and hamza forms are folded on both sides
+        actor = self.create_actor('أَحْمَـد', family='الزهراء', role='مُنشِد')
+        results = self.client.get('/api/auth/actors/?name=احمد').json()['results']
+        self.assertEqual([row['id'] for row in results], [actor.id])
+        results = self.client.get('/api/auth/actors/?name=منشد الزهرا').json()['results']
+        self.assertEqual([row['id'] for row in results], [actor.id])
+
+    def test_ranked_results(self):
+        self.create_actor('Sara', family='Hall', role='Singer')
+        best = self.create_actor('Sara', family='Sara', role='Sara')
+        results = self.client.get('/api/auth/actors/?name=sara').json()['results']
+        self.assertEqual(results[0]['id'], best.id)
+
+    def test_filters_and_pages_reach_every_match(self):
+        done = self.create_party(place='Rose Garden', status='done', date=date(2024, 1, 1))
+        pending = [self.create_party(place='Rose Garden', date=date(2025, 1, day)) for day in range(1, 6)]
+        results = self.client.get('/api/auth/parties/', {'search': 'garden', 'status': 'done'}).json()['results']
+        self.assertEqual([party['id'] for party in results], [done.id])
+
+        seen, url = [], '/api/auth/parties/?search=garden&page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            seen += [party['id'] for party in page['results']]
+            url = page['next']
+        self.assertEqual(sorted(seen), sorted([done.id] + [party.id for party in pending]))
+
+
+class DashboardStatsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda', can_access_parties=True)
+        today = date.today()
+        self.create_party(actors=[self.actor], date=today + timedelta(days=1), status='pending')
+        self.create_party(actors=[self.actor], date=today - timedelta(days=40), status='done')
+        self.create_party(date=today - timedelta(days=40), status='cancelled')
+
+    def get_stats(self, user):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/auth/dashboard/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(context.captured_queries)
+
+    def test_admin_stats(self):
+        data, _ = self.get_stats(self.admin)
+        self.assertEqual(data['total_actors'], 1)
+        self.assertEqual(data['total_parties'], 3)
+        self.assertEqual(data['upcoming_parties'], 1)
+        self.assertEqual(data['completed_parties'], 1)
+        self.assertEqual(data['top_actors'], [{'name': 'Huda', 'family': 'Family', 'party_count': 2}])
+        self.assertEqual(sum(row['parties'] for row in data['monthly_activity']), 3)
+        self.assertEqual(data['status_distribution'], [
+            {'status': 'cancelled', 'count': 1},
+            {'status': 'done', 'count': 1},
+            {'status': 'pending', 'count': 1},
+        ])
+
+    def test_actor_stats(self):
+        data, _ = self.get_stats(self.actor.user)
+        self.assertEqual(data['my_total_parties'], 2)
+        self.assertEqual(data['my_upcoming_parties'], 1)
+        self.assertEqual(data['my_completed_parties'], 1)
+
+    def test_repeat_loads_are_cached_until_a_write(self):
+        _, first = self.get_stats(self.admin)
+        data, cached = self.get_stats(self.admin)
+        self.assertLess(cached, first)
+        self.assertEqual(data['total_parties'], 3)
+
+        self.create_party(status='done')
+        data, _ = self.get_stats(self.admin)
+        self.assertEqual(data['total_parties'], 4)
+        self.assertEqual(data['completed_parties'], 2)
+
+    def test_writes_from_other_processes_invalidate(self):
+        self.get_stats(self.admin)
+        # Sends no signals, like a write in another worker
+        Party.objects.filter(status='pending').update(status='done', updated_at=timezone.now())
+        data, _ = self.get_stats(self.admin)
+        self.assertEqual(data['upcoming_parties'], 0)
+
+
+class RollupTests(APITestCase):
+    def test_rollups_follow_writes(self):
+        ali, huda = self.create_actor('Ali'), self.create_actor('Huda')
+        party = self.create_party(actors=[ali, huda], status='pending')
+        other = self.create_party(actors=[ali], date=date(2025, 3, 5))
+        self.assertEqual(rollups.check(), {})
+
+        party.status = 'done'
+        party.date = date(2025, 2, 1)
+        party.save()
+        party.actors.remove(huda)
+        huda.parties.add(other)
+        ali.parties.clear()
+        self.assertEqual(rollups.check(), {})
+
+        other.delete()
+        huda.delete()
+        self.assertEqual(rollups.check(), {})
+        self.assertEqual(
+            list(MonthlyPartyStat.objects.filter(count__gt=0).values_list('month', 'status', 'count')),
+            [(date(2025, 2, 1), 'done', 1)],
+        )
+
+    def test_track_bulk_updates(self):
+        actor = self.create_actor('Ali')
+        parties = [self.create_party(actors=[actor]) for _ in range(3)]
+        ids = [party.pk for party in parties]
+        with rollups.track(ids):
+            Party.objects.filter(pk__in=ids).update(status='cancelled')
+        self.assertEqual(rollups.check(), {})
+
+    def test_rebuild_and_serializer_counts(self):
+        actor = self.create_actor('Ali')
+        self.create_party(actors=[actor])
+        self.create_party(actors=[actor], status='done')
+        ActorPartyStat.objects.all().delete()
+        self.assertNotEqual(rollups.check(), {})
+        rollups.rebuild()
+        self.assertEqual(rollups.check(), {})
+        self.assertEqual(ActorSerializer(actor).data['parties_count'], 2)
+        self.assertEqual(Actor.objects.with_party_counts().get(pk=actor.pk).parties_count, 2)
+
+
+class PartySongWriteTests(APITestCase):
+    def test_update_diffs_songs_in_bounded_queries(self):
+        party = self.create_party(songs=30)
+        songs = list(party.songs.all())
+        # Keep 0-27 with 5 renamed, swap 28 and 29, drop nothing, add two
+        payload = [{'id': song.id, 'title': song.title} for song in songs[:28]]
+        for entry in payload[:5]:
+            entry['title'] += ' (live)'
+        payload += [{'id': songs[29].id, 'title': songs[29].title}, {'id': songs[28].id, 'title': songs[28].title}]
+        payload += [{'title': 'New A'}, {'title': 'New B'}]
+
+        serializer = PartySerializer(party, data=self.party_payload(party, songs=payload))
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as context:
+            serializer.save()
+        song_queries = [query for query in context.captured_queries if 'authentication_song' in query['sql']]
+        self.assertLessEqual(len(song_queries), 3)
+
+        stored = list(party.songs.values_list('id', 'title', 'order'))
+        self.assertEqual([title for _, title, _ in stored], [entry['title'] for entry in payload])
+        self.assertEqual([order for _, _, order in stored], list(range(32)))
+        self.assertEqual([song_id for song_id, _, _ in stored[:30]], [entry['id'] for entry in payload[:30]])
+
+    def test_update_matches_songs_without_ids_by_title(self):
+        party = self.create_party(songs=3)
+        kept = party.songs.get(title='Song 2')
+        serializer = PartySerializer(party, data=self.party_payload(party, songs=[{'title': 'Song 2'}]))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(list(party.songs.values_list('id', 'order')), [(kept.id, 0)])
+
+
+class PartyBatchTests(APITestCase):
+    def test_mixed_batch(self):
+        actor = self.create_actor('Huda')
+        existing = self.create_party(actors=[actor])
+        finished = self.create_party()
+        operations = [
+            {'action': 'create', 'data': self.party_data(actor_ids=[actor.id], songs=[{'title': 'Zaffa'}])},
+            {'action': 'create', 'data': self.party_data(place='Rose Garden')},
+            {'action': 'update', 'id': existing.id, 'data': {'place': 'Sea View', 'actor_ids': []}},
+            {'action': 'status', 'id': finished.id, 'status': 'done'},
+        ]
+        response = self.client.post('/api/auth/parties/bulk/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        self.assertEqual([result['action'] for result in results], ['create', 'create', 'update', 'status'])
+
+        created = Party.objects.get(pk=results[0]['id'])
+        self.assertEqual(list(created.actors.all()), [actor])
+        self.assertEqual(list(created.songs.values_list('title', flat=True)), ['Zaffa'])
+        self.assertEqual(created.created_by, self.admin)
+        existing.refresh_from_db()
+        self.assertEqual(existing.place, 'Sea View')
+        self.assertFalse(existing.actors.exists())
+        self.assertEqual(Party.objects.get(pk=finished.id).status, 'done')
+
+        # Signals were bypassed, so the side tables are maintained by hand
+        self.assertEqual(rollups.check(), {})
+        self.assertEqual(self.search_parties('sea view'), [existing.id])
+        self.assertEqual(self.search_parties('huda'), [created.id])
+
+    def test_repeated_actor_ids_are_one_membership(self):
+        actor = self.create_actor('Huda')
+        operations = [{'action': 'create', 'data': self.party_data(actor_ids=[actor.id, actor.id])}]
+        response = self.client.post('/api/auth/parties/bulk/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(list(Party.objects.get(pk=response.json()['results'][0]['id']).actors.all()), [actor])
+        self.assertEqual(rollups.check(), {})
+
+    def test_updated_playlists_keep_their_song_ids(self):
+        party = self.create_party(songs=2)
+        first, second = party.songs.order_by('order')
+        songs = [{'id': second.id, 'title': 'Song 1'}, {'title': 'Song 0'}, {'title': 'New'}]
+        operations = [{'action': 'update', 'id': party.id, 'data': {'songs': songs}}]
+        response = self.client.post('/api/auth/parties/bulk/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [(song.title, song.pk in (first.pk, second.pk)) for song in party.songs.order_by('order')],
+            [('Song 1', True), ('Song 0', True), ('New', False)],
+        )
+        self.assertEqual(party.songs.get(title='Song 0').pk, first.pk)
+
+    def test_errors_are_reported_per_item_and_nothing_is_written(self):
+        party = self.create_party()
+        operations = [
+            {'action': 'create', 'data': self.party_data()},
+            {'action': 'status', 'id': party.id, 'status': 'lost'},
+            {'action': 'update', 'id': 999999, 'data': {}},
+            {'action': 'create', 'data': self.party_data(actor_ids=[424242])},
+        ]
+        response = self.client.post('/api/auth/parties/bulk/', {'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('status', errors[1])
+        self.assertIn('id', errors[2])
+        self.assertIn('actor_ids', errors[3])
+        self.assertEqual(Party.objects.count(), 1)
+
+    def test_query_count_does_not_grow_per_create(self):
+        actor = self.create_actor('Huda')
+        days = iter(range(100))
+
+        def run(count):
+            # One party a day: the actor cannot be booked twice at once
+            operations = []
+            for _ in range(count):
+                day = (date(2025, 5, 1) + timedelta(days=next(days))).isoformat()
+                data = self.party_data(actor_ids=[actor.id], songs=[{'title': 'A'}], date=day, meeting_date=day)
+                operations.append({'action': 'create', 'data': data})
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post('/api/auth/parties/bulk/', operations, format='json')
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        run(1)  # creates the rollup buckets
+        self.assertEqual(run(2), run(20))
+
+
+class AuthenticationQueryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda', can_access_parties=True)
+        self.actor.user.set_password('pass')
+        self.actor.user.save()
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+    def token_client(self):
+        response = self.client.post('/api/auth/login/', {'username': self.actor.user.username, 'password': 'pass'})
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        return client
+
+    def identity_queries(self, client):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/auth/dashboard/stats/')
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries if '"auth_user"' in query['sql']]
+
+    def test_user_and_actor_load_in_one_query(self):
+        queries = self.identity_queries(self.token_client())
+        self.assertEqual(len(queries), 1)
+        self.assertIn('authentication_actor', queries[0])
+
+    @override_settings(AUTH_USER_CACHE_TTL=60)
+    def test_cached_identity_is_evicted_on_actor_save(self):
+        client = self.token_client()
+        self.assertEqual(len(self.identity_queries(client)), 1)
+        self.assertEqual(self.identity_queries(client), [])
+
+        self.actor.can_access_dashboard = False
+        self.actor.save()
+        self.assertEqual(client.get('/api/auth/dashboard/stats/').status_code, 403)
+
+
+class StatelessAuthenticationTests(APITestCase):
+    token_client = AuthenticationQueryTests.token_client
+
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda', can_access_parties=True)
+        self.actor.user.set_password('pass')
+        self.actor.user.save()
+        for view in (PartyViewSet, UserDetailView):
+            patcher = mock.patch.object(view, 'authentication_classes', [StatelessJWTAuthentication])
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_safe_requests_skip_the_user_query(self):
+        client = self.token_client()
+        client.get('/api/auth/parties/')  # warms the token version cache
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/auth/parties/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in context.captured_queries if 'FROM "auth_user"' in query['sql']])
+        self.assertEqual(client.get('/api/auth/me/').json()['username'], self.actor.user.username)
+
+    def test_permission_change_invalidates_issued_tokens(self):
+        client = self.token_client()
+        self.assertEqual(client.get('/api/auth/parties/').status_code, 200)
+
+        self.actor.can_access_parties = False
+        self.actor.save()
+        self.assertEqual(client.get('/api/auth/parties/').status_code, 401)
+        self.assertEqual(self.token_client().get('/api/auth/parties/').status_code, 403)
+
+        # Saves that leave the flags alone keep tokens valid
+        client = self.token_client()
+        self.actor.age += 1
+        self.actor.save()
+        self.assertEqual(client.get('/api/auth/parties/').status_code, 403)
+
+    def test_outdated_refresh_tokens_are_refused(self):
+        login = {'username': self.actor.user.username, 'password': 'pass'}
+        refresh = self.client.post('/api/auth/login/', login).json()['refresh']
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': refresh}).status_code, 200)
+
+        self.actor.can_access_parties = False
+        self.actor.save()
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': refresh}).status_code, 401)
+        refresh = self.client.post('/api/auth/login/', login).json()['refresh']
+        self.assertEqual(self.client.post('/api/auth/token/refresh/', {'refresh': refresh}).status_code, 200)
+
+    @override_settings(JWT_TOKEN_VERSION_TTL=7)
+    def test_token_versions_expire_from_the_cache(self):
+        # Other workers' per-process caches catch up once the entry expires
+        cache.clear()
+        with mock.patch.object(cache, 'set') as cache_set:
+            auth.get_token_version(self.actor.pk)
+        cache_set.assert_called_once_with(f'actor:token-version:{self.actor.pk}', 0, timeout=7)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.party = self.create_party([self.create_actor('Omar')])
+
+    def test_unchanged_collection_returns_not_modified_in_one_query(self):
+        response = self.client.get('/api/auth/parties/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/auth/parties/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/api/auth/parties/')['ETag']
+        self.party.place = 'Elsewhere'
+        self.party.save()
+        self.assertEqual(self.client.get('/api/auth/parties/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get('/api/auth/actors/')['ETag']
+        Actor.objects.get(name='Omar').delete()
+        self.assertEqual(self.client.get('/api/auth/actors/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_user_renames_and_song_writes_change_the_etag(self):
+        etag = self.client.get('/api/auth/actors/')['ETag']
+        user = Actor.objects.get(name='Omar').user
+        user.username = 'renamed'
+        user.save()
+        response = self.client.get('/api/auth/actors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['username'], 'renamed')
+
+        etag = self.client.get('/api/auth/parties/')['ETag']
+        self.party.songs.create(title='New', order=9)
+        self.assertEqual(self.client.get('/api/auth/parties/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_url_and_requester(self):
+        etag = self.client.get('/api/auth/dashboard/stats/')['ETag']
+        self.assertEqual(self.client.get('/api/auth/dashboard/stats/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get('/api/auth/parties/?status=done')['ETag'], self.client.get('/api/auth/parties/')['ETag'])
+
+        actor = self.create_actor('Huda', can_access_dashboard=True)
+        self.client.force_authenticate(actor.user)
+        self.assertEqual(self.client.get('/api/auth/dashboard/stats/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(PARTY_CHANGES_SETTLE_SECONDS=0)
+class PartyChangesTests(APITestCase):
+    def changes(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/auth/parties/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_then_only_changes(self):
+        first, second = self.create_party(), self.create_party()
+        feed = self.changes()
+        self.assertEqual([party['id'] for party in feed['upserts']], [first.pk, second.pk])
+        self.assertEqual(feed['deletions'], [])
+
+        feed = self.changes(feed['cursor'])
+        self.assertEqual((feed['upserts'], feed['deletions']), ([], []))
+
+        first.place = 'Moved'
+        first.save()
+        second_id = second.pk
+        second.delete()
+        feed = self.changes(feed['cursor'])
+        self.assertEqual([party['place'] for party in feed['upserts']], ['Moved'])
+        self.assertEqual([deletion['id'] for deletion in feed['deletions']], [second_id])
+
+    def test_actor_changes_reach_their_parties(self):
+        actor = self.create_actor('Omar')
+        party = self.create_party([actor])
+        cursor = self.changes()['cursor']
+        actor.name = 'Omar Ali'
+        actor.save()
+        feed = self.changes(cursor)
+        self.assertEqual([party['id'] for party in feed['upserts']], [party.pk])
+        self.assertEqual(feed['upserts'][0]['actors'][0]['display_name'], 'Omar Ali Family')
+
+    def test_other_actor_saves_leave_their_parties_alone(self):
+        actor = self.create_actor('Omar')
+        self.create_party([actor])
+        cursor = self.changes()['cursor']
+        actor.role = 'Singer'
+        actor.save()
+        self.assertEqual(self.changes(cursor)['upserts'], [])
+
+    def test_limit_pages_through_ties(self):
+        parties = [self.create_party() for _ in range(5)]
+        Party.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        seen, cursor, has_more = [], None, True
+        while has_more:
+            feed = self.changes(cursor, page_size=2)
+            seen += [party['id'] for party in feed['upserts']]
+            cursor, has_more = feed['cursor'], feed['has_more']
+        self.assertEqual(seen, [party.pk for party in parties])
+
+    def test_invalid_and_expired_cursors(self):
+        response = self.client.get('/api/auth/parties/changes/', {'since': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        for upserts, deletions in ((None, None), (['2025-01-01T00:00:00', 1], None)):
+            cursor = sync.encode_cursor(upserts, deletions)
+            response = self.client.get('/api/auth/parties/changes/', {'since': cursor})
+            self.assertEqual(response.status_code, 400)
+
+        cursor = self.changes()['cursor']
+        with override_settings(PARTY_TOMBSTONE_RETENTION_DAYS=-1):
+            response = self.client.get('/api/auth/parties/changes/', {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+
+
+class RecordingBroker(events.Broker):
+    def __init__(self):
+        self.events = []
+
+    def publish(self, published):
+        self.events.extend(published)
+
+
+class PartyEventTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda')
+        self.party = self.create_party()
+        # Only writes made from here on publish
+        self.broker = RecordingBroker()
+        patcher = mock.patch.object(events, '_broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [(event['type'], event['id']) for event in self.broker.events]
+
+    def test_writes_publish_one_event_per_party_after_commit(self):
+        payload = self.party_payload(self.party, actor_ids=[self.actor.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/parties/', payload, format='json')
+            self.assertEqual(self.broker.events, [])
+        party_id = response.json()['id']
+        self.assertEqual(self.published(), [('party.created', party_id)])
+        self.assertEqual(self.broker.events[0]['actor_ids'], [self.actor.pk])
+
+        self.broker.events.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/auth/parties/{party_id}/', {'status': 'done'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/auth/parties/{party_id}/')
+        self.assertEqual(self.published(), [('party.status', party_id), ('party.deleted', party_id)])
+        self.assertEqual(self.broker.events[1]['actor_ids'], [self.actor.pk])
+
+    def test_rolled_back_writes_do_not_publish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.create_party(place='Lost')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.party.place = 'Kept'
+            self.party.save()
+        self.assertEqual(self.published(), [('party.updated', self.party.pk)])
+
+    def test_batch_publishes_events(self):
+        party = self.party
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/parties/bulk/', {'operations': [
+                {'action': 'create', 'data': self.party_payload(party)},
+                {'action': 'status', 'id': party.pk, 'status': 'done'},
+            ]}, format='json')
+        created_id = response.json()['results'][0]['id']
+        self.assertEqual(sorted(self.published()), [('party.created', created_id), ('party.status', party.pk)])
+
+    def test_visibility_follows_party_rules(self):
+        event = {'status': 'done', 'actor_ids': [self.actor.pk]}
+        self.assertTrue(events.is_visible(event, self.actor))
+        self.assertFalse(events.is_visible(dict(event, actor_ids=[]), self.actor))
+        self.actor.can_view_completed_parties = False
+        self.assertFalse(events.is_visible(event, self.actor))
+        self.assertTrue(events.is_visible(event, None, is_staff=True))
+
+
+@override_settings(PARTY_EVENTS_STREAM=True)
+class PartyEventStreamTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(events, '_broker', events.InMemoryBroker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.actor = self.create_actor('Huda', can_access_schedule=True)
+        self.token = str(RefreshToken.for_user(self.actor.user).access_token)
+
+    async def test_stream_delivers_visible_events(self):
+        response = await AsyncClient().get('/api/auth/parties/events/', {'token': self.token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = response.streaming_content
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+
+        broker = events.get_broker()
+        broker.publish([
+            {'type': 'party.updated', 'id': 1, 'status': 'pending', 'actor_ids': [], 'party': {}},
+            {'type': 'party.created', 'id': 2, 'status': 'pending', 'actor_ids': [self.actor.pk], 'party': {'id': 2}},
+        ])
+        chunk = await asyncio.wait_for(anext(chunks), 1)
+        self.assertEqual(chunk, b'event: party.created\ndata: {"id": 2, "party": {"id": 2}}\n\n')
+        response.close()
+        self.assertFalse(broker.has_subscribers())
+
+    async def test_stream_requires_a_valid_token(self):
+        response = await AsyncClient().get('/api/auth/parties/events/', {'token': 'nope'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_is_not_served_when_disabled(self):
+        with override_settings(PARTY_EVENTS_STREAM=False):
+            response = await AsyncClient().get('/api/auth/parties/events/', {'token': self.token})
+        self.assertEqual(response.status_code, 204)
+
+    def test_stream_is_not_served_under_wsgi(self):
+        response = self.client.get('/api/auth/parties/events/', {'token': self.token})
+        self.assertEqual(response.status_code, 204)
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.party = self.create_party([self.create_actor('Omar')])
+
+    def test_second_identical_list_is_served_from_cache(self):
+        first = self.client.get('/api/auth/parties/', {'status': 'all', 'search': ''})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        # Same request once normalized: no serialization queries, only the
+        # conditional GET fingerprint
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/auth/parties/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.client.get('/api/auth/parties/', {'status': 'done'})['X-Cache'], 'MISS')
+
+    def test_party_actor_and_song_writes_invalidate(self):
+        self.client.get('/api/auth/parties/')
+        self.client.get('/api/auth/actors/')
+
+        self.party.songs.create(title='New', order=9)
+        response = self.client.get('/api/auth/parties/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('New', [song['title'] for song in response.json()['results'][0]['songs']])
+
+        actor = Actor.objects.get(name='Omar')
+        actor.name = 'Omar Ali'
+        actor.save()
+        response = self.client.get('/api/auth/actors/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], 'Omar Ali')
+
+    def test_writes_from_other_processes_invalidate(self):
+        self.client.get('/api/auth/parties/')
+        # update() sends no signals, so this process's versions stay put, as
+        # they do when another worker writes
+        Party.objects.filter(pk=self.party.pk).update(place='Garden', updated_at=timezone.now())
+        response = self.client.get('/api/auth/parties/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['place'], 'Garden')
+
+    def test_entries_are_per_permission_scope(self):
+        self.client.get('/api/auth/parties/')
+        actor = self.create_actor('Huda', can_access_parties=True)
+        self.client.force_authenticate(actor.user)
+        self.assertEqual(self.client.get('/api/auth/parties/')['X-Cache'], 'MISS')
+
+    def test_statistics_endpoint(self):
+        self.client.get('/api/auth/actors/')
+        self.client.get('/api/auth/actors/')
+        stats = self.client.get('/api/auth/cache/stats/').json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+        self.assertEqual(stats['backend'], 'LocMemCache')
+
+        self.client.force_authenticate(self.create_actor('Huda', can_access_dashboard=True).user)
+        self.assertEqual(self.client.get('/api/auth/cache/stats/').status_code, 403)
+
+
+class PartyFieldSelectionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Omar')
+        self.party = self.create_party([self.actor], songs=1)
+
+    def test_list_is_compact_and_retrieve_is_full(self):
+        listed = self.client.get('/api/auth/parties/').json()['results'][0]
+        self.assertEqual(listed['actors'], [{'id': self.actor.pk, 'display_name': 'Omar Family'}])
+        detail = self.client.get(f'/api/auth/parties/{self.party.pk}/').json()
+        self.assertIn('can_manage_parties', detail['actors'][0])
+
+    def test_fields_limit_payload_and_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/auth/parties/', {'fields': 'id,date,place'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'date', 'place'})
+        # Neither songs, actors nor the creator are loaded
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('authentication_song', sql)
+        self.assertNotIn('authentication_party_actors', sql)
+        self.assertNotIn('"auth_user"', sql)
+
+        detail = self.client.get(f'/api/auth/parties/{self.party.pk}/', {'fields': 'id,actors'}).json()
+        self.assertEqual(set(detail), {'id', 'actors'})
+
+    def test_unknown_fields_and_expansions_are_rejected(self):
+        self.assertEqual(self.client.get('/api/auth/parties/', {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/auth/parties/', {'expand': 'songs'}).status_code, 400)
+
+
+class RenderingTests(APITestCase):
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'when': timezone.now(), 'day': date(2025, 1, 2), 'at': time(18, 30, 15, 123456),
+            'duration': timedelta(hours=3), 'amount': Decimal('1.50'), 'label': gettext_lazy('Done'),
+            'text': 'قاعة الأفراح\u2028line', 'nested': [{'id': 1, 'actors': []}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_large_api_responses_are_compressed(self):
+        for _ in range(5):
+            self.create_party(songs=3)
+        plain = self.client.get('/api/auth/parties/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+        response = self.client.get('/api/auth/parties/', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+        self.assertTrue(response['ETag'].startswith('W/'))
+        not_modified = self.client.get(
+            '/api/auth/parties/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    @override_settings(API_COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_responses_are_sent_as_is(self):
+        response = self.client.get('/api/auth/parties/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class PartyExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda', can_access_schedule=True, can_view_completed_parties=False)
+        self.create_party(actors=[self.actor], songs=2, date=date(2025, 2, 1), place='Hall, "North"')
+        self.create_party(actors=[self.actor], date=date(2025, 2, 2), place='Garden', status='done')
+        self.create_party(date=date(2025, 3, 1), place='Beach')
+
+    def export_rows(self, client=None, **params):
+        response = (client or self.client).get('/api/auth/parties/export/', params)
+        self.assertEqual(response.status_code, 200)
+        text = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(text)))
+
+    def test_csv_follows_list_filters(self):
+        header, *rows = self.export_rows(date_to='2025-02-28', ordering='date')
+        self.assertEqual(header[:5], ['Date', 'Day', 'Time', 'Duration', 'Place'])
+        self.assertEqual([row[4] for row in rows], ['Hall, "North"', 'Garden'])
+        self.assertEqual(rows[0][header.index('Actors')], 'Huda Family')
+        self.assertEqual(rows[0][header.index('Songs')], 'Song 0; Song 1')
+        self.assertEqual(rows[0][header.index('Duration')], '3:00')
+
+    def test_actor_export_respects_visibility(self):
+        client = APIClient()
+        client.force_authenticate(self.actor.user)
+        self.assertEqual([row[4] for row in self.export_rows(client)[1:]], ['Hall, "North"'])
+
+    def test_queries_do_not_grow_per_party(self):
+        for _ in range(10):
+            self.create_party(actors=[self.actor], songs=2)
+        with mock.patch.object(PartyViewSet, 'export_chunk_size', 5):
+            with CaptureQueriesContext(connection) as queries:
+                rows = self.export_rows()
+        self.assertEqual(len(rows), 14)
+        # Per chunk of five: parties, actors and songs
+        party_queries = [query for query in queries if 'authentication_party' in query['sql']]
+        self.assertLessEqual(len(party_queries), 3 * 3)
+
+    def test_xlsx_is_a_valid_workbook(self):
+        response = self.client.get('/api/auth/parties/export/', {'type': 'xlsx'})
+        self.assertIn('.xlsx', response['Content-Disposition'])
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('<t xml:space="preserve">Hall, "North"</t>', sheet)
+
+    def test_formulas_are_quoted_in_csv_only(self):
+        values = {
+            'Day': '=1+1', 'Place': '=HYPERLINK("http://x")', 'Notes': '- bring drums', 'Camera man': '+1',
+            'Dress details': '@SUM(A1)', 'Meeting place': 'Office - Gate 2',
+        }
+        self.create_party(
+            date=date(2025, 4, 1), day=values['Day'], place=values['Place'], notes=values['Notes'],
+            camera_man=values['Camera man'], dress_details=values['Dress details'],
+            meeting_place=values['Meeting place'],
+        )
+        header, row = self.export_rows(date_from='2025-04-01')
+        self.assertEqual({title: row[header.index(title)] for title in values}, {
+            title: value if title == 'Meeting place' else f"'{value}" for title, value in values.items()
+        })
+
+        # Inline strings are never evaluated, so the workbook keeps the text as is
+        response = self.client.get('/api/auth/parties/export/', {'type': 'xlsx', 'date_from': '2025-04-01'})
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        for value in values.values():
+            self.assertIn(f'<t xml:space="preserve">{xml_escape(value)}</t>', sheet)
+        self.assertNotIn("'", sheet.split('<sheetData>')[1])
+
+    def test_unknown_type_is_rejected(self):
+        self.assertEqual(self.client.get('/api/auth/parties/export/', {'type': 'pdf'}).status_code, 400)
+
+
+class CalendarFeedTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda', can_access_schedule=True, can_view_completed_parties=False)
+        soon = timezone.localdate() + timedelta(days=7)
+        self.party = self.create_party(actors=[self.actor], date=soon, meeting_date=soon, place='Hall; North')
+        self.create_party(actors=[self.actor], date=soon, meeting_date=soon, place='Garden', status='done')
+        self.create_party(date=soon, meeting_date=soon, place='Beach')
+
+    def feed_url(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/auth/calendar/').json()['url']
+
+    def test_actor_feed_lists_visible_parties_and_meetings(self):
+        response = self.client.get(self.feed_url(self.actor.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode('utf-8')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn(f'UID:party-{self.party.pk}-meeting@', body)
+        self.assertIn('LOCATION:Hall\\; North', body)
+        self.assertIn('Actors: Huda Family', body)
+        # Wall-clock times, shown at the hour they were entered
+        day = self.party.date.strftime('%Y%m%d')
+        self.assertIn(f'DTSTART:{day}T180000\r\nDTEND:{day}T210000\r\n', body)
+        self.assertIn(f'DTSTART:{day}T160000\r\n', body)
+
+        admin_body = self.client.get(self.feed_url(self.admin)).content.decode('utf-8')
+        self.assertEqual(admin_body.count('BEGIN:VEVENT'), 6)
+
+    def test_unchanged_feed_is_cheap_and_revalidates(self):
+        url = self.feed_url(self.actor.user)
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        # Rendered events are reused: only the token user and the feed rows are read
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(url)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(again.content, first.content)
+
+        self.party.place = 'Hall South'
+        self.party.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn('LOCATION:Hall South', changed.content.decode('utf-8'))
+
+    def test_tokens_are_checked(self):
+        url = self.feed_url(self.actor.user)
+        self.assertEqual(self.client.get(url.replace('.ics', 'x.ics')).status_code, 404)
+        self.actor.user.set_password('changed')
+        self.actor.user.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_long_lines_are_folded(self):
+        line = 'DESCRIPTION:' + 'قاعة ' * 40
+        folded = ical.fold(line)
+        self.assertTrue(all(len(piece.encode('utf-8')) <= 75 for piece in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), line)
+
+
+class AvailabilityTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.huda = self.create_actor('Huda')
+        self.sami = self.create_actor('Sami')
+        # Busy 16:00 (meeting) to 21:00
+        self.booked = self.create_party(actors=[self.huda], date=date(2025, 6, 1), meeting_date=date(2025, 6, 1))
+
+    def party_data(self, **overrides):
+        defaults = {'date': '2025-06-01', 'meeting_date': '2025-06-01', 'time': '20:00'}
+        return super().party_data(**dict(defaults, **overrides))
+
+    def test_overlapping_booking_is_rejected(self):
+        response = self.client.post('/api/auth/parties/', self.party_data(actor_ids=[self.huda.id]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'party #{self.booked.id}', response.json()['actor_ids'][0])
+
+        later = self.party_data(actor_ids=[self.huda.id], time='22:00', meeting_time='21:00')
+        self.assertEqual(self.client.post('/api/auth/parties/', later, format='json').status_code, 201)
+
+    def test_long_parties_block_the_days_they_run_into(self):
+        self.booked.duration = timedelta(days=5)
+        self.booked.save()
+        later = self.party_data(actor_ids=[self.huda.id], date='2025-06-04', meeting_date='2025-06-04')
+        response = self.client.post('/api/auth/parties/', later, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'party #{self.booked.id}', response.json()['actor_ids'][0])
+
+    def test_cancelled_parties_and_the_party_itself_do_not_conflict(self):
+        response = self.client.patch(f'/api/auth/parties/{self.booked.id}/', {'time': '18:30'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.booked.status = 'cancelled'
+        self.booked.save()
+        response = self.client.post('/api/auth/parties/', self.party_data(actor_ids=[self.huda.id]), format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_existing_overlaps_only_block_changes_to_the_booking(self):
+        # Booked before conflicts were checked
+        overlapping = self.create_party(actors=[self.huda], date=date(2025, 6, 1), meeting_date=date(2025, 6, 1))
+        url = f'/api/auth/parties/{overlapping.id}/'
+        self.assertEqual(self.client.patch(url, {'status': 'in_progress'}, format='json').status_code, 200)
+        operations = [{'action': 'status', 'id': overlapping.id, 'status': 'done'}]
+        self.assertEqual(self.client.post('/api/auth/parties/bulk/', operations, format='json').status_code, 200)
+
+        # Gaining a free actor is fine, moving the party is checked again
+        response = self.client.patch(url, {'actor_ids': [self.huda.id, self.sami.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.patch(url, {'time': '19:00'}, format='json').status_code, 400)
+
+    def test_batch_bookings_are_checked_against_each_other(self):
+        operations = [
+            {'action': 'create', 'data': self.party_data(actor_ids=[self.sami.id], date='2025-06-02')},
+            {'action': 'create', 'data': self.party_data(actor_ids=[self.sami.id], date='2025-06-02')},
+        ]
+        response = self.client.post('/api/auth/parties/bulk/', operations, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('another party of this request', errors[1]['actor_ids'][0])
+
+    def test_free_slots_for_several_actors(self):
+        self.create_party(actors=[self.sami], date=date(2025, 6, 1), time=time(10, 0), duration=timedelta(hours=1),
+                          meeting_date=date(2025, 6, 1), meeting_time=time(9, 30))
+        response = self.client.get('/api/auth/actors/availability/', {
+            'actor_ids': f'{self.huda.id},{self.sami.id}', 'date_from': '2025-06-01', 'date_to': '2025-06-01',
+            'min_minutes': 60,
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(
+            [(slot['start'][11:16], slot['end'][11:16]) for slot in data['free']],
+            [('00:00', '09:30'), ('11:00', '16:00'), ('21:00', '00:00')],
+        )
+        self.assertEqual(data['busy'][str(self.huda.id)][0]['party_id'], self.booked.id)
+        bad = self.client.get('/api/auth/actors/availability/', {'actor_ids': '999', 'date_from': '2025-06-01',
+                                                               'date_to': '2025-06-01'})
+        self.assertEqual(bad.status_code, 400)
+
+    def test_overlapping_matches_a_full_scan(self):
+        schedule = availability.ActorSchedule()
+        base = datetime(2025, 1, 1)
+        intervals = [
+            availability.Interval(base + timedelta(hours=start), base + timedelta(hours=start + length), index + 1)
+            for index, (start, length) in enumerate([(0, 5), (1, 1), (3, 30), (10, 2), (12, 1), (40, 3), (41, 1)])
+        ]
+        for interval in intervals:
+            schedule.add(7, interval)
+        for start in range(0, 48):
+            for length in (1, 3, 8):
+                query = (base + timedelta(hours=start), base + timedelta(hours=start + length))
+                expected = [interval for interval in intervals if interval.start < query[1] and interval.end > query[0]]
+                self.assertEqual(schedule.overlapping(7, *query), expected)
+
+
+class AssignmentTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.singer = self.create_actor('Huda', role='Singer')
+        self.drummer = self.create_actor('Sami', role='Drummer')
+        # The drummer is already busy elsewhere that week, so carries more load
+        self.create_party(actors=[self.drummer], date=date(2025, 7, 3), meeting_date=date(2025, 7, 3),
+                          status='in_progress')
+
+    def pending(self, at, actors=(), number_of_actors=1):
+        return self.create_party(actors=actors, date=date(2025, 7, 1), meeting_date=date(2025, 7, 1), time=at,
+                                 meeting_time=at, duration=timedelta(hours=2), number_of_actors=number_of_actors)
+
+    def propose(self, **params):
+        response = self.client.get('/api/auth/parties/assignments/', dict(
+            {'date_from': '2025-07-01', 'date_to': '2025-07-31'}, **params
+        ))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_least_loaded_free_actors_are_proposed(self):
+        first, second = self.pending(time(10, 0)), self.pending(time(11, 0))
+        data = self.propose()
+        self.assertEqual(
+            {proposal['party_id']: proposal['proposed'] for proposal in data['proposals']},
+            {first.id: [self.singer.id], second.id: [self.drummer.id]},
+        )
+        self.assertEqual(data['unfilled'], 0)
+        self.assertEqual(data['load'], {str(self.singer.id): 1, str(self.drummer.id): 2})
+
+    def test_role_slots_are_repaired(self):
+        rana = self.create_actor('Rana', role='Singer')
+        # Greedy gives the open slot of the first party to the less loaded
+        # singer; the second party needs a singer, so the drummer takes over
+        first = self.pending(time(10, 0), actors=[rana], number_of_actors=2)
+        second = self.pending(time(11, 0))
+        data = self.propose(roles='Singer:1')
+        proposals = {proposal['party_id']: proposal['proposed'] for proposal in data['proposals']}
+        self.assertEqual(proposals, {first.id: [self.drummer.id], second.id: [self.singer.id]})
+        self.assertEqual(data['unfilled'], 0)
+
+    def test_existing_bookings_and_members_are_respected(self):
+        party = self.pending(time(10, 0), actors=[self.singer], number_of_actors=2)
+        self.create_party(actors=[self.drummer], date=date(2025, 7, 1), meeting_date=date(2025, 7, 1),
+                          time=time(9, 0), meeting_time=time(9, 0), status='in_progress')
+        proposal = self.propose()['proposals'][0]
+        self.assertEqual(proposal['party_id'], party.id)
+        self.assertEqual((proposal['assigned'], proposal['proposed'], proposal['missing']), ([self.singer.id], [], 1))
+
+    def test_only_party_managers_may_ask(self):
+        actor = self.create_actor('Nour', can_access_schedule=True)
+        client = APIClient()
+        client.force_authenticate(actor.user)
+        self.assertEqual(client.get('/api/auth/parties/assignments/').status_code, 403)
+        self.assertEqual(self.client.get('/api/auth/parties/assignments/').status_code, 400)
+
+
+class ActorPartiesTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.actor = self.create_actor('Huda', can_view_completed_parties=False)
+        self.other = self.create_actor('Sami')
+        self.upcoming = self.create_party(actors=[self.actor, self.other], songs=2, date=date(2025, 3, 1))
+        self.done = self.create_party(actors=[self.actor], date=date(2025, 2, 1), status='done')
+        self.elsewhere = self.create_party(actors=[self.other], date=date(2025, 1, 1))
+
+    def client_for(self, actor):
+        client = APIClient()
+        client.force_authenticate(actor.user)
+        return client
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [party['id'] for party in response.json()['results']]
+
+    def test_actor_sees_own_visible_parties_without_page_permissions(self):
+        client = self.client_for(self.actor)
+        self.assertEqual(self.ids(client.get('/api/auth/parties/mine/')), [self.upcoming.id])
+        self.assertEqual(self.ids(client.get(f'/api/auth/actors/{self.actor.id}/parties/')), [self.upcoming.id])
+        self.assertEqual(client.get(f'/api/auth/actors/{self.other.id}/parties/').status_code, 403)
+        self.assertEqual(self.client.get('/api/auth/parties/mine/').status_code, 403)
+
+    def test_other_actors_parties_follow_the_requesters_visibility(self):
+        self.assertEqual(
+            self.ids(self.client.get(f'/api/auth/actors/{self.actor.id}/parties/', {'ordering': 'date'})),
+            [self.done.id, self.upcoming.id],
+        )
+        self.actor.can_access_actors = True
+        self.actor.save()
+        # Only the party both are on is visible to the requesting actor
+        response = self.client_for(self.actor).get(f'/api/auth/actors/{self.other.id}/parties/')
+        self.assertEqual(self.ids(response), [self.upcoming.id])
+        self.assertEqual(self.client.get('/api/auth/actors/999/parties/').status_code, 404)
+
+    def test_query_count_does_not_grow_with_parties(self):
+        client = self.client_for(self.actor)
+
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                self.ids(client.get('/api/auth/parties/mine/'))
+            return len(queries)
+
+        few = count()
+        for day in range(10):
+            self.create_party(actors=[self.actor, self.other], songs=2, date=date(2025, 4, day + 1))
+        self.assertEqual(count(), few)
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_get_the_configured_pragmas(self):
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_follow_settings(self):
+        self.addCleanup(self.pragma, f"busy_timeout = {self.pragma('busy_timeout')}")
+        database.configure_connection(sender=None, connection=connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], READ_YOUR_WRITES_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, request, status=200):
+        """Run ``request`` through the middleware; return the read alias seen by the view and the response."""
+        seen = {}
+
+        def view(request):
+            seen['alias'] = router.db_for_read(Party)
+            return HttpResponse(status=status)
+
+        response = ReplicaMiddleware(view)(request)
+        return seen['alias'], response
+
+    def test_safe_requests_read_from_a_replica(self):
+        factory = RequestFactory()
+        self.assertEqual(self.route(factory.get('/api/auth/parties/'))[0], 'replica_1')
+        self.assertEqual(self.route(factory.post('/api/auth/parties/'))[0], 'default')
+        # Outside a request (and after one) reads go to the primary
+        self.assertEqual(router.db_for_read(Party), 'default')
+        self.assertEqual(router.db_for_write(Party), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.route(factory.get('/api/auth/parties/'))[0], 'default')
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        factory = RequestFactory()
+        _, response = self.route(factory.post('/api/auth/parties/'), status=201)
+        until = response[STICKY_HEADER]
+        self.assertAlmostEqual(float(until), time_module.time() + 5, delta=1)
+        self.assertEqual(response.cookies[STICKY_COOKIE].value, until)
+        self.assertNotIn(STICKY_HEADER, self.route(factory.post('/api/auth/parties/'), status=400)[1])
+
+        self.assertEqual(self.route(factory.get('/', headers={STICKY_HEADER: until}))[0], 'default')
+        request = factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = until
+        self.assertEqual(self.route(request)[0], 'default')
+        expired = f'{time_module.time() - 1:.3f}'
+        self.assertEqual(self.route(factory.get('/', headers={STICKY_HEADER: expired}))[0], 'replica_1')
+        self.assertEqual(self.route(factory.get('/', headers={STICKY_HEADER: 'junk'}))[0], 'replica_1')
+
+    def test_cache_fills_read_from_the_primary_while_the_replica_lags(self):
+        states = {'default': 'new', 'replica_1': 'old'}
+        seen = []
+
+        def view(request):
+            with conditional.current_reads():
+                seen.append(router.db_for_read(Party))
+            seen.append(router.db_for_read(Party))
+            return HttpResponse()
+
+        with mock.patch.object(conditional, 'collection_state', side_effect=states.get):
+            ReplicaMiddleware(view)(RequestFactory().get('/'))
+            states['replica_1'] = 'new'
+            ReplicaMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(seen, ['default', 'replica_1', 'replica_1', 'replica_1'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, DATABASE_REPLICAS=['replica_1'])
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Runs requests against a second SQLite database standing in for a replica."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test runner set up its databases: it would try to
+        # create a test database for the alias
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        connections.settings['replica_1'] = dict(
+            connections.settings['default'], NAME=os.path.join(directory.name, 'replica.sqlite3'),
+        )
+        cls.addClassCleanup(connections.settings.pop, 'replica_1')
+        cls.addClassCleanup(connections.__delitem__, 'replica_1')
+        cls.addClassCleanup(lambda: connections['replica_1'].close())
+
+    def setUp(self):
+        for alias in caches:
+            caches[alias].clear()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.party = Party.objects.create(
+            day='Friday', date=date(2025, 1, 1), time=time(18, 0), duration=timedelta(hours=3), place='Hall',
+            number_of_actors=0, meeting_time=time(16, 0), meeting_date=date(2025, 1, 1), meeting_place='Office',
+            transport_vehicle='Van', camera_man='Sami', dress_details='White', created_by=admin,
+        )
+        self.replicate()
+        # The primary moves on; the replica has not seen it yet
+        Party.objects.filter(pk=self.party.pk).update(place='Garden', updated_at=timezone.now())
+
+    def replicate(self):
+        for alias in ('default', 'replica_1'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(connections['replica_1'].connection)
+
+    def place(self, response):
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['results'][0]['place'] if 'results' in data else data['place']
+
+    def test_plain_reads_use_the_replica(self):
+        self.assertEqual(self.place(self.client.get(f'/api/auth/parties/{self.party.pk}/')), 'Hall')
+
+    def test_writes_and_the_reads_after_them_use_the_primary(self):
+        response = self.client.patch(f'/api/auth/parties/{self.party.pk}/', {'place': 'Roof'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Party.objects.using('default').get().place, 'Roof')
+        self.assertEqual(Party.objects.using('replica_1').get().place, 'Hall')
+
+        # The client sends the cookie set by the write back
+        self.assertEqual(self.place(self.client.get(f'/api/auth/parties/{self.party.pk}/')), 'Roof')
+        self.client.cookies.pop(STICKY_COOKIE)
+        self.assertEqual(self.place(self.client.get(f'/api/auth/parties/{self.party.pk}/')), 'Hall')
+
+    def test_cache_fills_fall_back_to_the_primary_while_the_replica_lags(self):
+        response = self.client.get('/api/auth/parties/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.place(response), 'Garden')
+
+        # Caught up (same fingerprint), fills read the replica again
+        self.replicate()
+        Party.objects.using('replica_1').filter(pk=self.party.pk).update(place='Replica')
+        self.assertEqual(self.place(self.client.get('/api/auth/parties/', {'status': 'pending'})), 'Replica')
@@ -1,16 +1,24 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import UserDetailView, ActorViewSet, PartyViewSet, dashboard_stats
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views import (
+    UserDetailView, ActorViewSet, PartyViewSet, LoginView, calendar_feed, calendar_feed_url, dashboard_stats,
+    party_events, response_cache_stats,
+)
 
 router = DefaultRouter()
 router.register(r'actors', ActorViewSet)
 router.register(r'parties', PartyViewSet)
 
 urlpatterns = [
-    path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('login/', LoginView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('me/', UserDetailView.as_view(), name='user_detail'),
     path('dashboard/stats/', dashboard_stats, name='dashboard_stats'),
+    path('cache/stats/', response_cache_stats, name='response_cache_stats'),
+    path('calendar/', calendar_feed_url, name='calendar_feed_url'),
+    path('calendar/<str:token>.ics', calendar_feed, name='calendar_feed'),
+    # Before the router, which would read "events" as a party id
+    path('parties/events/', party_events, name='party_events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,59 +1,72 @@
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.views import TokenObtainPairView
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Count, Q, query
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.db.models import Prefetch, query
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+from datetime import datetime, timedelta
 from .serializers import (
     UserSerializer, 
     ActorCreateSerializer,
     ActorSerializer,
-    PartySerializer
+    PartySerializer,
+    PartyListSerializer,
+    PartyCalendarSerializer
 )
 from .models import Actor, Party
+from .pagination import ActorPagination, PartyPagination
+from . import assignment, availability, events, export, ical, response_cache, search, stats, sync
+from .conditional import ConditionalGetMixin, request_state, serve
+from .response_cache import CachedListMixin
+from .auth import ActorTokenObtainPairSerializer, CachedJWTAuthentication
+from .bulk import PartyBatch
+from .permissions import (
+    IsAdminOrActorWithPermission,
+    IsAdminOrActorWithSchedulePermission,
+    get_actor
+)
+
+def parse_date_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: ['Enter a valid date in YYYY-MM-DD format.']})
+    return parsed
+
+class LoginView(TokenObtainPairView):
+    serializer_class = ActorTokenObtainPairSerializer
 
 class UserDetailView(generics.RetrieveAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = UserSerializer
 
     def get_object(self):
-        return self.request.user
-
-class IsAdminOrActorWithPermission(permissions.BasePermission):
-    def has_permission(self, request, view):
-        # Only allow access if user has actor_profile (is an actor)
-        # or is the initial superadmin (no actor_profile)
-        if not hasattr(request.user, 'actor_profile'):
-            return True  # This is the initial superadmin
-            
-        actor = request.user.actor_profile
-        
-        # Check if actor has access to the actors page
-        if not actor.can_access_actors:
-            return False
-            
-        # If they have access to the page, they can do everything on that page
-        return True
-
-    def has_object_permission(self, request, view, obj):
-        # Only allow access if user has actor_profile (is an actor)
-        # or is the initial superadmin (no actor_profile)
-        if not hasattr(request.user, 'actor_profile'):
-            return True  # This is the initial superadmin
-            
-        actor = request.user.actor_profile
-        
-        # Check if actor has access to the actors page
-        if not actor.can_access_actors:
-            return False
-            
-        # If they have access to the page, they can do everything on that page
-        return True
+        user = self.request.user
+        if not isinstance(user, User):
+            # Stateless (claims-only) authentication: load the full profile
+            user = User.objects.select_related('actor_profile').get(pk=user.pk)
+        return user
 
-class ActorViewSet(viewsets.ModelViewSet):
+class ActorViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Actor.objects.all()
     permission_classes = [permissions.IsAuthenticated, IsAdminOrActorWithPermission]
+    pagination_class = ActorPagination
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -61,96 +74,94 @@ class ActorViewSet(viewsets.ModelViewSet):
         return ActorSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Actor.objects.all()
+        # ``username`` and the party counts come with the page, not per row
+        queryset = Actor.objects.select_related('user').with_party_counts()
         
         # If this is an actor (not the initial superadmin)
-        if hasattr(user, 'actor_profile'):
-            actor = user.actor_profile
+        actor = get_actor(self.request)
+        if actor is not None:
             # If they don't have access to the actors page, return empty queryset
             if not actor.can_access_actors:
                 return Actor.objects.none()
         
         # Apply search filters
         name = self.request.query_params.get('name', None)
-        if name is not None:
-            queryset = queryset.filter(
-                Q(name__icontains=name) |
-                Q(family__icontains=name) |
-                Q(role__icontains=name)
-            )
+        if name:
+            queryset = search.filter_ranked(queryset, 'actor', name).order_by('search_rank')
             
         return queryset
 
-class IsAdminOrActorWithPartyPermission(permissions.BasePermission):
-    def has_permission(self, request, view):
-        # Only allow access if user has actor_profile (is an actor)
-        # or is the initial superadmin (no actor_profile)
-        if not hasattr(request.user, 'actor_profile'):
-            return True  # This is the initial superadmin
-            
-        actor = request.user.actor_profile
-        
-        # Check if actor has access to the parties page
-        if not actor.can_access_parties:
-            return False
-            
-        # If they have access to the page, they can do everything on that page
-        return True
-
-    def has_object_permission(self, request, view, obj):
-        # Only allow access if user has actor_profile (is an actor)
-        # or is the initial superadmin (no actor_profile)
-        if not hasattr(request.user, 'actor_profile'):
-            return True  # This is the initial superadmin
-            
-        actor = request.user.actor_profile
-        
-        # Check if actor has access to the parties page
-        if not actor.can_access_parties:
-            return False
-            
-        # If they have access to the page, they can do everything on that page
-        return True
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def parties(self, request, pk=None):
+        """
+        The parties actor ``pk`` is booked on, as the requester may see them
+        (see ``PartyViewSet.mine``). Actors can always ask about themselves;
+        anyone else needs the actors page.
+        """
+        actor = get_actor(request)
+        if actor is not None and str(actor.pk) != str(pk) and not actor.can_access_actors:
+            return Response({"error": "You don't have access to this actor"}, status=status.HTTP_403_FORBIDDEN)
+        member = generics.get_object_or_404(Actor.objects.only('id'), pk=pk)
+        view = PartyViewSet(request=request, args=(), kwargs={}, format_kwarg=self.format_kwarg, action='mine')
+        return view.member_parties(member)
+
+    availability_max_days = 92
+    availability_max_actors = 50
+
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        When ``?actor_ids=1,2,3`` are all free between ``date_from`` and
+        ``date_to`` (inclusive): ``free`` lists the common free slots (at
+        least ``min_minutes`` long), ``busy`` each actor's bookings.
+        """
+        values = [value for value in request.query_params.get('actor_ids', '').split(',') if value.strip()]
+        try:
+            actor_ids = sorted({int(value) for value in values})
+        except ValueError:
+            raise ValidationError({'actor_ids': ['Expected a comma-separated list of actor ids.']})
+        if not actor_ids or len(actor_ids) > self.availability_max_actors:
+            raise ValidationError({'actor_ids': [f'Give between 1 and {self.availability_max_actors} actor ids.']})
+        missing = set(actor_ids) - set(self.get_queryset().filter(pk__in=actor_ids).values_list('pk', flat=True))
+        if missing:
+            raise ValidationError({'actor_ids': [f"Unknown actor(s): {', '.join(map(str, sorted(missing)))}."]})
+
+        date_from, date_to = parse_date_param(request, 'date_from'), parse_date_param(request, 'date_to')
+        if date_from is None or date_to is None:
+            raise ValidationError({'date_from': ['date_from and date_to are required.']})
+        if not 0 <= (date_to - date_from).days < self.availability_max_days:
+            raise ValidationError({'date_to': [f'The range must be 1 to {self.availability_max_days} days.']})
+        try:
+            min_length = timedelta(minutes=int(request.query_params.get('min_minutes', 0)))
+        except ValueError:
+            raise ValidationError({'min_minutes': ['Expected a whole number of minutes.']})
+
+        start = datetime.combine(date_from, datetime.min.time())
+        end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        schedule = availability.ActorSchedule.load(start, end, actor_ids)
+        slot = lambda interval: {'start': interval.start, 'end': interval.end}
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'actor_ids': actor_ids,
+            'free': [slot(interval) for interval in schedule.free_slots(actor_ids, start, end, min_length)],
+            'busy': {
+                actor_id: [
+                    dict(slot(interval), party_id=interval.party_id)
+                    for interval in schedule.overlapping(actor_id, start, end)
+                ]
+                for actor_id in actor_ids
+            },
+        })
 
 import logging
 logger = logging.getLogger(__name__)
 
-class IsAdminOrActorWithSchedulePermission(permissions.BasePermission):
-    def has_permission(self, request, view):
-        # Only allow access if user has actor_profile (is an actor)
-        # or is the initial superadmin (no actor_profile)
-        if not hasattr(request.user, 'actor_profile'):
-            return True  # This is the initial superadmin
-            
-        actor = request.user.actor_profile
-        
-        # Check if actor has access to either parties or schedule page
-        if not (actor.can_access_parties or actor.can_access_schedule):
-            return False
-            
-        # If they have access to the page, they can do everything on that page
-        return True
-
-    def has_object_permission(self, request, view, obj):
-        # Only allow access if user has actor_profile (is an actor)
-        # or is the initial superadmin (no actor_profile)
-        if not hasattr(request.user, 'actor_profile'):
-            return True  # This is the initial superadmin
-            
-        actor = request.user.actor_profile
-        
-        # Check if actor has access to either parties or schedule page
-        if not (actor.can_access_parties or actor.can_access_schedule):
-            return False
-            
-        # If they have access to the page, they can do everything on that page
-        return True
-
-class PartyViewSet(viewsets.ModelViewSet):
+class PartyViewSet(ConditionalGetMixin, CachedListMixin, viewsets.ModelViewSet):
     queryset = Party.objects.all()
     serializer_class = PartySerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrActorWithSchedulePermission]
+    pagination_class = PartyPagination
 
     def create(self, request, *args, **kwargs):
         logger.error(f"Received party data: {request.data}")
@@ -160,127 +171,373 @@ class PartyViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return super().create(request, *args, **kwargs)
 
+    ordering_fields = ('date', 'time', 'place', 'status', 'meeting_date', 'created_at', 'updated_at')
+    default_ordering = ('-date', '-time')
+    calendar_ordering = ('date', 'time')
+    calendar_max_days = 366
+    export_chunk_size = 500
+
+    expandable = ('actors',)
+
+    def get_serializer_class(self):
+        if self.action == 'calendar':
+            return PartyCalendarSerializer
+        if self.action in ('list', 'changes', 'mine') and 'actors' not in self.get_expand():
+            return PartyListSerializer
+        return PartySerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == 'GET' and self.action != 'calendar':
+            context['fields'] = self.get_selected_fields()
+        return context
+
+    def get_selected_fields(self):
+        """``?fields=id,date,place``: the fields to serialize, or ``None`` for all."""
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [name.strip() for name in fields.split(',') if name.strip()]
+
+    def get_expand(self):
+        expand = {name.strip() for name in self.request.query_params.get('expand', '').split(',') if name.strip()}
+        unknown = expand - set(self.expandable)
+        if unknown:
+            raise ValidationError({'expand': [f"Cannot expand: {', '.join(sorted(unknown))}."]})
+        return expand
+
     def get_queryset(self):
-        user = self.request.user
-        queryset = Party.objects.all().order_by('-date', '-time')
-        
         # If this is an actor (not the initial superadmin)
-        if hasattr(user, 'actor_profile'):
-            actor = user.actor_profile
+        actor = get_actor(self.request)
+        if actor is not None and self.action != 'mine':
             # If they don't have access to either parties or schedule page, return empty queryset
             if not (actor.can_access_parties or actor.can_access_schedule):
                 return Party.objects.none()
+
+        if self.action == 'bulk':
+            queryset = Party.objects.all()
+        elif self.action == 'export':
+            queryset = Party.objects.prefetch_related(
+                Prefetch('actors', queryset=Actor.objects.only('id', 'name', 'family')),
+                'songs',
+            )
+        elif self.action == 'calendar':
+            # Calendar cells only need a handful of columns
+            calendar_fields = [field for field in PartyCalendarSerializer.Meta.fields if field != 'actors']
+            queryset = Party.objects.only(*calendar_fields).prefetch_related(
+                Prefetch('actors', queryset=Actor.objects.only('id', 'name', 'family')),
+            )
+        else:
+            queryset = self.get_serialized_queryset()
+            if self.action == 'changes':
+                # The feed covers every party regardless of list filters
+                return queryset
         
         # Apply search filters
         status = self.request.query_params.get('status', None)
         if status is not None and status != 'all':
             queryset = queryset.filter(status=status)
+
+        date_from, date_to = self.get_date_range()
+        if date_from is not None:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to is not None:
+            queryset = queryset.filter(date__lte=date_to)
             
-        search = self.request.query_params.get('search', None)
-        if search is not None:
-            queryset = queryset.filter(
-                Q(place__icontains=search) |
-                Q(camera_man__icontains=search) |
-                Q(actors__name__icontains=search) |
-                Q(actors__family__icontains=search) |
-                Q(day__icontains=search)
-            ).distinct()
+        ordering = self.get_ordering()
+        query = self.request.query_params.get('search', None)
+        if query:
+            queryset = search.filter_ranked(queryset, 'party', query)
+            # Best matches first unless an explicit or calendar order applies
+            if not self.request.query_params.get('ordering') and self.action != 'calendar':
+                ordering = ('search_rank',)
             
+        return queryset.order_by(*ordering)
+
+    def get_serialized_queryset(self):
+        """Parties with exactly the relations the chosen serializer and fields read."""
+        fields = self.get_selected_fields() if self.request.method == 'GET' else None
+        wants = lambda *names: fields is None or any(name in fields for name in names)
+
+        queryset = Party.objects.all()
+        if wants('created_by_name'):
+            queryset = queryset.select_related('created_by')
+        if wants('songs'):
+            queryset = queryset.prefetch_related('songs')
+        # ``is_visible`` checks membership against the prefetched actors
+        if wants('actors', 'is_visible'):
+            if self.get_serializer_class() is PartyListSerializer:
+                actors = Actor.objects.only('id', 'name', 'family')
+            else:
+                actors = Actor.objects.select_related('user').with_party_counts()
+            queryset = queryset.prefetch_related(Prefetch('actors', queryset=actors))
         return queryset
 
+    def get_ordering(self):
+        """Parse ``?ordering=date,-time`` against the allowed fields."""
+        ordering = self.request.query_params.get('ordering')
+        if not ordering:
+            return self.calendar_ordering if self.action == 'calendar' else self.default_ordering
+
+        fields = [field.strip() for field in ordering.split(',') if field.strip()]
+        invalid = [field for field in fields if field.lstrip('-') not in self.ordering_fields]
+        if invalid or not fields:
+            raise ValidationError({'ordering': [f"Invalid ordering field(s): {', '.join(invalid) or ordering}"]})
+        return fields
+
+    def get_date_range(self):
+        """
+        Return the ``(date_from, date_to)`` filter. The calendar always works
+        on a bounded window and defaults to the current month.
+        """
+        date_from = parse_date_param(self.request, 'date_from')
+        date_to = parse_date_param(self.request, 'date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError({'date_to': ['date_to must not be before date_from.']})
+
+        if self.action == 'calendar':
+            if date_from is None and date_to is None:
+                date_from = timezone.localdate().replace(day=1)
+            if date_from is None:
+                date_from = date_to.replace(day=1)
+            if date_to is None:
+                next_month = (date_from.replace(day=1) + timedelta(days=32)).replace(day=1)
+                date_to = next_month - timedelta(days=1)
+            if (date_to - date_from).days >= self.calendar_max_days:
+                raise ValidationError({'date_to': [f'Calendar window cannot exceed {self.calendar_max_days} days.']})
+
+        return date_from, date_to
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply a list of operations in one transaction::
+
+            {"operations": [
+                {"action": "create", "data": {...}},
+                {"action": "update", "id": 12, "data": {...}},
+                {"action": "status", "id": 13, "status": "done"}
+            ]}
+
+        Nothing is written unless every operation is valid; errors are
+        returned per operation, in order.
+        """
+        operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+        batch = PartyBatch(operations, self.get_queryset(), self.get_serializer_context())
+        if not batch.is_valid():
+            return Response(batch.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': batch.save(request.user)})
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        date_from, date_to = self.get_date_range()
+
+        def render():
+            serializer = self.get_serializer(self.get_queryset(), many=True)
+            return Response({
+                'date_from': date_from,
+                'date_to': date_to,
+                'results': serializer.data,
+            })
+
+        # The default window follows the current month
+        return serve(request, render, date_from, date_to)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Everything that changed after ``?since=<cursor>`` (omit it for a
+        full first sync). Apply ``upserts`` then ``deletions``, keep
+        ``cursor`` for the next call and call again at once while
+        ``has_more`` is true. ``410 Gone`` means the cursor expired.
+        """
+        limit = PartyPagination().get_page_size(request)
+        parties, deleted, cursor, has_more = sync.changes(
+            self.get_queryset(), request.query_params.get('since') or None, limit
+        )
+        return Response({
+            'upserts': self.get_serializer(parties, many=True).data,
+            'deletions': [{'id': tombstone.party_id, 'deleted_at': tombstone.deleted_at} for tombstone in deleted],
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the filtered parties as ``?type=csv`` (default) or ``xlsx``,
+        with the same filters, search and ordering as the list. Parties are
+        read ``export_chunk_size`` at a time, actors and songs prefetched per
+        chunk.
+        """
+        file_type = request.query_params.get('type', 'csv')
+        if file_type not in export.STREAMERS:
+            raise ValidationError({'type': [f"Choose one of: {', '.join(export.STREAMERS)}."]})
+
+        parties = self.get_queryset().iterator(chunk_size=self.export_chunk_size)
+        actor = get_actor(request)
+        if actor is not None and not actor.can_manage_parties:
+            parties = (party for party in parties if party.is_visible_to_actor(actor))
+
+        response = StreamingHttpResponse(
+            export.STREAMERS[file_type](export.rows(parties)), content_type=export.CONTENT_TYPES[file_type]
+        )
+        filename = f'parties-{timezone.localdate():%Y%m%d}.{file_type}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def mine(self, request):
+        """
+        The parties the requesting actor is booked on and may see, with the
+        list's filters and pagination. Needs no page permission.
+        """
+        actor = get_actor(request)
+        if actor is None:
+            return Response({"error": "Only actors are booked on parties"}, status=status.HTTP_403_FORBIDDEN)
+        return self.member_parties(actor)
+
+    def member_parties(self, member):
+        """
+        A page of ``member``'s parties, narrowed in SQL to the ones the
+        requester may see, so a page costs the same few queries at any size.
+        """
+        queryset = self.get_queryset().filter(actors=member)
+        actor = get_actor(self.request)
+        if actor is not None:
+            queryset = queryset.visible_to(actor)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    assignment_max_days = 366
+
+    @action(detail=False, methods=['get'])
+    def assignments(self, request):
+        """
+        Proposed actors for the pending parties between ``date_from`` and
+        ``date_to``, avoiding booking conflicts and spreading the load.
+        ``?roles=Singer:1,Drummer:2`` asks for that many actors of each role
+        per party. Apply a proposal with a ``bulk`` update of ``actor_ids``.
+        """
+        actor = get_actor(request)
+        if actor is not None and not actor.can_manage_parties:
+            return Response({"error": "Only party managers can assign actors"}, status=status.HTTP_403_FORBIDDEN)
+
+        date_from, date_to = self.get_date_range()
+        if date_from is None or date_to is None:
+            raise ValidationError({'date_from': ['date_from and date_to are required.']})
+        if (date_to - date_from).days >= self.assignment_max_days:
+            raise ValidationError({'date_to': [f'The range cannot exceed {self.assignment_max_days} days.']})
+
+        composition = {}
+        for item in request.query_params.get('roles', '').split(','):
+            if not item.strip():
+                continue
+            role, _, count = item.rpartition(':')
+            if not role.strip() or not count.strip().isdigit():
+                raise ValidationError({'roles': ['Expected role:count pairs, e.g. Singer:1,Drummer:2.']})
+            composition[role.strip()] = int(count)
+
+        proposals, load = assignment.solve(assignment.load_problem(date_from, date_to), composition)
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'proposals': proposals,
+            'unfilled': sum(proposal['missing'] for proposal in proposals),
+            'load': load,
+        })
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def dashboard_stats(request):
-    user = request.user
     today = timezone.now().date()
     
-    # Check if user has access to dashboard
-    if hasattr(user, 'actor_profile'):
-        actor = user.actor_profile
-        if not actor.can_access_dashboard:
-            return Response({"error": "You don't have access to the dashboard"}, status=status.HTTP_403_FORBIDDEN)
-    
-    # If user doesn't have actor_profile, they are the initial superadmin
-    if not hasattr(user, 'actor_profile'):
-        # Admin stats
-        total_actors = Actor.objects.count()
-        total_parties = Party.objects.count()
-        upcoming_parties = Party.objects.filter(
-            date__gte=today,
-            status__in=['pending', 'in_progress']
-        ).count()
-        completed_parties = Party.objects.filter(status='done').count()
-        
-        # Top actors with their party counts
-        actor_stats = Actor.objects.annotate(
-            party_count=Count('parties')
-        ).values('name', 'family', 'party_count').order_by('-party_count')[:5]
-        
-        # Monthly activity data
-        from django.db.models import Count
-        from django.db.models.functions import TruncMonth
-        
-        monthly_activity = Party.objects.annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            parties=Count('id')
-        ).order_by('month')
-        
-        # Status distribution
-        status_distribution = Party.objects.values('status').annotate(
-            count=Count('id')
-        ).order_by('status')
-        
-        return Response({
-            'total_actors': total_actors,
-            'total_parties': total_parties,
-            'upcoming_parties': upcoming_parties,
-            'completed_parties': completed_parties,
-            'top_actors': actor_stats,
-            'monthly_activity': monthly_activity,
-            'status_distribution': status_distribution
-        })
-    else:
-        # Actor stats
-        actor = user.actor_profile
-        
-        # If actor has access to parties page, show all parties stats
-        if actor.can_access_parties:
-            my_parties = Party.objects.filter(actors=actor)
-            total_parties = my_parties.count()
-            upcoming_parties = my_parties.filter(
-                date__gte=today,
-                status__in=['pending', 'in_progress']
-            ).count()
-            completed_parties = my_parties.filter(status='done').count()
-            
-            # Monthly activity data for actor's parties
-            from django.db.models.functions import TruncMonth
-            
-            monthly_activity = my_parties.annotate(
-                month=TruncMonth('date')
-            ).values('month').annotate(
-                parties=Count('id')
-            ).order_by('month')
-            
-            # Status distribution for actor's parties
-            status_distribution = my_parties.values('status').annotate(
-                count=Count('id')
-            ).order_by('status')
-        else:
-            total_parties = 0
-            upcoming_parties = 0
-            completed_parties = 0
-            monthly_activity = []
-            status_distribution = []
-        
-        return Response({
-            'my_total_parties': total_parties,
-            'my_upcoming_parties': upcoming_parties,
-            'my_completed_parties': completed_parties,
-            'monthly_activity': monthly_activity,
-            'status_distribution': status_distribution
-        })
\ No newline at end of file
+    # Check if user has access to dashboard (no actor: the initial superadmin)
+    actor = get_actor(request)
+    if actor is not None and not actor.can_access_dashboard:
+        return Response({"error": "You don't have access to the dashboard"}, status=status.HTTP_403_FORBIDDEN)
+
+    return serve(
+        request, lambda: Response(stats.dashboard(actor, today, request_state(request)[1])), today,
+    )
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def response_cache_stats(request):
+    if get_actor(request) is not None:
+        return Response({"error": "Only the administrator can view cache statistics"}, status=status.HTTP_403_FORBIDDEN)
+    return Response(response_cache.statistics())
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated, IsAdminOrActorWithSchedulePermission])
+def calendar_feed_url(request):
+    """The requester's private iCalendar feed URL, for calendar apps."""
+    user = request.user if isinstance(request.user, User) else User.objects.get(pk=request.user.pk)
+    path = reverse('calendar_feed', kwargs={'token': ical.feed_token(user)})
+    return Response({'url': request.build_absolute_uri(path)})
+
+def calendar_feed(request, token):
+    """
+    The iCalendar feed behind a ``calendar_feed_url`` token: the actor's
+    visible parties, or every party for the administrator.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405)
+    user = ical.feed_user(token)
+    if user is None:
+        return HttpResponse('Unknown calendar feed.', status=404, content_type='text/plain')
+    actor = getattr(user, 'actor_profile', None)
+    if actor is not None and not (actor.can_access_parties or actor.can_access_schedule):
+        return HttpResponse('This calendar feed is no longer available.', status=403, content_type='text/plain')
+
+    rows = list(ical.feed_parties(actor).values_list('pk', 'updated_at'))
+    etag = ical.fingerprint(rows, user.pk, actor.pk if actor else None)
+    last_modified = max((updated_at for _, updated_at in rows), default=None)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        name = f'Ayat - {actor}' if actor else 'Ayat - All parties'
+        body = ical.calendar(name, ical.render_events(rows))
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="parties.ics"'
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def authenticate_stream(raw_token):
+    authentication = CachedJWTAuthentication()
+    user = authentication.get_user(authentication.get_validated_token(raw_token.encode()))
+    return user, getattr(user, 'actor_profile', None)
+
+async def party_events(request):
+    """
+    Server-sent events for party changes, filtered by visibility. Browsers'
+    ``EventSource`` cannot send headers, so the access token is passed as
+    ``?token=``.
+
+    Under WSGI the response would be iterated to its (never reached) end on
+    a worker thread, so unless ``PARTY_EVENTS_STREAM`` is on and the request
+    came through the ASGI application (``core.asgi``) the answer is ``204``,
+    which tells ``EventSource`` not to reconnect.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Method not allowed.'}, status=405)
+    if not getattr(settings, 'PARTY_EVENTS_STREAM', False) or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    try:
+        user, actor = await sync_to_async(authenticate_stream)(request.GET.get('token', ''))
+    except (InvalidToken, AuthenticationFailed) as exc:
+        return JsonResponse({'detail': str(exc.detail)}, status=401)
+    if actor is not None and not (actor.can_access_parties or actor.can_access_schedule):
+        return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+
+    response = StreamingHttpResponse(events.EventStream(actor, user.is_staff), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Let nginx pass events through unbuffered
+    return response
@@ -0,0 +1,24 @@
+"""
+Per-connection database setup.
+
+Django 4.2 has no option for SQLite pragmas, so ``configure_connection``
+runs them when a connection is opened (``connection_created``). Most of
+them only last as long as the connection; ``journal_mode=wal`` is stored in
+the database file. Other backends are left alone.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+@receiver(connection_created, dispatch_uid='core.database.configure_connection')
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(getattr(settings, 'SQLITE_PRAGMAS', {})):
+            cursor.execute(statement)
@@ -0,0 +1,98 @@
+"""
+Read replicas.
+
+``ReplicaMiddleware`` picks a replica (``DATABASE_REPLICAS``) for each
+safe-method request (GET, HEAD, OPTIONS) and keeps it in a context
+variable, from which ``ReplicaRouter`` routes the request's reads; one
+replica per request, so they all see the same state. Writes, other
+requests, and code outside a request (management commands, signal handlers)
+use the primary. So do reads inside a transaction, which must see its own
+writes, and reads within ``primary_reads()``.
+
+Read-your-writes: a successful write response carries the time until which
+the client should read from the primary (``READ_YOUR_WRITES_SECONDS`` from
+now, long enough for replication to catch up), both as a cookie and as the
+``X-Read-Primary-Until`` header. A request that sends either back before
+then is served from the primary. The value is not signed: a client forging
+it only sends its own reads to the primary.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+STICKY_COOKIE = 'read_primary_until'
+STICKY_HEADER = 'X-Read-Primary-Until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# The replica the current request reads from, None for the primary
+_replica = ContextVar('replica', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def read_alias():
+    """The alias reads go to right now."""
+    replica = _replica.get()
+    if replica is None or replica not in replica_aliases() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return replica
+
+
+@contextmanager
+def primary_reads():
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db not in replica_aliases()
+
+
+def sticky_until(request):
+    """The time until which ``request`` asked to read from the primary, 0 if it did not."""
+    value = request.headers.get(STICKY_HEADER) or request.COOKIES.get(STICKY_COOKIE, '')
+    try:
+        return float(value)
+    except ValueError:
+        return 0
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        aliases = replica_aliases()
+        replica = aliases and request.method in SAFE_METHODS and sticky_until(request) <= time.time()
+        _replica.set(random.choice(aliases) if replica else None)
+
+    def process_response(self, request, response):
+        # Worker threads are reused: whatever runs next starts on the primary
+        _replica.set(None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_aliases():
+            seconds = getattr(settings, 'READ_YOUR_WRITES_SECONDS', 5)
+            until = f'{time.time() + seconds:.3f}'
+            response[STICKY_HEADER] = until
+            response.set_cookie(
+                STICKY_COOKIE, until, max_age=seconds, secure=request.is_secure(), httponly=True, samesite='Lax',
+            )
+        return response
@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,6 +54,8 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.routing.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -79,13 +83,106 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
-DATABASES = {
+# Database: SQLite in BASE_DIR by default, PostgreSQL with
+# DATABASE_ENGINE=postgresql. Connections are kept open for
+# DATABASE_CONN_MAX_AGE seconds and checked before reuse.
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite3')
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', '60'))
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DATABASE_NAME', 'ayat'),
+            'USER': os.getenv('DATABASE_USER', ''),
+            'PASSWORD': os.getenv('DATABASE_PASSWORD', ''),
+            'HOST': os.getenv('DATABASE_HOST', ''),
+            'PORT': os.getenv('DATABASE_PORT', ''),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # Behind a transaction-pooling PgBouncer a cursor cannot outlive
+            # its transaction, so .iterator() must not use server-side cursors
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DATABASE_POOLER', '') == 'pgbouncer',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DATABASE_CONNECT_TIMEOUT', '5')),
+                'sslmode': os.getenv('DATABASE_SSLMODE', 'prefer'),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DATABASE_NAME', str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
+# Read replicas (core.routing): DATABASE_REPLICAS lists replica hosts for
+# PostgreSQL or database files for SQLite, comma-separated. Safe-method
+# requests read from them unless the client wrote within the last
+# READ_YOUR_WRITES_SECONDS.
+DATABASE_REPLICAS = []
+for index, location in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST' if DATABASE_ENGINE == 'postgresql' else 'NAME': location.strip(),
+        # Tests read the rows they just wrote
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routing.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+
+# Applied to every new SQLite connection (core.database). WAL lets reads run
+# while a write commits, busy_timeout makes a writer wait for the lock instead
+# of failing with "database is locked", synchronous=NORMAL is safe with WAL.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'wal'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'normal'),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))),
+}
+
+# Cache (per-process memory by default; point at a shared backend when
+# running several workers so invalidation reaches all of them)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'ayat-default'),
     }
 }
 
+# Serialized list responses (see authentication.response_cache): 'locmem'
+# keeps them per process with LRU eviction, 'file' shares them between all
+# workers through the filesystem (e.g. on PythonAnywhere), 'off' disables it
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', 'locmem')
+if RESPONSE_CACHE in ('locmem', 'file'):
+    CACHES['responses'] = {
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+        }[RESPONSE_CACHE],
+        'LOCATION': os.getenv(
+            'RESPONSE_CACHE_LOCATION',
+            str(BASE_DIR / 'cache' / 'responses') if RESPONSE_CACHE == 'file' else 'ayat-responses',
+        ),
+        'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', '600')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))},
+    }
+
+# Where the write-bumped namespace versions live. Shared response files need
+# shared versions, so they move next to them when the default cache is local.
+CACHE_VERSIONS_ALIAS = os.getenv(
+    'CACHE_VERSIONS_ALIAS',
+    'responses' if RESPONSE_CACHE == 'file' and 'LocMemCache' in CACHES['default']['BACKEND'] else 'default',
+)
+
+# Seconds a computed dashboard stays cached (it is also dropped on writes)
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', '300'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -137,14 +234,54 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Opt in to authorizing reads from token claims without a DB lookup
+        'authentication.auth.StatelessJWTAuthentication'
+        if os.getenv('JWT_STATELESS_AUTH', 'False') == 'True'
+        else 'authentication.auth.CachedJWTAuthentication',
+    ),
+    # orjson when installed, stdlib json otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'authentication.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
+# API responses smaller than this are sent uncompressed (core.middleware)
+API_COMPRESSION_MIN_SIZE = int(os.getenv('API_COMPRESSION_MIN_SIZE', '1024'))
+
+# Seconds an authenticated user (and their actor permissions) may be served
+# from the per-process cache; 0 disables it. Entries are dropped whenever the
+# User or Actor is saved.
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '0'))
+
+# Seconds a worker trusts its cached Actor.token_version under stateless
+# auth. With a per-process cache this is how long other workers keep
+# accepting tokens issued before a permission change.
+JWT_TOKEN_VERSION_TTL = int(os.getenv('JWT_TOKEN_VERSION_TTL', '30'))
+
+# Party changes feed: rows younger than the settle window wait for the next
+# call (their transaction may still be open); deletions are remembered for
+# the retention period (see prune_party_tombstones)
+PARTY_CHANGES_SETTLE_SECONDS = int(os.getenv('PARTY_CHANGES_SETTLE_SECONDS', '2'))
+PARTY_TOMBSTONE_RETENTION_DAYS = int(os.getenv('PARTY_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# Live party events (/api/auth/parties/events/). A stream holds its worker
+# for as long as the client stays connected, so it is only served by the
+# ASGI application (core.asgi) and only when enabled; otherwise clients poll.
+# The in-memory broker only reaches streams of the same process.
+PARTY_EVENTS_STREAM = os.getenv('PARTY_EVENTS_STREAM', 'False') == 'True'
+PARTY_EVENTS_BROKER = os.getenv('PARTY_EVENTS_BROKER', 'authentication.events.InMemoryBroker')
+PARTY_EVENTS_HEARTBEAT = int(os.getenv('PARTY_EVENTS_HEARTBEAT', '15'))
+
+# iCalendar feeds (/api/auth/calendar/) list parties from this many days ago on
+CALENDAR_FEED_PAST_DAYS = int(os.getenv('CALENDAR_FEED_PAST_DAYS', '90'))
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Refuses refresh tokens carrying outdated permission claims
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.auth.ActorTokenRefreshSerializer',
 }
 
 # CORS settings
@@ -154,6 +291,10 @@ CORS_ALLOWED_ORIGINS = [
     'https://*.pythonanywhere.com',
 ]
 CORS_ALLOW_CREDENTIALS = True
+# Lets the frontend read the export file name and the read-your-writes
+# deadline (core.routing), and send the deadline back
+CORS_EXPOSE_HEADERS = ['Content-Disposition', 'X-Read-Primary-Until']
+CORS_ALLOW_HEADERS = (*default_headers, 'x-read-primary-until')
 
 # Security settings
 SECURE_SSL_REDIRECT = not DEBUG
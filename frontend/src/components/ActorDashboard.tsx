@@ -26,15 +26,16 @@ export default function ActorDashboard() {
   useEffect(() => {
     const fetchParties = async () => {
       try {
-        const response = await api.get(`/auth/actors/${user?.actor_profile}/parties/`);
-        const parties = response.data;
+        const today = new Date().toISOString().slice(0, 10);
+        const response = await api.get(`/auth/actors/${user?.actor_profile?.id}/parties/`, {
+          params: { date_from: today, ordering: 'date,time', page_size: 20 },
+        });
+        const parties = response.data.results;
         
-        // Filter upcoming parties (not completed)
+        // Next 5 upcoming parties (not completed or cancelled)
         const upcoming = parties.filter((party: Party) => 
-          party.status !== 'done' && new Date(party.date) >= new Date()
-        ).sort((a: Party, b: Party) => 
-          new Date(a.date).getTime() - new Date(b.date).getTime()
-        ).slice(0, 5); // Get next 5 upcoming parties
+          party.status === 'pending' || party.status === 'in_progress'
+        ).slice(0, 5);
 
         setUpcomingParties(upcoming);
         setLoading(false);
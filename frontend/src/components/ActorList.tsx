@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
 import { useNavigate } from 'react-router-dom';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Button from './ui/Button';
 import Card from './ui/Card';
@@ -22,6 +22,9 @@ interface Actor {
   can_access_actors: boolean;
   can_access_parties: boolean;
   can_access_schedule: boolean;
+  parties_count: number;
+  upcoming_parties_count: number;
+  completed_parties_count: number;
   user: {
     username: string;
   };
@@ -38,8 +41,7 @@ export default function ActorList() {
 
   const fetchActors = async () => {
     try {
-      const response = await api.get('/auth/actors/');
-      setActors(response.data);
+      setActors(await fetchAll<Actor>('/auth/actors/'));
       setLoading(false);
     } catch (err) {
       setError(t('common.error'));
@@ -116,6 +118,12 @@ export default function ActorList() {
 
               <div className="space-y-2 mb-4">
                 <p><strong>{t('actor.age')}:</strong> {actor.age}</p>
+                <p><strong>{t('dashboard.totalParties')}:</strong> {actor.parties_count}</p>
+                <p className="text-sm text-gray-600">
+                  {t('dashboard.upcomingParties')}: {actor.upcoming_parties_count}
+                  {' · '}
+                  {t('dashboard.completedParties')}: {actor.completed_parties_count}
+                </p>
               </div>
 
               <div className="mb-4">
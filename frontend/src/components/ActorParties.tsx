@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
-import api from '../services/api';
+import { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Card from './ui/Card';
 
@@ -29,8 +29,8 @@ export default function ActorParties() {
   useEffect(() => {
     const fetchParties = async () => {
       try {
-        const response = await api.get(`/auth/actors/${user?.actor_profile}/parties/`);
-        setParties(response.data);
+        const params = filterStatus ? { status: filterStatus } : {};
+        setParties(await fetchAll<Party>(`/auth/actors/${user?.actor_profile?.id}/parties/`, params));
         setLoading(false);
       } catch (error) {
         console.error('Error fetching parties:', error);
@@ -39,11 +39,7 @@ export default function ActorParties() {
     };
 
     fetchParties();
-  }, [accessToken, user]);
-
-  const filteredParties = filterStatus
-    ? parties.filter(party => party.status === filterStatus)
-    : parties;
+  }, [accessToken, user, filterStatus]);
 
   if (loading) {
     return (
@@ -71,7 +67,7 @@ export default function ActorParties() {
       </div>
 
       <div className="grid grid-cols-1 gap-6">
-        {filteredParties.map(party => (
+        {parties.map(party => (
           <Card key={party.id}>
             <div className="p-6">
               <div className="flex justify-between items-start mb-4">
@@ -125,7 +121,7 @@ export default function ActorParties() {
           </Card>
         ))}
 
-        {filteredParties.length === 0 && (
+        {parties.length === 0 && (
           <Card>
             <div className="p-6 text-center text-gray-500">
               {t('party.noParties')}
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
-import api from '../services/api';
+import { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Button from './ui/Button';
 import Card from './ui/Card';
@@ -43,10 +43,7 @@ export default function ActorTable({ onEdit }: ActorTableProps) {
   const fetchActors = async () => {
     try {
       setLoading(true);
-      const response = await api.get('/auth/actors/', {
-        params: { name: searchTerm }
-      });
-      setActors(response.data);
+      setActors(await fetchAll<Actor>('/auth/actors/', { name: searchTerm }));
       setError('');
     } catch (err) {
       setError(t('common.error'));
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
-import api from '../services/api';
+import { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Card from './ui/Card';
 
@@ -29,8 +29,7 @@ export default function AdminDashboard() {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const response = await api.get('/auth/parties/');
-        const parties = response.data;
+        const parties = await fetchAll('/auth/parties/');
         
         // Calculate stats
         setStats({
@@ -3,10 +3,10 @@ import { format } from 'date-fns';
 import Card from './ui/Card';
 import Button from './ui/Button';
 
+// List responses carry compact actors; GET /parties/{id}/ has the full ones
 interface Actor {
   id: number;
-  name: string;
-  family: string;
+  display_name: string;
 }
 
 interface Song {
@@ -106,7 +106,7 @@ export default function PartyCard({ party, onEdit, onStatusChange, showActions =
                 key={actor.id}
                 className="bg-blue-50 text-blue-700 px-2 py-1 rounded-full text-sm"
               >
-                {actor.name} {actor.family}
+                {actor.display_name}
               </span>
             ))}
           </div>
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Button from './ui/Button';
 import Card from './ui/Card';
@@ -86,8 +86,7 @@ export default function PartyForm({ editParty, onSubmitSuccess }: PartyFormProps
   useEffect(() => {
     const fetchActors = async () => {
       try {
-        const response = await api.get('/auth/actors/');
-        setActors(response.data);
+        setActors(await fetchAll<Actor>('/auth/actors/'));
       } catch (err) {
         setError(t('common.error'));
       }
@@ -189,8 +188,10 @@ export default function PartyForm({ editParty, onSubmitSuccess }: PartyFormProps
       }
       
       setTimeout(() => setSuccess(false), 3000);
-    } catch (err) {
-      setError(t('common.error'));
+    } catch (err: any) {
+      // Booking conflicts name the actor and the party they are already on
+      const conflicts = err.response?.data?.actor_ids;
+      setError(Array.isArray(conflicts) ? conflicts.join(' ') : t('common.error'));
     }
   };
 
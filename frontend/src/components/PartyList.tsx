@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
-import api from '../services/api';
+import { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Card from './ui/Card';
 import type { Party, PartyFilters } from '../types/party';
@@ -46,8 +46,7 @@ export default function PartyList({ onEdit, onAddNew }: PartyListProps) {
   const fetchParties = async () => {
     try {
       setLoading(true);
-      const response = await api.get('/auth/parties/');
-      setParties(response.data.results || response.data);
+      setParties(await fetchAll<Party>('/auth/parties/'));
     } catch (err: any) {
       setError(t('common.error'));
       console.error('Error fetching parties:', err);
@@ -65,7 +64,7 @@ export default function PartyList({ onEdit, onAddNew }: PartyListProps) {
       party.notes.toLowerCase().includes(filters.search.toLowerCase()) ||
       party.dress_details.toLowerCase().includes(filters.search.toLowerCase()) ||
       party.actors.some(actor => 
-        `${actor.name} ${actor.family}`.toLowerCase().includes(filters.search.toLowerCase())
+        actor.display_name.toLowerCase().includes(filters.search.toLowerCase())
       ) ||
       party.songs.some(song => 
         song.title.toLowerCase().includes(filters.search.toLowerCase())
@@ -89,7 +88,7 @@ export default function PartyList({ onEdit, onAddNew }: PartyListProps) {
     const matchesSongs = !filters.songs || party.songs.some(song => song.title.toLowerCase().includes(filters.songs.toLowerCase()));
     const matchesStatus = !filters.status || party.status === filters.status;
     const matchesActor = !filters.actor || party.actors.some(actor => 
-      `${actor.name} ${actor.family}`.toLowerCase().includes(filters.actor.toLowerCase())
+      actor.display_name.toLowerCase().includes(filters.actor.toLowerCase())
     );
 
     return (
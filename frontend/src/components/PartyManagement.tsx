@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Button from './ui/Button';
 import Modal from './ui/Modal';
@@ -8,10 +8,10 @@ import DataTable from './ui/DataTable';
 import ConfirmDialog from './ui/ConfirmDialog';
 import PartyForm from './PartyForm';
 
+// List responses carry compact actors; GET /parties/{id}/ has the full ones
 interface Actor {
   id: number;
-  name: string;
-  family: string;
+  display_name: string;
 }
 
 interface Song {
@@ -61,8 +61,7 @@ export default function PartyManagement() {
   const fetchParties = async () => {
     try {
       setLoading(true);
-      const response = await api.get('/auth/parties/');
-      setParties(response.data.results || response.data);
+      setParties(await fetchAll<Party>('/auth/parties/'));
     } catch (err: any) {
       setError(t('common.error'));
       console.error('Error fetching parties:', err);
@@ -166,7 +165,7 @@ export default function PartyManagement() {
         <div className="flex flex-wrap gap-1">
           {party.actors.slice(0, 3).map(actor => (
             <span key={actor.id} className="text-xs bg-gray-100 px-2 py-1 rounded">
-              {actor.name} {actor.family}
+              {actor.display_name}
             </span>
           ))}
           {party.actors.length > 3 && (
@@ -200,7 +199,7 @@ export default function PartyManagement() {
     const matchesDate = !filters.date || party.date === filters.date;
     const matchesPlace = !filters.place || party.place.toLowerCase().includes(filters.place.toLowerCase());
     const matchesActor = !filters.actor || party.actors.some(actor => 
-      `${actor.name} ${actor.family}`.toLowerCase().includes(filters.actor.toLowerCase())
+      actor.display_name.toLowerCase().includes(filters.actor.toLowerCase())
     );
     
     return matchesStatus && matchesDate && matchesPlace && matchesActor;
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
-import api from '../services/api';
+import api, { fetchAll } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 import Button from './ui/Button';
 import Card from './ui/Card';
@@ -43,10 +43,7 @@ export default function PartyTable({ onEdit }: PartyTableProps) {
   const fetchParties = async (search?: string) => {
     try {
       setLoading(true);
-      const response = await api.get('/auth/parties/', {
-        params: { search }
-      });
-      setParties(response.data);
+      setParties(await fetchAll<Party>('/auth/parties/', { search }));
       setError('');
     } catch (err) {
       setError(t('common.error'));
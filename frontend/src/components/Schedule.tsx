@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
 import { useAuth } from '../context/AuthContext';
-import api from '../services/api';
+import api, { fetchAll, watchPartyChanges } from '../services/api';
 import Card from './ui/Card';
 import Button from './ui/Button';
 
@@ -16,8 +16,7 @@ interface Party {
   status: string;
   actors: Array<{
     id: number;
-    name: string;
-    family: string;
+    display_name: string;
   }>;
   meeting_time: string;
   meeting_date: string;
@@ -46,19 +45,28 @@ export default function Schedule() {
 
   useEffect(() => {
     fetchParties();
-  }, [filter]);
+    return watchPartyChanges(() => fetchParties());
+  }, [filter, dateFilter.from, dateFilter.to, sortBy, sortOrder]);
+
+  const listParams = () => {
+    const params = new URLSearchParams();
+    if (filter !== 'all') {
+      params.append('status', filter);
+    }
+    if (dateFilter.from) {
+      params.append('date_from', dateFilter.from);
+    }
+    if (dateFilter.to) {
+      params.append('date_to', dateFilter.to);
+    }
+    params.append('ordering', `${sortOrder === 'desc' ? '-' : ''}${sortBy}`);
+    return params;
+  };
 
   const fetchParties = async () => {
     try {
       setLoading(true);
-      const params = new URLSearchParams();
-      if (filter !== 'all') {
-        params.append('status', filter);
-      }
-      
-      const response = await api.get(`/auth/parties/?${params}`);
-      
-      setParties(response.data.results || response.data);
+      setParties(await fetchAll<Party>('/auth/parties/', Object.fromEntries(listParams())));
     } catch (err: any) {
       setError(t('common.error'));
       console.error('Error fetching parties:', err);
@@ -67,6 +75,38 @@ export default function Schedule() {
     }
   };
 
+  // Download the parties matching the current filters as CSV or Excel
+  const exportParties = async (type: 'csv' | 'xlsx') => {
+    try {
+      const params = listParams();
+      params.append('type', type);
+      const response = await api.get(`/auth/parties/export/?${params}`, { responseType: 'blob' });
+      const disposition = response.headers['content-disposition'] || '';
+      const filename = disposition.match(/filename="(.+)"/)?.[1] || `parties.${type}`;
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = filename;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (err: any) {
+      setError(t('common.error'));
+      console.error('Error exporting parties:', err);
+    }
+  };
+
+  // Copy the private iCalendar feed URL for phone and desktop calendar apps
+  const copyCalendarFeed = async () => {
+    try {
+      const response = await api.get('/auth/calendar/');
+      await navigator.clipboard.writeText(response.data.url);
+      window.alert(t('schedule.calendarCopied', 'Calendar link copied. Add it to your calendar app as a subscription.'));
+    } catch (err: any) {
+      setError(t('common.error'));
+      console.error('Error getting calendar feed:', err);
+    }
+  };
+
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleDateString();
   };
@@ -88,7 +128,7 @@ export default function Schedule() {
           party.place.toLowerCase().includes(search) ||
           party.day.toLowerCase().includes(search) ||
           party.actors.some(actor => 
-            `${actor.name} ${actor.family}`.toLowerCase().includes(search)
+            actor.display_name.toLowerCase().includes(search)
           ) ||
           party.notes?.toLowerCase().includes(search) ||
           party.camera_man?.toLowerCase().includes(search)
@@ -174,14 +214,25 @@ export default function Schedule() {
             }
           </p>
         </div>
-        {(isAdmin || user?.actor_profile?.can_manage_parties) && (
-          <Button
-            variant="primary"
-            onClick={() => window.location.href = '/parties/new'}
-          >
-            {t('party.add')}
+        <div className="flex gap-2">
+          <Button variant="secondary" onClick={() => exportParties('csv')}>
+            {t('schedule.exportCsv', 'Export CSV')}
           </Button>
-        )}
+          <Button variant="secondary" onClick={() => exportParties('xlsx')}>
+            {t('schedule.exportExcel', 'Export Excel')}
+          </Button>
+          <Button variant="secondary" onClick={copyCalendarFeed}>
+            {t('schedule.subscribeCalendar', 'Calendar link')}
+          </Button>
+          {(isAdmin || user?.actor_profile?.can_manage_parties) && (
+            <Button
+              variant="primary"
+              onClick={() => window.location.href = '/parties/new'}
+            >
+              {t('party.add')}
+            </Button>
+          )}
+        </div>
       </div>
 
       {/* Filters and Sorting */}
@@ -422,7 +473,7 @@ export default function Schedule() {
                               key={actor.id}
                               className="px-2 py-1 bg-blue-100 text-blue-800 rounded-full text-xs"
                             >
-                              {actor.name} {actor.family}
+                              {actor.display_name}
                             </span>
                           ))}
                         </div>
@@ -5,7 +5,12 @@ const API_URL = window.location.hostname === 'localhost'
 
 console.log('Current API URL:', API_URL); // For debugging
 
-export { API_URL };
+// Live party events need the backend served through ASGI with
+// PARTY_EVENTS_STREAM=True; otherwise screens poll
+const PARTY_EVENTS = import.meta.env.VITE_PARTY_EVENTS === 'true';
+const PARTY_POLL_INTERVAL_MS = 60000;
+
+export { API_URL, PARTY_EVENTS, PARTY_POLL_INTERVAL_MS };
 
 export default {
   API_URL,
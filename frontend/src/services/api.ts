@@ -1,17 +1,72 @@
 import axios from 'axios';
-import { API_URL } from '../config';
+import { API_URL, PARTY_EVENTS, PARTY_POLL_INTERVAL_MS } from '../config';
 
 const api = axios.create({
   baseURL: API_URL,
 });
 
+// After a write the API asks for reads from the primary database for a few
+// seconds (so the change is visible even with replicas lagging behind)
+const READ_PRIMARY_HEADER = 'x-read-primary-until';
+let readPrimaryUntil = 0;
+
 // Add token to requests
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('accessToken');
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  if (readPrimaryUntil * 1000 > Date.now()) {
+    config.headers[READ_PRIMARY_HEADER] = String(readPrimaryUntil);
+  }
   return config;
 });
 
+api.interceptors.response.use((response) => {
+  const until = Number(response.headers[READ_PRIMARY_HEADER]);
+  if (until) {
+    readPrimaryUntil = until;
+  }
+  return response;
+});
+
+// List endpoints return one page at a time ({ next, previous, results });
+// this follows the `next` cursor until the whole list is loaded
+export const fetchAll = async <T = any>(url: string, params: Record<string, any> = {}): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const response: { data: { next: string | null; results: T[] } } = await api.get(url, {
+      params: { page_size: 500, ...params, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...response.data.results);
+    cursor = response.data.next ? new URL(response.data.next).searchParams.get('cursor') : null;
+  } while (cursor);
+  return items;
+};
+
+export type PartyEventType = 'party.created' | 'party.updated' | 'party.status' | 'party.deleted' | 'resync';
+
+// Server-sent party events. EventSource cannot send headers, so the token
+// goes in the query string; the browser reconnects on its own.
+export const subscribeToPartyEvents = (onEvent: (type: PartyEventType, data: any) => void) => {
+  const token = localStorage.getItem('accessToken');
+  const source = new EventSource(`${API_URL}/auth/parties/events/?token=${encodeURIComponent(token || '')}`);
+  const types: PartyEventType[] = ['party.created', 'party.updated', 'party.status', 'party.deleted', 'resync'];
+  types.forEach((type) => {
+    source.addEventListener(type, (event) => onEvent(type, JSON.parse((event as MessageEvent).data)));
+  });
+  return () => source.close();
+};
+
+// Calls onChange when parties may have changed: on each event when live
+// events are enabled, every PARTY_POLL_INTERVAL_MS otherwise
+export const watchPartyChanges = (onChange: () => void) => {
+  if (PARTY_EVENTS) {
+    return subscribeToPartyEvents(() => onChange());
+  }
+  const timer = window.setInterval(onChange, PARTY_POLL_INTERVAL_MS);
+  return () => window.clearInterval(timer);
+};
+
 export default api;
@@ -1,4 +1,8 @@
-import type { ActorProfile as Actor } from './auth';
+// List responses carry compact actors; GET /parties/{id}/ has the full ones
+export interface PartyActor {
+  id: number;
+  display_name: string;
+}
 
 export interface Song {
   title: string;
@@ -13,7 +17,7 @@ export interface Party {
   place: string;
   event: string;
   number_of_actors: number;
-  actors: Actor[];
+  actors: PartyActor[];
   meeting_time: string;
   meeting_date: string;
   meeting_place: string;